@@ -13,6 +13,18 @@ def create_app():
     migrate.init_app(app, db)
     login_manager.login_view = 'auth.login'
 
+    # Per-request SQL/LLM timing (headers, log line, /admin/performance)
+    from app.services.request_metrics import RequestMetrics
+    RequestMetrics.init_app(app)
+
+    # Keep the instructor-dashboard stats tables in step with every flush
+    from app.services.dashboard_stats_service import DashboardStatsService
+    DashboardStatsService.init_app(app)
+
+    # Background jobs (report enrichment): DB-backed queue + per-process worker pool
+    from app.services.job_queue import JobQueue
+    JobQueue.init_app(app)
+
     # Load models (importing here is the safest option)
     from app.models import User
     
@@ -35,6 +47,13 @@ def create_app():
     app.register_blueprint(api_bp)
     app.register_blueprint(instructor_bp)
 
+    # CLI commands (flask --app run questions import ..., flask --app run stats rebuild, flask --app run jobs work)
+    from app.cli import questions_cli, stats_cli, jobs_cli, adaptive_cli
+    app.cli.add_command(questions_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(adaptive_cli)
+
     @app.route('/')
     def index():
         return redirect(url_for('auth.login'))
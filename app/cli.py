@@ -0,0 +1,120 @@
+import os
+import pathlib
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+questions_cli = AppGroup("questions", help="Question bank maintenance.")
+stats_cli = AppGroup("stats", help="Instructor dashboard statistics.")
+jobs_cli = AppGroup("jobs", help="Background job queue.")
+adaptive_cli = AppGroup("adaptive", help="Adaptive difficulty engine.")
+
+
+@questions_cli.command("import")
+@click.argument("path", required=False, type=click.Path(dir_okay=False, path_type=pathlib.Path))
+def import_questions(path: pathlib.Path | None):
+    """Bulk-import a JSON question file (default: data/question_bank_b2.json)."""
+    from app.services.question_bank_service import QuestionBankService
+
+    if path is None:
+        path = pathlib.Path(current_app.root_path).parent / "data" / "question_bank_b2.json"
+    if not path.exists():
+        raise click.ClickException(f"File not found: {path}")
+
+    result = QuestionBankService.import_json(path)
+    click.echo(
+        f"Imported {path.name}: {result['created']} added, "
+        f"{result['skipped']} already present, {result['invalid']} invalid."
+    )
+
+
+@stats_cli.command("rebuild")
+def rebuild_stats():
+    """Recompute the dashboard stats tables from sessions, responses and reports."""
+    from app.services.dashboard_stats_service import DashboardStatsService
+
+    counts = DashboardStatsService.rebuild()
+    click.echo(
+        f"Rebuilt dashboard stats: {counts['student_stats']} students, "
+        f"{counts['daily_session_stats']} days, {counts['daily_module_stats']} day/module rows."
+    )
+
+
+@jobs_cli.command("work")
+@click.option("--workers", type=int, default=None, help="Worker threads (default: JOB_WORKERS, at least 1).")
+@click.option("--drain", is_flag=True, help="Run due jobs in this thread until none are left, then exit.")
+def work_jobs(workers: int | None, drain: bool):
+    """Run queued background jobs in this process (orphaned work is recovered first)."""
+    from app.services.job_queue import JobQueue
+
+    if drain:
+        recovered = JobQueue.recover()
+        click.echo(f"Recovered: {recovered['requeued']} expired lease(s), {recovered['enqueued']} orphaned job(s).")
+        ran = 0
+        while JobQueue.run_next(f"cli-{os.getpid()}"):
+            ran += 1
+        click.echo(f"Ran {ran} job(s); queue drained.")
+        return
+
+    if workers is None:
+        workers = int(current_app.config.get("JOB_WORKERS", 4) or 0)
+    workers = max(1, workers)
+    JobQueue.start(current_app._get_current_object(), workers=workers)
+    click.echo(f"Job worker running with {workers} thread(s). Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo("Stopping; running jobs are requeued once their lease expires.")
+
+
+@jobs_cli.command("status")
+def job_status():
+    """Show job counts by status."""
+    from app.services.job_queue import JobQueue
+
+    snap = JobQueue.snapshot()
+    counts = ", ".join(f"{k} {v}" for k, v in snap["counts"].items())
+    click.echo(f"Jobs: {counts}; oldest due job waiting {snap['oldest_due_seconds']}s.")
+
+
+@jobs_cli.command("prune")
+@click.option("--older-than", type=float, default=None, help="Seconds (default: JOB_RETENTION_SECONDS).")
+def prune_jobs(older_than: float | None):
+    """Delete done and failed jobs that finished longer ago than the retention period."""
+    from app.services.job_queue import JobQueue
+
+    deleted = JobQueue.prune(older_than)
+    click.echo(f"Deleted {deleted} finished job(s).")
+
+
+@adaptive_cli.command("replay")
+@click.argument("session_ids", nargs=-1, type=int, required=True)
+@click.option("--policy", default=None, help="Policy to replay with (staircase | elo; default: ADAPTIVE_POLICY).")
+@click.option("--start-level", default="B2", show_default=True, help="Level the replay starts from.")
+def replay_adaptive(session_ids: tuple[int, ...], policy: str | None, start_level: str):
+    """Replay finished sessions' answers through a policy and compare with the stored level."""
+    from app.extensions import db
+    from app.models import CEFRLevel, TestSession
+    from app.services.adaptive_service import AdaptiveService
+
+    try:
+        start = CEFRLevel(start_level.upper())
+    except ValueError:
+        raise click.ClickException(f"Unknown level: {start_level}")
+    engine = AdaptiveService.get_policy(policy)
+
+    for session_id in session_ids:
+        session = db.session.get(TestSession, session_id)
+        if session is None:
+            click.echo(f"Session {session_id}: not found.")
+            continue
+        answers = AdaptiveService.session_answers(session_id)
+        levels, _state = AdaptiveService.replay(answers, engine, start_level=start)
+        stored = session.current_difficulty.value if session.current_difficulty else "-"
+        final = levels[-1].value if levels else start.value
+        path = " ".join(level.value for level in levels)
+        click.echo(f"Session {session_id}: {len(answers)} answers, stored {stored}, {engine.name} replay {final}")
+        if path:
+            click.echo(f"  {path}")
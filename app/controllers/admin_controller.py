@@ -3,12 +3,15 @@ from flask_login import login_required, current_user
 from app.models import UserRole
 from app.services.admin_service import AdminService
 from app.services.nlp_service import NLPService
+from app.services.llm_cache import LLMCache
+from app.services.request_metrics import RequestMetrics
+from app.services.llm_gateway import LLMGateway
+from app.services.dashboard_stats_service import DashboardStatsService
 from app.services.question_bank_service import QuestionBankService
+from app.services.job_queue import JobQueue
 from app.extensions import db
-from app.models import Question, ModuleType, QuestionType, CEFRLevel, Response, SessionQuestion
-import json
+from app.models import Question, ModuleType, CEFRLevel, Response, ResponseAnalysis, SessionQuestion
 from flask import current_app
-from groq import Groq
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -63,35 +66,9 @@ def generate_question_bank():
             mod_enum = ModuleType[module_name.upper()]
         except Exception:
             continue
-        for q in questions:
-            if not q or not q.get("text"):
-                continue
-            q_type = q.get("question_type") or "MULTIPLE_CHOICE"
-            try:
-                qt_enum = QuestionType[q_type]
-            except Exception:
-                qt_enum = QuestionType.MULTIPLE_CHOICE
-
-            text = q["text"].strip()
-            if mod_enum == ModuleType.WRITING:
-                text = QuestionBankService._ensure_writing_word_range(text)
-
-            options = q.get("options")
-            options_json = json.dumps(options) if isinstance(options, dict) else None
-            correct = q.get("correct_answer")
-
-            new_q = Question(
-                text=text,
-                module=mod_enum,
-                difficulty=CEFRLevel.B2,
-                question_type=qt_enum,
-                options=options_json,
-                correct_answer=correct,
-            )
-            db.session.add(new_q)
-            created += 1
+        # Set-based dedup + bulk insert (Writing is normalised to open-ended there)
+        created += QuestionBankService.add_questions(mod_enum, CEFRLevel.B2, questions)
 
-    db.session.commit()
     flash(f"AI question bank generated. Questions added: {created}", "success")
     return redirect(url_for('auth.dashboard'))
 
@@ -112,8 +89,7 @@ def system_status():
     models_sample = None
     if key:
         try:
-            client = Groq(api_key=key)
-            models = client.models.list()
+            models = LLMGateway.list_models()
             # Don't dump everything; show just a small sample of IDs if present
             data = getattr(models, "data", None) or []
             models_sample = [getattr(m, "id", None) for m in data[:5]]
@@ -121,6 +97,8 @@ def system_status():
         except Exception as e:
             groq_error = str(e)
 
+    llm_cache = LLMCache.get()
+
     return render_template(
         "admin_system_status.html",
         groq_key_present=bool(key),
@@ -129,9 +107,39 @@ def system_status():
         groq_ok=groq_ok,
         groq_error=groq_error,
         models_sample=models_sample,
+        llm_cache_stats=(llm_cache.snapshot() if llm_cache else None),
+        llm_gateway=LLMGateway.snapshot(),
+        jobs=JobQueue.snapshot(),
+    )
+
+
+@admin_bp.route('/admin/performance')
+@login_required
+@admin_required
+def performance():
+    """
+    Per-endpoint request timings of this worker process: latency, SQL statement count,
+    DB time, LLM time and the slowest statements seen.
+    """
+    return render_template(
+        "admin_performance.html",
+        endpoints=RequestMetrics.snapshot(),
+        llm_gateway=LLMGateway.snapshot(),
+        metrics_enabled=bool(current_app.config.get("REQUEST_METRICS_ENABLED", True)),
+        slow_query_ms=current_app.config.get("SLOW_QUERY_MS"),
     )
 
 
+@admin_bp.route('/admin/performance/reset')
+@login_required
+@admin_required
+def reset_performance():
+    RequestMetrics.reset()
+    LLMGateway.reset_stats()
+    flash("Request metrics were reset.", "success")
+    return redirect(url_for('admin.performance'))
+
+
 @admin_bp.route('/admin/refresh_question_bank')
 @login_required
 @admin_required
@@ -140,10 +148,13 @@ def refresh_question_bank():
     Wipe all questions + related responses/session questions and regenerate fresh AI question pools.
     """
     # Delete dependent rows first to avoid FK issues
+    ResponseAnalysis.query.delete()
     Response.query.delete()
     SessionQuestion.query.delete()
     deleted = Question.query.delete()
     db.session.commit()
+    # Bulk deletes bypass the ORM hooks that maintain the dashboard stats
+    DashboardStatsService.rebuild()
 
     # Regenerate pools using config as minimums (but keep a sensible floor)
     counts = current_app.config.get("QUESTIONS_PER_SECTION") or {}
@@ -168,10 +179,12 @@ def refresh_question_bank():
         ModuleType.LISTENING: _min_for(ModuleType.LISTENING, 10),
     }
 
+    # All modules' generation requests run concurrently; inserts happen on this thread.
+    outcomes = QuestionBankService.ensure_module_level_pools(targets, level_enum)
     created_total = 0
     results = []
     for mod, target in targets.items():
-        res = QuestionBankService.ensure_module_level_pool(mod, level_enum, target)
+        res = outcomes[mod]
         created_total += int(res.get("created", 0) or 0)
         results.append(f"{mod.value}: +{res.get('created', 0)} (target {target})")
 
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, make_response
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from datetime import datetime
@@ -8,6 +8,8 @@ from app.extensions import db
 from app.models import TestSession, ModuleType, TechnicalEvent, Report, UserRole
 from app.services.speech_to_text_service import SpeechToTextService
 from app.services.instructor_dashboard_service import InstructorDashboardService
+from app.services.report_repository import ReportRepository
+from app.services.report_status_service import ReportStatusService
 
 api_bp = Blueprint("api", __name__)
 
@@ -102,23 +104,30 @@ def report_status(session_id: int):
         if not getattr(current_user, "role", None) or current_user.role.value not in ("Admin", "Instructor"):
             return jsonify({"ok": False, "error": "unauthorized"}), 403
 
-    report = Report.query.filter_by(session_id=session.id).first()
-    if not report:
+    # Same ETag / long-poll contract as /report/result/<id>/status.json
+    version = ReportStatusService.resolve(session.id, request.if_none_match, request.args.get("wait"))
+    if not version:
         return jsonify({"ok": True, "exists": False})
-
-    return jsonify(
-        {
-            "ok": True,
-            "exists": True,
-            "status": report.status.value if report.status else None,
-            "ai_feedback": report.ai_feedback,
-            "ai_error": report.ai_error,
-            "learning_plan": report.learning_plan,
-            "learning_plan_error": report.learning_plan_error,
-            "score": report.score,
-            "level_result": report.level_result.value if report.level_result else None,
-        }
-    )
+    if request.if_none_match.contains(version.etag):
+        resp = make_response("", 304)
+    else:
+        report = db.session.get(Report, version.report_id)
+        resp = jsonify(
+            {
+                "ok": True,
+                "exists": True,
+                "status": report.status.value if report.status else None,
+                "ai_feedback": report.ai_feedback,
+                "ai_error": report.ai_error,
+                "learning_plan": report.learning_plan,
+                "learning_plan_error": report.learning_plan_error,
+                "score": report.score,
+                "level_result": report.level_result.value if report.level_result else None,
+            }
+        )
+    resp.set_etag(version.etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 @api_bp.route("/api/instructor/dashboard", methods=["GET"])
@@ -157,3 +166,38 @@ def instructor_dashboard_stats():
     )
 
 
+@api_bp.route("/api/instructor/leaderboard", methods=["GET"])
+@login_required
+def instructor_leaderboard():
+    if getattr(current_user, "role", None) not in (UserRole.ADMIN, UserRole.INSTRUCTOR):
+        return jsonify({"ok": False, "error": "unauthorized"}), 403
+
+    try:
+        page = int(request.args.get("page", 1))
+    except Exception:
+        page = 1
+    try:
+        per_page = int(request.args.get("per_page", 25))
+    except Exception:
+        per_page = 25
+    per_page = max(1, min(200, per_page))
+
+    result = ReportRepository.leaderboard(
+        page=page,
+        per_page=per_page,
+        q=str(request.args.get("q", "") or "").strip(),
+        level=str(request.args.get("level", "") or "").strip(),
+        status=str(request.args.get("status", "") or "").strip(),
+    )
+    rows = [{**r, "last_attempt": _iso(r["last_attempt"])} for r in result.rows]
+
+    return jsonify(
+        {
+            "ok": True,
+            "rows": rows,
+            "total": result.total,
+            "page": result.page,
+            "per_page": result.per_page,
+            "pages": result.pages,
+        }
+    )
@@ -4,9 +4,10 @@ from app.services.user_service import UserService
 from app.models import UserRole
 from app.services.admin_service import AdminService
 from app.extensions import db
-from app.models import User, UserRole, CEFRLevel, TestSession, Report
+from app.models import User, UserRole, CEFRLevel
 from app.models import Student
 from app.services.instructor_dashboard_service import InstructorDashboardService
+from app.services.report_repository import ReportRepository
 
 # Blueprint definition (no URL prefix; direct /login, /dashboard)
 auth_bp = Blueprint('auth', __name__)
@@ -139,15 +140,7 @@ def dashboard():
     if current_user.role == UserRole.ADMIN:
         users = AdminService.get_all_users()
     elif current_user.role == UserRole.STUDENT:
-        sessions = (
-            TestSession.query.filter_by(user_id=current_user.id)
-            .order_by(TestSession.start_time.desc())
-            .all()
-        )
-        student_sessions = []
-        for s in sessions:
-            rep = Report.query.filter_by(session_id=s.id).first()
-            student_sessions.append({"session": s, "report": rep})
+        student_sessions = ReportRepository.sessions_with_reports(current_user.id)
     elif current_user.role == UserRole.INSTRUCTOR:
         try:
             days = int(request.args.get("days", 7))
@@ -1,12 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, Response as FlaskResponse, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
-from io import BytesIO
+from io import BytesIO, StringIO
 from datetime import datetime
+import csv
 
-from app.extensions import db
-from app.models import UserRole, Student, TestSession, Report, SessionQuestion, Response, ModuleType, Question
-from app.services.instructor_dashboard_service import InstructorDashboardService
+from app.models import UserRole, Student, TestSession, SessionQuestion, Response, ModuleType, Question
+from app.services.report_repository import ReportRepository
 
 from reportlab.lib.pagesizes import landscape, letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -17,6 +17,8 @@ import json
 
 instructor_bp = Blueprint("instructor", __name__)
 
+REPORTS_PER_PAGE = 25
+
 
 def instructor_required(func):
     @wraps(func)
@@ -35,27 +37,38 @@ def instructor_required(func):
 @login_required
 @instructor_required
 def all_reports():
-    students = Student.query.order_by(Student.id.desc()).all()
+    try:
+        page = int(request.args.get("page", 1))
+    except Exception:
+        page = 1
+    filters = {
+        "q": str(request.args.get("q", "") or "").strip(),
+        "level": str(request.args.get("level", "") or "").strip(),
+        "status": str(request.args.get("status", "") or "").strip(),
+    }
+
+    # Latest session + report per student, one page at a time
+    result = ReportRepository.latest_per_student(page=page, per_page=REPORTS_PER_PAGE, **filters)
+    return render_template("instructor_reports.html", rows=result.rows, result=result, filters=filters)
+
+
+def _leaderboard_filters() -> dict[str, str]:
+    """Leaderboard filters from the dashboard UI (same names as the dashboard selectors)."""
+    return {
+        "q": str(request.args.get("q", "") or "").strip().lower(),
+        "level": str(request.args.get("level", "") or "").strip(),
+        "status": str(request.args.get("status", "") or "").strip(),
+    }
 
-    # Latest report per student (simple N+1 is ok for small SQLite demo)
-    student_rows = []
-    for s in students:
-        last_session = (
-            TestSession.query.filter_by(user_id=s.id).order_by(TestSession.start_time.desc()).first()
-        )
-        last_report = Report.query.filter_by(session_id=last_session.id).first() if last_session else None
-        student_rows.append({"student": s, "session": last_session, "report": last_report})
 
-    return render_template("instructor_reports.html", rows=student_rows)
+def _export_filename(ext: str) -> str:
+    return f"leaderboard_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{ext}"
 
 
 @instructor_bp.route("/instructor/leaderboard/export.pdf")
 @login_required
 @instructor_required
 def export_leaderboard_pdf():
-    def _norm(s: object) -> str:
-        return str(s or "").strip().lower()
-
     # Keep in sync with the dashboard's timeframe selector.
     try:
         days = int(request.args.get("days", 7))
@@ -64,9 +77,10 @@ def export_leaderboard_pdf():
     days = max(1, min(365, days))
 
     # Optional filters coming from the dashboard UI.
-    q = _norm(request.args.get("q", ""))
-    level_filter = str(request.args.get("level", "") or "").strip()
-    status_filter = str(request.args.get("status", "") or "").strip()
+    filters = _leaderboard_filters()
+    q = filters["q"]
+    level_filter = filters["level"]
+    status_filter = filters["status"]
 
     try:
         max_rows = int(request.args.get("max", 200))
@@ -74,31 +88,8 @@ def export_leaderboard_pdf():
         max_rows = 200
     max_rows = max(1, min(500, max_rows))
 
-    data = InstructorDashboardService.build(days=days, max_rows=max_rows)
-    leaderboard = list(data.leaderboard or [])
-
-    filtered: list[dict[str, object]] = []
-    for r in leaderboard:
-        stud = r.get("student") or {}
-        rep = r.get("report") or {}
-
-        name = str(stud.get("name") or "")
-        email = str(stud.get("email") or "")
-
-        rep_level = str(rep.get("level") or "").strip()
-        stud_level = str(stud.get("level") or "").strip()
-        display_level = rep_level or stud_level
-
-        rep_status = str(rep.get("status") or "No report").strip()
-
-        if q and (q not in _norm(name) and q not in _norm(email)):
-            continue
-        if level_filter and display_level != level_filter:
-            continue
-        if status_filter and rep_status != status_filter:
-            continue
-
-        filtered.append(r)
+    # Filters, ordering and the row limit are applied in the query
+    rows = ReportRepository.iter_leaderboard(limit=max_rows, **filters)
 
     # Build PDF
     buf = BytesIO()
@@ -133,33 +124,23 @@ def export_leaderboard_pdf():
     elements.append(Spacer(1, 12))
 
     table_data: list[list[str]] = [["Student", "Email", "Last Attempt", "Level", "Overall", "Status"]]
-    for r in filtered:
-        stud = r.get("student") or {}
-        rep = r.get("report") or {}
-        last_attempt = r.get("last_attempt")
-
-        rep_level = str(rep.get("level") or "").strip()
-        stud_level = str(stud.get("level") or "").strip()
-        display_level = rep_level or stud_level
-
-        overall = rep.get("overall")
-        status = str(rep.get("status") or "No report")
-
+    for r in rows:
+        last_attempt = r["last_attempt"]
         if isinstance(last_attempt, datetime):
             last_attempt_text = last_attempt.strftime("%Y-%m-%d %H:%M:%S")
         else:
             last_attempt_text = str(last_attempt or "-")
 
-        overall_text = f"{float(overall):.1f}%" if isinstance(overall, (int, float)) else "-"
+        overall_text = f"{r['overall']:.1f}%" if r["overall"] is not None else "-"
 
         table_data.append(
             [
-                str(stud.get("name") or "-"),
-                str(stud.get("email") or "-"),
+                str(r["name"] or "-"),
+                str(r["email"] or "-"),
                 last_attempt_text,
-                str(display_level or "-"),
+                str(r["level"] or "-"),
                 overall_text,
-                status,
+                r["status"],
             ]
         )
 
@@ -192,8 +173,53 @@ def export_leaderboard_pdf():
     doc.build(elements)
     buf.seek(0)
 
-    filename = f"leaderboard_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-    return send_file(buf, mimetype="application/pdf", as_attachment=True, download_name=filename)
+    return send_file(buf, mimetype="application/pdf", as_attachment=True, download_name=_export_filename("pdf"))
+
+
+@instructor_bp.route("/instructor/leaderboard/export.csv")
+@login_required
+@instructor_required
+def export_leaderboard_csv():
+    rows = ReportRepository.iter_leaderboard(**_leaderboard_filters())
+
+    def generate():
+        buf = StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(ReportRepository.LEADERBOARD_COLUMNS)
+        for r in rows:
+            if isinstance(r["last_attempt"], datetime):
+                r["last_attempt"] = r["last_attempt"].isoformat()
+            writer.writerow([r[c] for c in ReportRepository.LEADERBOARD_COLUMNS])
+            if buf.tell() >= 8192:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    return FlaskResponse(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={_export_filename('csv')}"},
+    )
+
+
+@instructor_bp.route("/instructor/leaderboard/export.jsonl")
+@login_required
+@instructor_required
+def export_leaderboard_jsonl():
+    rows = ReportRepository.iter_leaderboard(**_leaderboard_filters())
+
+    def generate():
+        for r in rows:
+            if isinstance(r["last_attempt"], datetime):
+                r["last_attempt"] = r["last_attempt"].isoformat()
+            yield json.dumps(r) + "\n"
+
+    return FlaskResponse(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={_export_filename('jsonl')}"},
+    )
 
 
 @instructor_bp.route("/instructor/student/<int:student_id>/reports")
@@ -201,11 +227,8 @@ def export_leaderboard_pdf():
 @instructor_required
 def student_reports(student_id: int):
     student = Student.query.get_or_404(student_id)
-    sessions = TestSession.query.filter_by(user_id=student.id).order_by(TestSession.start_time.desc()).all()
-    reports = []
-    for sess in sessions:
-        reports.append({"session": sess, "report": Report.query.filter_by(session_id=sess.id).first()})
-    return render_template("instructor_student_reports.html", student=student, rows=reports)
+    rows = ReportRepository.sessions_with_reports(student.id)
+    return render_template("instructor_student_reports.html", student=student, rows=rows)
 
 
 @instructor_bp.route("/instructor/session/<int:session_id>/review")
@@ -1,17 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, jsonify, send_file
+from flask import Blueprint, render_template, redirect, url_for, jsonify, send_file, request, make_response
 from flask_login import login_required, current_user
 from app.models import TestSession, Report, UserRole, Response, Question, ModuleType
 from app.services.report_service import ReportService
 from app.services.learning_plan_service import LearningPlanService
 from app.services.nlp_service import NLPService
+from app.services.response_analysis_service import ResponseAnalysisService
+from app.services.certificate_service import CertificateService
+from app.services.report_status_service import ReportStatusService
+from app.services.session_score_service import SessionScoreService
 import json
 from io import BytesIO
-from reportlab.lib.pagesizes import landscape, letter
-from reportlab.lib.units import inch
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
-from datetime import datetime
 import os
 
 report_bp = Blueprint('report', __name__, url_prefix='/report')
@@ -95,6 +94,9 @@ def show_result(session_id):
         module_stats = json.loads(report.module_stats_json) if report.module_stats_json else {}
     except Exception:
         module_stats = {}
+    if not module_stats:
+        # Reports saved before module stats were stored: derive them in one grouped query
+        module_stats = SessionScoreService.for_session(session.id).module_stats()
 
     # Derive weak modules (lowest scores) for showing sample materials
     weak_materials = []
@@ -257,6 +259,9 @@ def section_errors(session_id: int, module_name: str):
             return None
         return None
 
+    # Writing/Speaking analyses are computed once and then served from the DB
+    analyses = ResponseAnalysisService.analyses_for(wrong_responses)
+
     items = []
     for wr in wrong_responses:
         q = wr.question
@@ -266,18 +271,13 @@ def section_errors(session_id: int, module_name: str):
         except Exception:
             opts = {}
         analysis = None
+        analysis_data = analyses.get(wr.id)
         # NLP-based writing analysis (TF-IDF, sentence count, tense check)
-        if q and q.module == ModuleType.WRITING:
-            text = (wr.text_answer or "").strip()
-            prompt_text = (q.text if q else "")
-            analysis_data = NLPService.analyze_writing_response_ai(text=text, prompt=prompt_text)
+        if q and q.module == ModuleType.WRITING and analysis_data is not None:
             analysis = NLPService.format_writing_analysis(analysis_data)
         # Speaking: AI report based on transcript
-        if q and q.module == ModuleType.SPEAKING and not analysis:
-            transcript = (wr.transcript or wr.text_answer or "").strip()
-            prompt_text = (q.text if q else "")
-            speak_data = NLPService.analyze_speaking_response_ai(transcript=transcript, prompt=prompt_text)
-            analysis = NLPService.format_speaking_analysis(speak_data)
+        if q and q.module == ModuleType.SPEAKING and analysis_data is not None:
+            analysis = NLPService.format_speaking_analysis(analysis_data)
         items.append(
             {
                 "question": q,
@@ -299,12 +299,19 @@ def section_errors(session_id: int, module_name: str):
     )
 
 
+def _status_response(resp, version):
+    resp.set_etag(version.etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
 @report_bp.route('/result/<int:session_id>/status.json')
 @login_required
 def check_report_status(session_id):
     """
-    API endpoint that returns the current report status and AI feedback.
-    Used by frontend to poll for report readiness without page refresh.
+    Report status for the result page. Polls send If-None-Match and may ask to `wait` (long-poll)
+    until the report changes; an unchanged report answers 304 from a narrow status query, and
+    the AI feedback is only sent once the report is Ready or Failed.
     """
     session = TestSession.query.get_or_404(session_id)
     
@@ -313,19 +320,21 @@ def check_report_status(session_id):
         if current_user.role not in (UserRole.ADMIN, UserRole.INSTRUCTOR):
             return jsonify({"error": "Unauthorized"}), 403
 
-    report = Report.query.filter_by(session_id=session.id).first()
-    
-    if not report:
+    version = ReportStatusService.resolve(session.id, request.if_none_match, request.args.get("wait"))
+    if not version:
         return jsonify({"error": "Report not found"}), 404
-    
-    return jsonify({
+    if request.if_none_match.contains(version.etag):
+        return _status_response(make_response("", 304), version)
+
+    report = Report.query.get(version.report_id)
+    return _status_response(jsonify({
         "status": report.status.value,
-        "ai_feedback": report.ai_feedback,
+        "ai_feedback": report.ai_feedback if version.settled else None,
         "score": report.score,
         "level": report.level_result.value if report.level_result else None,
         "learning_plan": report.learning_plan,
         "learning_plan_error": report.learning_plan_error if hasattr(report, 'learning_plan_error') else None,
-    })
+    }), version)
 
 
 @report_bp.route('/result/<int:session_id>/certificate')
@@ -346,95 +355,26 @@ def generate_certificate(session_id):
     if not report:
         return "Report not found", 404
     
-    # Create PDF in memory
-    pdf_buffer = BytesIO()
-    
-    # Use landscape letter size for certificate
-    width, height = landscape(letter)
-    
-    c = canvas.Canvas(pdf_buffer, pagesize=landscape(letter))
-    
-    # Set font sizes and colors
-    title_font = "Helvetica-Bold"
-    # Use bold body text for better readability in the certificate
-    text_font = "Helvetica-Bold"
-    
-    # Background color (light beige)
-    c.setFillColor(colors.HexColor("#f5f5f0"))
-    c.rect(0, 0, width, height, fill=1, stroke=0)
-    
-    # Border
-    c.setLineWidth(3)
-    c.setStrokeColor(colors.HexColor("#6366f1"))
-    c.rect(0.5*inch, 0.5*inch, width - inch, height - inch, fill=0, stroke=1)
-    
-    # Logo section (left side)
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColor(colors.HexColor("#6366f1"))
-    c.drawString(1*inch, height - 1.2*inch, "🎓 English AI")
-    c.setFont("Helvetica-Bold", 11)
-    c.setFillColor(colors.HexColor("#6366f1"))
-    c.drawString(1*inch, height - 1.5*inch, "Student Portal")
-    
-    # Certificate title
-    c.setFont(title_font, 48)
-    c.setFillColor(colors.HexColor("#1a1a1a"))
-    c.drawCentredString(width/2, height - 2.5*inch, "Certificate of Achievement")
-    
-    # "This certifies that" text
-    c.setFont(text_font, 14)
-    c.setFillColor(colors.HexColor("#333333"))
-    c.drawCentredString(width/2, height - 3.2*inch, "This certifies that")
-    
-    # User name (large and bold)
-    c.setFont(title_font, 36)
-    c.setFillColor(colors.HexColor("#1a1a1a"))
-    c.drawCentredString(width/2, height - 3.9*inch, current_user.name)
-    
-    # Achievement text
-    c.setFont(text_font, 13)
-    c.setFillColor(colors.HexColor("#333333"))
-    y_pos = height - 4.7*inch
-    achievement_lines = [
-        "has successfully completed the",
-        "English AI Student Portal English Proficiency Test",
-        "and was awarded a certificate in"
-    ]
-    for line in achievement_lines:
-        c.drawCentredString(width/2, y_pos, line)
-        y_pos -= 0.3*inch
-    
-    # Level result (prominent)
-    c.setFont(title_font, 32)
-    c.setFillColor(colors.HexColor("#6366f1"))
-    level_text = f"English Level - {report.level_result.value if report.level_result else 'N/A'}"
-    c.drawCentredString(width/2, y_pos - 0.4*inch, level_text)
-    
-    # Score display
-    c.setFont(text_font, 12)
-    c.setFillColor(colors.HexColor("#333333"))
-    score_text = f"Overall Score: {int(report.score)}%"
-    c.drawCentredString(width/2, y_pos - 0.9*inch, score_text)
-    
-    # Date
-    completion_date = session.end_time.strftime("%d.%m.%Y") if session.end_time else datetime.now().strftime("%d.%m.%Y")
-    c.setFont(text_font, 11)
-    c.setFillColor(colors.HexColor("#333333"))
-    c.drawCentredString(width/2 - 2*inch, 1*inch, f"Date: {completion_date}")
-    
-    # Certificate ID/Serial number
-    certificate_id = f"CERT-{session.id}-{current_user.id}"
-    c.drawCentredString(width/2 + 2*inch, 1*inch, f"ID: {certificate_id}")
-    
-    # Finish the PDF
-    c.save()
-    
-    pdf_buffer.seek(0)
-    
+    etag, fields = CertificateService.version(session, report)
+    if request.if_none_match.contains(etag):
+        rv = make_response("", 304)
+        rv.set_etag(etag)
+        rv.cache_control.private = True
+        rv.cache_control.no_cache = True
+        return rv
+
+    pdf = CertificateService.get(session.id, etag, fields)
+
     # Return as downloadable PDF
-    return send_file(
-        pdf_buffer,
+    rv = send_file(
+        BytesIO(pdf),
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=f"Certificate_{current_user.name.replace(' ', '_')}_{session.id}.pdf"
-    )
\ No newline at end of file
+        download_name=f"Certificate_{fields['name'].replace(' ', '_')}_{session.id}.pdf",
+        etag=etag,
+        last_modified=report.updated_at,
+    )
+    # Certificates are per-user: browsers may keep them but must revalidate
+    rv.cache_control.private = True
+    rv.cache_control.no_cache = True
+    return rv
@@ -2,7 +2,6 @@ from flask import Blueprint, render_template, redirect, url_for, request, flash,
 from flask_login import login_required, current_user
 from app.extensions import db
 import re
-import pathlib
 from app.models import (
     TestSession,
     Question,
@@ -74,12 +73,17 @@ def _ensure_writing_word_range(text: str) -> str:
 
     return f"{normalized}\n\nWrite 150–200 words. Include a clear thesis and at least 2 supporting points."
 
-from app.services.nlp_service import NLPService
 from app.services.adaptive_service import AdaptiveService
 from app.services.question_bank_service import QuestionBankService
+from app.services.materials_service import MaterialsService
+from app.services.exam_state_store import ExamStateStore
+from app.services.question_draw_service import QuestionDrawService
+from app.services.question_pool_manager import QuestionPoolManager
+from app.services.grading_service import GradingService
 import json
 from datetime import datetime, timedelta
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from app.models import CEFRLevel
 
 test_bp = Blueprint("test", __name__)
@@ -95,49 +99,107 @@ MODULE_ORDER = [
 ]
 LISTENING_BLOCK_SIZE = 8
 
-# Choose listening pool (1 or 2). Uses env override LISTENING_POOL_FORCE, otherwise sticks per exam.
-def _get_listening_pool(session_id: int) -> int:
+def _forced_listening_pool() -> int | None:
     force = current_app.config.get("LISTENING_POOL_FORCE")
     if force in ("1", "2", 1, 2):
         return int(force)
-    key = f"listening_pool_{session_id}"
-    if key in flask_session:
+    return None
+
+
+# Choose listening pool (1 or 2). Uses env override LISTENING_POOL_FORCE, otherwise sticks per exam.
+def _choose_listening_pool(session_id: int) -> int:
+    force = _forced_listening_pool()
+    if force:
+        return force
+    # Sessions started before exam plans existed kept their pool in the cookie.
+    # The key is dropped from the cookie once the pool is in the plan.
+    legacy = flask_session.pop(f"listening_pool_{session_id}", None)
+    if legacy is not None:
         try:
-            return int(flask_session[key])
+            return int(legacy)
         except Exception:
             pass
     import random
-    choice = random.choice([1, 2])
-    flask_session[key] = choice
-    return choice
+    return random.choice([1, 2])
 
-def _module_position(session: TestSession) -> tuple[int, int]:
-    total = len(MODULE_ORDER)
-    try:
-        idx = MODULE_ORDER.index(session.current_module)
-    except ValueError:
-        idx = 0
-    return idx, total
 
-def _overall_progress_percent(session: TestSession) -> int:
-    # Step 1: Calculate TOTAL questions across all 6 modules dynamically from config
-    total_questions = 0
-    for mod in MODULE_ORDER:
-        total_questions += _questions_for_module(mod, session)
-    
-    # Step 2: Calculate completed questions up to current module
-    completed_questions = 0
+def _get_listening_pool(session: TestSession) -> int:
+    force = _forced_listening_pool()
+    if force:
+        return force
+    return int(_exam_plan(session).get("listening_pool") or 1)
+
+
+# --- Exam plan ---
+# Computed once per session (in start_exam) and stored on TestSession.exam_plan_json:
+# {"listening_pool": 1, "total": 46,
+#  "modules": [{"module": "Grammar", "count": 10, "offset": 0, "time_limit": 300}, ...]}
+# Per-module totals, positions and overall progress are then plain dict lookups.
+def _build_exam_plan(session: TestSession) -> dict:
+    pool = _choose_listening_pool(session.id)
+    modules = []
+    offset = 0
     for mod in MODULE_ORDER:
-        m_total = _questions_for_module(mod, session)
-        if mod == session.current_module:
-            # For current module, count questions up to current index
-            completed_questions += min(session.current_question_index, m_total)
-            break
+        if mod == ModuleType.LISTENING:
+            count = _count_listening_questions(pool)
         else:
-            # For completed modules, count all questions
-            completed_questions += m_total
-    
-    return int((completed_questions / max(1, total_questions)) * 100)
+            count = _questions_for_module(mod)
+        modules.append(
+            {
+                "module": mod.value,
+                "count": int(count),
+                "offset": offset,
+                "time_limit": _get_time_limit_seconds(mod),
+            }
+        )
+        offset += int(count)
+    return {"listening_pool": pool, "total": offset, "modules": modules}
+
+
+def _exam_plan(session: TestSession) -> dict:
+    raw = session.exam_plan_json
+    cached = getattr(session, "_exam_plan_cache", None)
+    if cached and cached[0] == raw:
+        return cached[1]
+
+    plan = None
+    if raw:
+        try:
+            plan = json.loads(raw)
+        except Exception:
+            plan = None
+    if not isinstance(plan, dict) or not plan.get("modules"):
+        # Sessions created before exam plans existed: build lazily; persisted with the next commit.
+        plan = _build_exam_plan(session)
+        raw = json.dumps(plan)
+        session.exam_plan_json = raw
+
+    plan["by_module"] = {
+        entry["module"]: dict(entry, index=i) for i, entry in enumerate(plan["modules"])
+    }
+    session._exam_plan_cache = (raw, plan)
+    return plan
+
+
+def _plan_entry(session: TestSession, module: ModuleType | None = None) -> dict | None:
+    module = module or session.current_module
+    return _exam_plan(session)["by_module"].get(module.value if module else None)
+
+
+def _module_position(session: TestSession) -> tuple[int, int]:
+    plan = _exam_plan(session)
+    entry = _plan_entry(session)
+    return (entry["index"] if entry else 0), len(plan["modules"])
+
+
+def _overall_progress_percent(session: TestSession) -> int:
+    plan = _exam_plan(session)
+    entry = _plan_entry(session)
+    if not entry:
+        return 0
+    # Questions of finished modules + progress within the current module
+    completed_questions = entry["offset"] + min(session.current_question_index, entry["count"])
+    return int((completed_questions / max(1, plan["total"])) * 100)
 
 
 def _split_reading_text(text: str) -> tuple[str, str]:
@@ -163,97 +225,57 @@ def _split_reading_text(text: str) -> tuple[str, str]:
     return raw, ""
 
 
-def _reading_passage_key(session_id: int) -> str:
-    return f"reading_passage_{session_id}"
-
-
-def _get_reading_passage(session_id: int) -> str | None:
-    return flask_session.get(_reading_passage_key(session_id))
-
-
-def _set_reading_passage(session_id: int, passage: str) -> None:
-    if passage:
-        flask_session[_reading_passage_key(session_id)] = passage
+# Reading passage shown during the Reading module: pinned per exam in the server-side exam
+# state as a content id, so the passage stays stable even if the file is edited mid-exam.
+READING_PASSAGE_STATE_KEY = "reading_passage_id"
 
 
-def _clear_reading_passage(session_id: int) -> None:
-    flask_session.pop(_reading_passage_key(session_id), None)
+def _legacy_reading_passage_key(session_id: int) -> str:
+    # Older versions kept the whole passage in the cookie session under this key.
+    return f"reading_passage_{session_id}"
 
 
-def _parse_reading_questions_file(path: pathlib.Path) -> list[dict]:
-    if not path.exists():
-        current_app.logger.warning(f"Reading questions file not found: {path}")
-        return []
+def _drop_legacy_exam_cookie_keys() -> None:
+    # Per-exam keys older versions left in the cookie session (never cleaned up there).
+    for key in [k for k in flask_session.keys() if k.startswith(("reading_passage_", "listening_pool_"))]:
+        flask_session.pop(key, None)
 
-    text = path.read_text(encoding="utf-8")
-    lines = [l.strip() for l in text.splitlines()]
-    items: list[dict] = []
-    current: dict | None = None
 
-    for line in lines:
-        if not line:
-            continue
-        m_q = re.match(r"^(\d+)\.\s*(.+)", line)
-        if m_q:
-            if current:
-                items.append(current)
-            current = {"text": m_q.group(2).strip(), "options": {}, "answer": None}
-            continue
-
-        if current is None:
-            continue
-
-        m_ans = re.match(r"^\(?\s*ANSWER\s*:\s*([A-D])\s*\)?$", line, re.IGNORECASE)
-        if m_ans:
-            current["answer"] = m_ans.group(1).upper()
-            continue
-
-        m_opt = re.match(r"^[a-dA-D]\.\s*(.+)", line)
-        if m_opt:
-            letter = line.split(".")[0].strip().upper()
-            val = line.split(".", 1)[1].strip()
-            current["options"][letter] = val
-            continue
+def _get_reading_passage(session_id: int) -> str | None:
+    content_id = ExamStateStore.get(session_id, READING_PASSAGE_STATE_KEY)
+    if content_id:
+        return ExamStateStore.content(content_id)
+    legacy = flask_session.pop(_legacy_reading_passage_key(session_id), None)
+    if legacy:
+        ExamStateStore.set(
+            session_id, READING_PASSAGE_STATE_KEY, ExamStateStore.put_content("reading_passage", legacy)
+        )
+    return legacy
 
-    if current:
-        items.append(current)
 
-    parsed: list[dict] = []
-    for it in items:
-        if not it.get("text") or not it.get("options"):
-            continue
-        parsed.append(
-            {
-                "text": it["text"],
-                "options": it["options"],
-                "correct_answer": it.get("answer"),
-                "question_type": "MULTIPLE_CHOICE",
-            }
-        )
-    return parsed
+def _set_reading_passage(session_id: int) -> None:
+    content_id = MaterialsService.reading_passage_id()
+    if content_id:
+        ExamStateStore.set(session_id, READING_PASSAGE_STATE_KEY, content_id)
 
 
-def _load_reading_materials() -> tuple[str, list[dict]]:
-    base_dir = pathlib.Path(current_app.root_path).parent / "data" / "reading"
-    passage_path = base_dir / "reading_passage"
-    questions_path = base_dir / "reading_questions"
+def _clear_reading_passage(session_id: int) -> None:
+    ExamStateStore.delete(session_id, READING_PASSAGE_STATE_KEY)
+    flask_session.pop(_legacy_reading_passage_key(session_id), None)
 
-    passage = ""
-    if passage_path.exists():
-        passage = passage_path.read_text(encoding="utf-8").strip()
-    else:
-        current_app.logger.warning(f"Reading passage file not found: {passage_path}")
 
-    questions = _parse_reading_questions_file(questions_path)
-    return passage, questions
+def _load_reading_materials() -> tuple[str, tuple[dict, ...]]:
+    # Parsed once per file version and served from memory (see MaterialsService).
+    return MaterialsService.reading_passage(), MaterialsService.reading_questions()
 
 
 def _get_or_create_reading_question(qdata: dict, difficulty: CEFRLevel) -> Question | None:
+    # Only flushes: the caller commits along with the SessionQuestion it serves this on
     text = (qdata.get("text") or "").strip()
     if not text:
         return None
 
-    existing = Question.query.filter_by(module=ModuleType.READING, text=text).first()
+    existing = Question.query.filter_by(module=ModuleType.READING, text_hash=Question.hash_text(text)).first()
     correct = (qdata.get("correct_answer") or "").strip().upper() if qdata.get("correct_answer") else None
     if correct and correct not in ("A", "B", "C", "D"):
         correct = None
@@ -269,7 +291,7 @@ def _get_or_create_reading_question(qdata: dict, difficulty: CEFRLevel) -> Quest
             existing.correct_answer = correct
             changed = True
         if changed:
-            db.session.commit()
+            db.session.flush()
         return existing
 
     new_q = Question(
@@ -281,21 +303,24 @@ def _get_or_create_reading_question(qdata: dict, difficulty: CEFRLevel) -> Quest
         correct_answer=correct,
     )
     db.session.add(new_q)
-    db.session.commit()
+    db.session.flush()
     return new_q
 
 
 def _questions_for_module(module: ModuleType, session: TestSession | None = None) -> int:
+    if session is not None:
+        entry = _plan_entry(session, module)
+        if entry:
+            return int(entry["count"])
+
     if module == ModuleType.READING:
-        passage, questions = _load_reading_materials()
-        if questions:
-            return len(questions)
+        n = len(MaterialsService.reading_questions())
+        if n:
+            return n
         # If no file-based questions, fall back to config to avoid blocking.
     if module == ModuleType.LISTENING:
-        # Listening is fixed by the preloaded listening pools; do not override by env.
-        if session is None:
-            return 0
-        return int(_get_listening_total(session) or 0)
+        # Listening is fixed by the preloaded listening pools (see the exam plan); not configurable.
+        return 0
 
     counts = current_app.config.get("QUESTIONS_PER_SECTION") or {}
     raw = counts.get(module.value)
@@ -316,10 +341,13 @@ def _get_or_create_attempt(session: TestSession) -> SessionModuleAttempt:
         session_id=session.id, module=session.current_module
     ).first()
     if not attempt:
+        entry = _plan_entry(session)
         attempt = SessionModuleAttempt(
             session_id=session.id,
             module=session.current_module,
-            time_limit_seconds=_get_time_limit_seconds(session.current_module),
+            time_limit_seconds=(
+                int(entry["time_limit"]) if entry else _get_time_limit_seconds(session.current_module)
+            ),
             status=ModuleAttemptStatus.IN_PROGRESS,
         )
         db.session.add(attempt)
@@ -327,16 +355,19 @@ def _get_or_create_attempt(session: TestSession) -> SessionModuleAttempt:
     return attempt
 
 # Listening block helpers
-def _get_listening_total(session: TestSession) -> int:
-    ordered = _get_listening_ordered_questions(session)
+def _count_listening_questions(pool: int) -> int:
+    ordered = _listening_ordered_questions_for_pool(pool)
     if ordered:
         return len(ordered)
-    pool = _get_listening_pool(session.id)
     return Question.query.filter(
         Question.module == ModuleType.LISTENING,
         Question.audio_url.ilike(f"%listeningaudio{pool}%"),
     ).count()
 
+
+def _get_listening_total(session: TestSession) -> int:
+    return _questions_for_module(ModuleType.LISTENING, session)
+
 def _get_listening_block_bounds(session: TestSession):
     total = _get_listening_total(session)
     start = (session.current_question_index // LISTENING_BLOCK_SIZE) * LISTENING_BLOCK_SIZE
@@ -358,20 +389,16 @@ def _fetch_listening_question(
         Question.module == ModuleType.LISTENING,
         ~Question.id.in_(served_question_ids),
     )
-    pool = _get_listening_pool(session.id)
+    pool = _get_listening_pool(session)
     base_query = base_query.filter(Question.audio_url.ilike(f"%listeningaudio{pool}%"))
     return base_query.order_by(func.random()).first()
 
 def _get_listening_ordered_questions(session: TestSession) -> list[Question]:
-    pool = _get_listening_pool(session.id)
-    base_dir = pathlib.Path(current_app.root_path).parent / "data" / "listening"
-    part1 = base_dir / f"pool{pool}_part1.md"
-    part2 = base_dir / f"pool{pool}_part2.md"
+    return _listening_ordered_questions_for_pool(_get_listening_pool(session))
 
-    parsed = []
-    for md_file in (part1, part2):
-        parsed.extend(QuestionBankService._parse_md_questions(md_file))
 
+def _listening_ordered_questions_for_pool(pool: int) -> list[Question]:
+    parsed = MaterialsService.listening_questions(pool)
     if not parsed:
         return []
 
@@ -392,20 +419,82 @@ def _get_listening_ordered_questions(session: TestSession) -> list[Question]:
     ordered_questions = [by_text[t] for t in texts if t in by_text]
     return ordered_questions
 
+def _load_listening_block(
+    session: TestSession,
+    start: int,
+    end: int,
+    create_missing: bool = False,
+) -> list[tuple[SessionQuestion, Question, Response | None]]:
+    """
+    Loads the listening block [start, end) in a fixed number of queries: the block's
+    SessionQuestion rows with their questions, then the latest Response per question.
+    With create_missing=True, indexes not served yet get their SessionQuestion rows
+    created together and committed once.
+    Returns (session question, question, latest response or None) in index order.
+    """
+    rows = (
+        SessionQuestion.query.options(joinedload(SessionQuestion.question))
+        .filter(
+            SessionQuestion.session_id == session.id,
+            SessionQuestion.module == ModuleType.LISTENING,
+            SessionQuestion.question_index >= start,
+            SessionQuestion.question_index < end,
+        )
+        .all()
+    )
+    by_index = {sq.question_index: sq for sq in rows}
+
+    missing = [idx for idx in range(start, end) if idx not in by_index]
+    if missing and create_missing:
+        ordered_questions = _get_listening_ordered_questions(session)
+        served_ids = {
+            row[0]
+            for row in db.session.query(SessionQuestion.question_id).filter(
+                SessionQuestion.session_id == session.id
+            )
+        }
+        for idx in missing:
+            q = _fetch_listening_question(session, idx, served_ids, ordered_questions)
+            if not q:
+                continue
+            sq = SessionQuestion(
+                session_id=session.id,
+                module=ModuleType.LISTENING,
+                question_index=idx,
+                question_id=q.id,
+                status=SessionQuestionStatus.SERVED,
+            )
+            sq.question = q
+            db.session.add(sq)
+            by_index[idx] = sq
+            served_ids.add(q.id)
+        db.session.commit()
+
+    block = [by_index[idx] for idx in range(start, end) if idx in by_index]
+    question_ids = [sq.question_id for sq in block]
+    latest: dict[int, Response] = {}
+    if question_ids:
+        for resp in (
+            Response.query.filter(
+                Response.session_id == session.id,
+                Response.question_id.in_(question_ids),
+            )
+            .order_by(Response.id.asc())
+            .all()
+        ):
+            latest[resp.question_id] = resp
+    return [(sq, sq.question, latest.get(sq.question_id)) for sq in block if sq.question]
+
 def _render_listening_block(session: TestSession, attempt: SessionModuleAttempt, remaining: int | None):
     start, end, total = _get_listening_block_bounds(session)
     if total == 0:
         flash("Listening question pool is empty. Please inform an administrator.", "danger")
         return redirect(url_for("auth.dashboard"))
-    ordered_questions = _get_listening_ordered_questions(session)
-    served_question_ids = db.session.query(SessionQuestion.question_id).filter(
-        SessionQuestion.session_id == session.id
-    )
-    served_ids = {row[0] for row in served_question_ids}
+    block = _load_listening_block(session, start, end, create_missing=True)
 
     questions = []
     audio_url = None
-    pool = _get_listening_pool(session.id)
+    pool = _get_listening_pool(session)
     part_index = (start // LISTENING_BLOCK_SIZE) + 1  # 1-based
     part_start_sec = 0
     if pool == 1 and part_index == 2:
@@ -413,35 +502,9 @@ def _render_listening_block(session: TestSession, attempt: SessionModuleAttempt,
     elif pool == 2 and part_index == 2:
         part_start_sec = 12 * 60 + 24  # 744s
 
-    for idx in range(start, end):
-        sq = SessionQuestion.query.filter_by(
-            session_id=session.id,
-            module=session.current_module,
-            question_index=idx,
-        ).first()
-        if sq:
-            q = sq.question
-        else:
-            q = _fetch_listening_question(session, idx, served_ids, ordered_questions)
-            if not q:
-                continue
-            sq = SessionQuestion(
-                session_id=session.id,
-                module=session.current_module,
-                question_index=idx,
-                question_id=q.id,
-                status=SessionQuestionStatus.SERVED,
-            )
-            db.session.add(sq)
-            db.session.commit()
-            served_ids.add(q.id)
+    for sq, q, existing_response in block:
         if not audio_url:
             audio_url = q.audio_url
-        existing_response = (
-            Response.query.filter_by(session_id=session.id, question_id=q.id)
-            .order_by(Response.id.desc())
-            .first()
-        )
         options_dict = None
         if q.options:
             try:
@@ -489,69 +552,44 @@ def _handle_listening_block(session: TestSession, attempt: SessionModuleAttempt)
             return _render_listening_block(session, attempt, remaining)
         return redirect(url_for("test.get_question", session_id=session.id))
 
-    # Gather current block questions
-    questions = []
-    for idx in range(start, end):
-        sq = SessionQuestion.query.filter_by(
-            session_id=session.id,
-            module=session.current_module,
-            question_index=idx,
-        ).first()
-        if not sq:
-            continue
-        questions.append(sq)
-
-    # Process answers
-    for sq in questions:
-        qid = sq.question_id
-        field = f"q_{qid}"
+    # Grade the whole block in one transaction
+    now = datetime.utcnow()
+    for sq, question, resp in _load_listening_block(session, start, end):
+        field = f"q_{sq.question_id}"
         user_answer = (request.form.get(field) or "").strip()
         if not user_answer:
             sq.status = SessionQuestionStatus.SKIPPED
-            db.session.commit()
             continue
 
-        question = sq.question
-        is_correct = user_answer == question.correct_answer
-
-        resp = (
-            Response.query.filter_by(session_id=session.id, question_id=question.id)
-            .order_by(Response.id.desc())
-            .first()
-        )
         if not resp:
             resp = Response(session_id=session.id, question_id=question.id)
             db.session.add(resp)
 
         resp.selected_option = user_answer
         resp.text_answer = None
-        resp.is_correct = is_correct
-        resp.audio_filename = resp.audio_filename
-        resp.transcript = resp.transcript
-        resp.stt_provider = resp.stt_provider
-        resp.stt_status = resp.stt_status
+        resp.is_correct = user_answer == question.correct_answer
 
         sq.status = SessionQuestionStatus.ANSWERED
-        sq.answered_at = datetime.utcnow()
-        db.session.commit()
+        sq.answered_at = now
 
     # advance to next block or finish
-    session.current_question_index = end
     if end >= total:
         # Last block: before leaving Listening, ensure audio has completed
         audio_completed = request.form.get("audio_completed", "0")
         if audio_completed != "1":
+            # Keep the answers, stay on this block
+            db.session.commit()
             if request.headers.get("X-Listen-Ajax"):
                 return jsonify({
                     "ok": False, 
                     "error": "Listening section not finished"
                 })
             return redirect(url_for("test.get_question", session_id=session.id))
-        
-        attempt.ended_at = datetime.utcnow()
+
+        session.current_question_index = end
+        attempt.ended_at = now
         attempt.status = ModuleAttemptStatus.COMPLETED
-        db.session.commit()
-        
+
         # Advance to next module
         try:
             curr_idx = MODULE_ORDER.index(session.current_module)
@@ -560,25 +598,24 @@ def _handle_listening_block(session: TestSession, attempt: SessionModuleAttempt)
                     _clear_reading_passage(session.id)
                 session.current_module = MODULE_ORDER[curr_idx + 1]
                 session.current_question_index = 0
-                db.session.commit()
                 next_url = url_for("test.get_question", session_id=session.id)
             else:
-                session.end_time = datetime.utcnow()
+                session.end_time = now
                 session.is_completed = True
-                db.session.commit()
                 next_url = url_for("test.report_options", session_id=session.id)
         except ValueError:
-            session.end_time = datetime.utcnow()
+            session.end_time = now
             session.is_completed = True
-            db.session.commit()
             next_url = url_for("test.report_options", session_id=session.id)
-        
+        db.session.commit()
+
         # For AJAX requests, return redirect URL
         if request.headers.get("X-Listen-Ajax"):
             return jsonify({"ok": True, "redirect": next_url})
         
         return redirect(next_url)
 
+    session.current_question_index = end
     db.session.commit()
     if request.headers.get("X-Listen-Ajax"):
         remaining = _remaining_seconds(attempt)
@@ -743,6 +780,358 @@ def _difficulty_candidates(target: CEFRLevel):
 def _prefer_ai_questions() -> bool:
     return bool(current_app.config.get("PREFER_AI_QUESTIONS", True))
 
+
+def _session_questions(session: TestSession, indexes) -> dict[int, SessionQuestion | None]:
+    """{index: SessionQuestion or None} of the current module, questions loaded in the same query."""
+    rows = (
+        SessionQuestion.query.options(joinedload(SessionQuestion.question))
+        .filter(
+            SessionQuestion.session_id == session.id,
+            SessionQuestion.module == session.current_module,
+            SessionQuestion.question_index.in_(list(indexes)),
+        )
+        .order_by(SessionQuestion.id)
+        .all()
+    )
+    served = {index: None for index in indexes}
+    for row in rows:
+        served[row.question_index] = served[row.question_index] or row
+    return served
+
+
+def _current_session_question(session: TestSession) -> SessionQuestion | None:
+    """SessionQuestion at the current index, with its question loaded in the same query."""
+    return _session_questions(session, [session.current_question_index])[session.current_question_index]
+
+
+def _resolve_current_question(
+    session: TestSession,
+    attempt: SessionModuleAttempt,
+    commit: bool = True,
+    served: dict[int, SessionQuestion | None] | None = None,
+) -> tuple[SessionQuestion | None, Question | None]:
+    """
+    Question for the session's current index (non-listening modules): the one already
+    served there, otherwise a newly drawn one whose SessionQuestion row is persisted.
+    With commit=False nothing is committed (Reading question rows, answer-key syncs and the
+    SessionQuestion are left to the caller's transaction). `served` holds SessionQuestion
+    lookups the caller already made (see _session_questions).
+    Returns (None, None) when no question can be found.
+    """
+    # 1. Check the database first (is there an unsolved question?)
+    if served is not None and session.current_question_index in served:
+        sq = served[session.current_question_index]
+    else:
+        sq = _current_session_question(session)
+
+    # already generated for this index?
+    if sq:
+        new_q = sq.question
+        # Reading: keep DB question in sync with file answer key (important if file was updated after session generation)
+        if session.current_module == ModuleType.READING and new_q:
+            try:
+                _passage, file_questions = _load_reading_materials()
+                if file_questions and 0 <= session.current_question_index < len(file_questions):
+                    qdata = file_questions[session.current_question_index]
+                    correct = (qdata.get("correct_answer") or "").strip().upper() if qdata.get("correct_answer") else None
+                    if correct and correct in ("A", "B", "C", "D"):
+                        changed = False
+                        if (new_q.correct_answer or "") != correct:
+                            new_q.correct_answer = correct
+                            changed = True
+                        options_json = (
+                            json.dumps(qdata.get("options"))
+                            if isinstance(qdata.get("options"), dict)
+                            else None
+                        )
+                        if options_json and (new_q.options or "") != options_json:
+                            new_q.options = options_json
+                            changed = True
+                        if changed and commit:
+                            db.session.commit()
+            except Exception:
+                # If sync fails for any reason, fall back to existing DB question.
+                pass
+    else:
+        served_question_ids = db.session.query(SessionQuestion.question_id).filter(
+            SessionQuestion.session_id == session.id
+        )
+
+        # Exam flow: DB-first (questions are pre-generated and stored).
+        new_q = None
+        existing_q = None
+        base_query = Question.query.filter(
+            Question.module == session.current_module,
+            ~Question.id.in_(served_question_ids),
+        )
+        # Reading: use file-based questions in order
+        if session.current_module == ModuleType.READING:
+            passage, file_questions = _load_reading_materials()
+            if file_questions and 0 <= session.current_question_index < len(file_questions):
+                qdata = file_questions[session.current_question_index]
+                new_q = _get_or_create_reading_question(qdata, session.current_difficulty)
+                if not _get_reading_passage(session.id) and passage:
+                    _set_reading_passage(session.id)
+            # If file is missing or index out of range, fall back to DB selection below.
+        # Writing/Speaking must not use MC questions
+        if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
+            base_query = base_query.filter(Question.question_type != QuestionType.MULTIPLE_CHOICE)
+
+        if session.current_module == ModuleType.LISTENING:
+            pool = _get_listening_pool(session)
+            base_query = base_query.filter(Question.audio_url.ilike(f"%listeningaudio{pool}%"))
+            existing_q = base_query.order_by(func.random()).first()
+        elif not new_q:
+            # Pop from the session's pre-drawn sequence (nearest available difficulty first).
+            existing_q = QuestionDrawService.draw(
+                attempt,
+                _difficulty_candidates(session.current_difficulty),
+                per_band=_questions_for_module(session.current_module, session),
+            )
+            if not existing_q:
+                existing_q = base_query.order_by(func.random()).first()
+        if not new_q:
+            new_q = existing_q
+
+        # 3) Last-resort fallback: if AI is down and pool is exhausted, allow repeats instead of hard-failing.
+        if not new_q:
+            fallback_query = Question.query.filter(Question.module == session.current_module)
+            if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
+                fallback_query = fallback_query.filter(Question.question_type != QuestionType.MULTIPLE_CHOICE)
+            if session.current_module == ModuleType.LISTENING:
+                pool = _get_listening_pool(session)
+                fallback_query = fallback_query.filter(Question.audio_url.ilike(f"%listeningaudio{pool}%"))
+            repeat_any = fallback_query.order_by(func.random()).first()
+            if repeat_any:
+                new_q = repeat_any
+                current_app.logger.warning(
+                    "Question pool exhausted for module=%s; using repeat fallback. "
+                    "Consider generating more questions or lowering per-section question counts.",
+                    session.current_module.value,
+                )
+
+    if not new_q:
+        return None, None
+
+    # Force writing/speaking as open-ended (never MC)
+    if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
+        new_q.question_type = QuestionType.OPEN_ENDED
+        new_q.options = None
+        new_q.correct_answer = None
+
+    # persist question for navigation within this module
+    if not sq:
+        sq = SessionQuestion(
+            session_id=session.id,
+            module=session.current_module,
+            question_index=session.current_question_index,
+            question_id=new_q.id,
+            status=SessionQuestionStatus.SERVED,
+        )
+        db.session.add(sq)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+    return sq, new_q
+
+
+def _wants_json() -> bool:
+    """JSON mode for the exam POST: the response carries the next question instead of a redirect."""
+    return bool(request.headers.get("X-Exam-Ajax")) or request.accept_mimetypes.best == "application/json"
+
+
+def _submit_answer(
+    session: TestSession,
+    attempt: SessionModuleAttempt,
+    question_id: int | None,
+    user_answer: str,
+    audio_filename: str | None,
+    served: dict[int, SessionQuestion | None] | None = None,
+) -> tuple[str, Response | None]:
+    """
+    Stores one answer (or a skip) for the current index and advances the session; the
+    caller commits (see _after_answer). The SessionQuestions at the current and next index
+    are loaded in one query (and left in `served` for _after_answer); the response to
+    upsert is only looked up when the question was answered before (back navigation). The
+    adaptive level comes from the session's engine state (AdaptiveService.record_answer),
+    which also folds in grades that arrived for earlier open-ended answers.
+    Returns ("answered" | "skipped" | "missing", response to enqueue for grading or None).
+    """
+    module = session.current_module
+    index = session.current_question_index
+    if served is None:
+        served = {}
+    served.update(_session_questions(session, [index, index + 1]))
+    sq = served[index]
+    if sq and sq.question_id == question_id:
+        question = sq.question
+    else:
+        question = db.session.get(Question, question_id) if question_id else None
+
+    # Defensive check: question may have been deleted or missing
+    if not question:
+        return "missing", None
+
+    total_q = _questions_for_module(module, session)
+
+    # If user clicked Next without answering, treat as unanswered and allow navigation.
+    # For Speaking, require a transcript (from STT); for Writing, allow empty and warn user
+    if not user_answer:
+        if module == ModuleType.SPEAKING:
+            # This shouldn't happen due to client-side validation, but defensive check
+            current_app.logger.warning(f"Empty speaking answer submitted for session {session.id}")
+            # Don't skip - let the answer be processed as-is (the grader will handle empty text)
+        else:
+            if sq and sq.status != SessionQuestionStatus.ANSWERED:
+                sq.status = SessionQuestionStatus.SKIPPED
+            session.current_question_index = min(total_q, session.current_question_index + 1)
+            return "skipped", None
+
+    # Open-ended answers are graded in the background (GradingService); MC is checked inline.
+    open_ended_module = module in (ModuleType.WRITING, ModuleType.SPEAKING)
+    needs_grading = open_ended_module or question.question_type != QuestionType.MULTIPLE_CHOICE
+
+    # Upsert: if user navigates back and changes an answer, update the existing row instead of inserting duplicates
+    resp = None
+    if sq is None or sq.status == SessionQuestionStatus.ANSWERED:
+        resp = (
+            Response.query.filter_by(session_id=session.id, question_id=question.id)
+            .order_by(Response.id.desc())
+            .first()
+        )
+    resubmitted = resp is not None
+    if not resp:
+        resp = Response(session_id=session.id, question_id=question.id)
+        db.session.add(resp)
+
+    resp.selected_option = (
+        None
+        if open_ended_module
+        else (user_answer if question.question_type == QuestionType.MULTIPLE_CHOICE else None)
+    )
+    resp.text_answer = (
+        user_answer
+        if (open_ended_module or question.question_type == QuestionType.OPEN_ENDED)
+        else None
+    )
+    if needs_grading:
+        GradingService.mark_pending(resp, session.current_difficulty)
+    else:
+        resp.is_correct = user_answer == question.correct_answer
+        resp.grading_status = None
+    resp.audio_filename = audio_filename or resp.audio_filename
+    resp.transcript = user_answer if module == ModuleType.SPEAKING else resp.transcript
+    resp.stt_provider = "groq" if (audio_filename or resp.audio_filename) else None
+    resp.stt_status = "ok" if (audio_filename or resp.audio_filename) else resp.stt_status
+
+    now = datetime.utcnow()
+    if sq:
+        sq.status = SessionQuestionStatus.ANSWERED
+        sq.answered_at = now
+
+    session.current_question_index += 1
+
+    # Is the module finished?
+    if session.current_question_index >= total_q:
+        attempt.ended_at = now
+        attempt.status = ModuleAttemptStatus.COMPLETED
+
+    # O(1) update of the session's adaptive state; an answer awaiting its grade is applied
+    # once graded (needs the response id, hence the flush). A changed answer (after "prev")
+    # is not counted a second time.
+    if needs_grading:
+        db.session.flush()
+    session.current_difficulty = AdaptiveService.record_answer(
+        session,
+        module,
+        question.difficulty,
+        resp.is_correct,
+        response_id=resp.id if needs_grading else None,
+        resubmitted=resubmitted,
+    )
+    return "answered", (resp if needs_grading else None)
+
+
+def _after_answer(
+    session: TestSession,
+    attempt: SessionModuleAttempt,
+    remaining: int | None,
+    graded_resp: Response | None = None,
+    served: dict[int, SessionQuestion | None] | None = None,
+):
+    """
+    Commits the submitted answer and responds. Normally a redirect to the GET view; in
+    JSON mode the next question is drawn in the same transaction and returned, saving
+    the redirect round trip. Module ends (review screen / next module) always go
+    through the GET view.
+    """
+    next_url = url_for("test.get_question", session_id=session.id)
+    payload = None
+    if _wants_json():
+        payload = {"ok": True, "redirect": next_url}
+        total_q = _questions_for_module(session.current_module, session)
+        if session.current_question_index < total_q:
+            sq, question = _resolve_current_question(session, attempt, commit=False, served=served)
+            if question:
+                payload = {"ok": True, **_question_payload(session, sq, question, total_q, remaining)}
+
+    db.session.commit()
+    if graded_resp is not None:
+        GradingService.enqueue(graded_resp)
+    return jsonify(payload) if payload is not None else redirect(next_url)
+
+
+def _question_payload(
+    session: TestSession,
+    sq: SessionQuestion,
+    question: Question,
+    total_q: int,
+    remaining: int | None,
+) -> dict:
+    module = session.current_module
+    options = None
+    if module not in (ModuleType.WRITING, ModuleType.SPEAKING) and question.options:
+        try:
+            options = json.loads(question.options) if isinstance(question.options, str) else question.options
+        except Exception:
+            options = None
+
+    text = question.text or ""
+    if module == ModuleType.WRITING:
+        text = _ensure_writing_word_range(text)
+
+    # Only a question answered earlier (back navigation) can have a stored answer
+    existing_answer = None
+    if sq.status == SessionQuestionStatus.ANSWERED:
+        existing = (
+            Response.query.filter_by(session_id=session.id, question_id=question.id)
+            .order_by(Response.id.desc())
+            .first()
+        )
+        if existing:
+            existing_answer = existing.selected_option or existing.text_answer
+
+    payload = {
+        "module": module.value,
+        "index": session.current_question_index + 1,
+        "total": total_q,
+        "remaining_seconds": remaining,
+        "overall_progress": _overall_progress_percent(session),
+        "question": {
+            "id": question.id,
+            "text": text,
+            "question_type": question.question_type.value if question.question_type else None,
+            "options": options,
+            "audio_url": question.audio_url,
+        },
+        "existing_answer": existing_answer,
+    }
+    if module == ModuleType.READING:
+        payload["reading_passage"] = _get_reading_passage(session.id) or MaterialsService.reading_passage()
+    return payload
+
+
 @test_bp.route("/start_exam")
 @login_required
 def start_exam():
@@ -752,34 +1141,30 @@ def start_exam():
     except Exception:
         start_level = CEFRLevel.B2
 
-    session = TestSession(user_id=current_user.id, current_difficulty=start_level)
-    db.session.add(session)
-    db.session.commit()
+    _drop_legacy_exam_cookie_keys()
 
-    # Ensure listening pools are loaded from markdown/audio (idempotent)
+    # Ensure listening/reading pools are loaded from local files (idempotent, no AI)
     try:
         QuestionBankService.ensure_listening_pools()
     except Exception as e:
         current_app.logger.warning(f"Listening pool load failed: {e}")
+    try:
+        QuestionBankService.ensure_reading_from_files(difficulty=CEFRLevel.B2)
+    except Exception as e:
+        current_app.logger.warning(f"Reading pool load failed: {e}")
 
-    # Pre-generate questions for all non-listening modules so the exam can run offline.
-    max_needed = max(
-        (_questions_for_module(mod, session) for mod in MODULE_ORDER if mod != ModuleType.LISTENING),
-        default=10,
-    )
-    min_pool = max_needed * 2
+    session = TestSession(user_id=current_user.id, current_difficulty=start_level)
+    db.session.add(session)
+    db.session.flush()
+    # Fix module order, per-module totals, offsets, time limits and listening pool once.
+    session.exam_plan_json = json.dumps(_build_exam_plan(session))
+    db.session.commit()
+
+    # AI-generated pools are topped up in the background; the exam never waits for Groq.
     for mod in MODULE_ORDER:
-        # Listening uses pre-provided audio/questions; skip AI generation
-        if mod == ModuleType.LISTENING:
+        if mod in (ModuleType.LISTENING, ModuleType.READING):
             continue
-        try:
-            QuestionBankService.ensure_module_level_pool(
-                module=mod,
-                difficulty=start_level,
-                min_count=min_pool,
-            )
-        except Exception as e:
-            current_app.logger.warning(f"Pool prefill failed for {mod.value}: {e}")
+        QuestionPoolManager.signal(mod, start_level, _questions_for_module(mod, session))
 
     return redirect(url_for("test.get_question", session_id=session.id))
 
@@ -793,18 +1178,17 @@ def start_module(session_id: int):
 
     attempt = _get_or_create_attempt(session)
     if not attempt.started_at:
-        # Pre-generate/ensure question pool in DB for this module+level.
-        # This avoids calling AI on every next question.
-        if session.current_module != ModuleType.LISTENING:
-            try:
-                QuestionBankService.ensure_module_level_pool(
-                    module=session.current_module,
-                    difficulty=session.current_difficulty,
-                    min_count=_questions_for_module(session.current_module, session) * 2,
-                )
-            except Exception:
-                # Don't block exam start if AI is unavailable
-                pass
+        # Ask the background pool manager to top up this module at the current level and
+        # the levels the adaptive engine may step to. This avoids calling AI on every next question.
+        if session.current_module not in (ModuleType.LISTENING, ModuleType.READING):
+            per_exam = _questions_for_module(session.current_module, session)
+            for level in _difficulty_candidates(session.current_difficulty)[:3]:
+                QuestionPoolManager.signal(session.current_module, level, per_exam)
+        if session.current_module not in (ModuleType.LISTENING, ModuleType.READING):
+            # Draw this module's shuffled per-difficulty sequence once, up front.
+            QuestionDrawService.build_pool(
+                attempt, per_band=_questions_for_module(session.current_module, session)
+            )
         attempt.started_at = datetime.utcnow()
         attempt.status = ModuleAttemptStatus.IN_PROGRESS
         db.session.commit()
@@ -853,103 +1237,23 @@ def get_question(session_id):
         # allow navigation actions without answering
         if action == "prev":
             session.current_question_index = max(0, session.current_question_index - 1)
-            db.session.commit()
-            return redirect(url_for("test.get_question", session_id=session.id))
-
-        question_id = request.form.get("question_id")
-        user_answer = (request.form.get("option") or request.form.get("text_answer") or "").strip()
-        audio_filename = request.form.get("audio_filename")
-
-        question = Question.query.get(question_id)
-
-        # Defensive check: question may have been deleted or missing
-        if not question:
-            flash("Question not found; moving to the next one.", "warning")
-            return redirect(url_for("test.get_question", session_id=session.id))
-
-        # If user clicked Next without answering, treat as unanswered and allow navigation.
-        # For Speaking, require a transcript (from STT); for Writing, allow empty and warn user
-        if not user_answer:
-            if session.current_module == ModuleType.SPEAKING:
-                # This shouldn't happen due to client-side validation, but defensive check
-                current_app.logger.warning(f"Empty speaking answer submitted for session {session.id}")
-                # Don't redirect - let the answer be processed as-is (NLPService will handle empty text)
-                pass
-            else:
-                sq = SessionQuestion.query.filter_by(
-                    session_id=session.id,
-                    module=session.current_module,
-                    question_index=session.current_question_index,
-                ).first()
-                if sq and sq.status != SessionQuestionStatus.ANSWERED:
-                    sq.status = SessionQuestionStatus.SKIPPED
-                    db.session.commit()
-
-                total_q = _questions_for_module(session.current_module, session)
-                session.current_question_index = min(total_q, session.current_question_index + 1)
-                db.session.commit()
-                return redirect(url_for("test.get_question", session_id=session.id))
-
-        is_correct = False
-        if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
-            is_correct = NLPService.evaluate_open_ended(
-                question.text, user_answer, session.current_difficulty.value
-            )
-        elif question.question_type == QuestionType.MULTIPLE_CHOICE:
-            is_correct = user_answer == question.correct_answer
-        else:
-            is_correct = NLPService.evaluate_open_ended(
-                question.text, user_answer, session.current_difficulty.value
-            )
-
-        # Upsert: if user navigates back and changes an answer, update the existing row instead of inserting duplicates
-        resp = (
-            Response.query.filter_by(session_id=session.id, question_id=question.id)
-            .order_by(Response.id.desc())
-            .first()
+            return _after_answer(session, attempt, remaining)
+
+        served = {}
+        result, graded_resp = _submit_answer(
+            session,
+            attempt,
+            question_id=request.form.get("question_id", type=int),
+            user_answer=(request.form.get("option") or request.form.get("text_answer") or "").strip(),
+            audio_filename=request.form.get("audio_filename"),
+            served=served,
         )
-        if not resp:
-            resp = Response(session_id=session.id, question_id=question.id)
-            db.session.add(resp)
-
-        resp.selected_option = (
-            None
-            if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING)
-            else (user_answer if question.question_type == QuestionType.MULTIPLE_CHOICE else None)
-        )
-        resp.text_answer = (
-            user_answer
-            if (session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING) or question.question_type == QuestionType.OPEN_ENDED)
-            else None
-        )
-        resp.is_correct = is_correct
-        resp.audio_filename = audio_filename or resp.audio_filename
-        resp.transcript = user_answer if session.current_module == ModuleType.SPEAKING else resp.transcript
-        resp.stt_provider = "groq" if (audio_filename or resp.audio_filename) else None
-        resp.stt_status = "ok" if (audio_filename or resp.audio_filename) else resp.stt_status
-
-        sq = SessionQuestion.query.filter_by(
-            session_id=session.id,
-            module=session.current_module,
-            question_index=session.current_question_index,
-        ).first()
-        if sq:
-            sq.status = SessionQuestionStatus.ANSWERED
-            sq.answered_at = datetime.utcnow()
-
-        session.current_question_index += 1
-
-        # Is the module finished?
-        total_q = _questions_for_module(session.current_module, session)
-        if session.current_question_index >= total_q:
-            attempt.ended_at = datetime.utcnow()
-            attempt.status = ModuleAttemptStatus.COMPLETED
-
-        session.current_difficulty = AdaptiveService.calculate_next_level(session)
-        db.session.commit()
-        if session.current_question_index >= total_q:
+        if result == "missing":
+            if _wants_json():
+                return jsonify({"ok": False, "error": "Question not found"}), 404
+            flash("Question not found; moving to the next one.", "warning")
             return redirect(url_for("test.get_question", session_id=session.id))
-        return redirect(url_for("test.get_question", session_id=session.id))
+        return _after_answer(session, attempt, remaining, graded_resp, served)
 
     # --- GET: Fetch question ---
     if session.current_module == ModuleType.LISTENING:
@@ -1003,102 +1307,7 @@ def get_question(session_id):
                 overall_progress=_overall_progress_percent(session),
             )
 
-    # 1. Check the database first (is there an unsolved question?)
-    sq = SessionQuestion.query.filter_by(
-        session_id=session.id,
-        module=session.current_module,
-        question_index=session.current_question_index,
-    ).first()
-
-    # already generated for this index?
-    if sq:
-        new_q = sq.question
-        # Reading: keep DB question in sync with file answer key (important if file was updated after session generation)
-        if session.current_module == ModuleType.READING and new_q:
-            try:
-                _passage, file_questions = _load_reading_materials()
-                if file_questions and 0 <= session.current_question_index < len(file_questions):
-                    qdata = file_questions[session.current_question_index]
-                    correct = (qdata.get("correct_answer") or "").strip().upper() if qdata.get("correct_answer") else None
-                    if correct and correct in ("A", "B", "C", "D"):
-                        changed = False
-                        if (new_q.correct_answer or "") != correct:
-                            new_q.correct_answer = correct
-                            changed = True
-                        options_json = (
-                            json.dumps(qdata.get("options"))
-                            if isinstance(qdata.get("options"), dict)
-                            else None
-                        )
-                        if options_json and (new_q.options or "") != options_json:
-                            new_q.options = options_json
-                            changed = True
-                        if changed:
-                            db.session.commit()
-            except Exception:
-                # If sync fails for any reason, fall back to existing DB question.
-                pass
-    else:
-        served_question_ids = db.session.query(SessionQuestion.question_id).filter(
-            SessionQuestion.session_id == session.id
-        )
-
-        # Exam flow: DB-first (questions are pre-generated and stored).
-        new_q = None
-        existing_q = None
-        base_query = Question.query.filter(
-            Question.module == session.current_module,
-            ~Question.id.in_(served_question_ids),
-        )
-        # Reading: use file-based questions in order
-        if session.current_module == ModuleType.READING:
-            passage, file_questions = _load_reading_materials()
-            if file_questions and 0 <= session.current_question_index < len(file_questions):
-                qdata = file_questions[session.current_question_index]
-                new_q = _get_or_create_reading_question(qdata, session.current_difficulty)
-                stored_passage = _get_reading_passage(session.id)
-                if not stored_passage and passage:
-                    _set_reading_passage(session.id, passage)
-                if stored_passage or passage:
-                    reading_passage = stored_passage or passage
-                    reading_paragraphs = [p.strip() for p in reading_passage.split("\n\n") if p.strip()]
-                reading_question = (qdata.get("text") or "").strip()
-            # If file is missing or index out of range, fall back to DB selection below.
-        # Writing/Speaking must not use MC questions
-        if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
-            base_query = base_query.filter(Question.question_type != QuestionType.MULTIPLE_CHOICE)
-
-        if session.current_module == ModuleType.LISTENING:
-            pool = _get_listening_pool(session.id)
-            base_query = base_query.filter(Question.audio_url.ilike(f"%listeningaudio{pool}%"))
-            existing_q = base_query.order_by(func.random()).first()
-        else:
-            for diff in _difficulty_candidates(session.current_difficulty):
-                existing_q = base_query.filter(Question.difficulty == diff).order_by(func.random()).first()
-                if existing_q:
-                    break
-            if not existing_q:
-                existing_q = base_query.order_by(func.random()).first()
-        if not new_q:
-            new_q = existing_q
-
-        # 3) Last-resort fallback: if AI is down and pool is exhausted, allow repeats instead of hard-failing.
-        if not new_q:
-            fallback_query = Question.query.filter(Question.module == session.current_module)
-            if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
-                fallback_query = fallback_query.filter(Question.question_type != QuestionType.MULTIPLE_CHOICE)
-            if session.current_module == ModuleType.LISTENING:
-                pool = _get_listening_pool(session.id)
-                fallback_query = fallback_query.filter(Question.audio_url.ilike(f"%listeningaudio{pool}%"))
-            repeat_any = fallback_query.order_by(func.random()).first()
-            if repeat_any:
-                new_q = repeat_any
-                current_app.logger.warning(
-                    "Question pool exhausted for module=%s; using repeat fallback. "
-                    "Consider generating more questions or lowering per-section question counts.",
-                    session.current_module.value,
-                )
-
+    sq, new_q = _resolve_current_question(session, attempt)
     if not new_q:
         # If a question cannot be retrieved (rare), avoid blocking the user: redirect to dashboard with an error.
         flash(
@@ -1106,12 +1315,6 @@ def get_question(session_id):
         )
         return redirect(url_for("auth.dashboard"))
 
-    # Force writing/speaking as open-ended (never MC)
-    if session.current_module in (ModuleType.WRITING, ModuleType.SPEAKING):
-        new_q.question_type = QuestionType.OPEN_ENDED
-        new_q.options = None
-        new_q.correct_answer = None
-
     question_text = None
     reading_passage = None
     reading_question = None
@@ -1122,24 +1325,14 @@ def get_question(session_id):
         passage, _file_questions = _load_reading_materials()
         stored_passage = _get_reading_passage(session.id)
         if not stored_passage and passage:
-            _set_reading_passage(session.id, passage)
+            _set_reading_passage(session.id)
             stored_passage = passage
+        # The exam state store only flushes; keep what it wrote above
+        db.session.commit()
         reading_passage = stored_passage or passage
         reading_question = getattr(new_q, "text", "") or ""
         reading_paragraphs = [p.strip() for p in (reading_passage or "").split("\n\n") if p.strip()]
 
-    # persist question for navigation within this module
-    if not sq:
-        sq = SessionQuestion(
-            session_id=session.id,
-            module=session.current_module,
-            question_index=session.current_question_index,
-            question_id=new_q.id,
-            status=SessionQuestionStatus.SERVED,
-        )
-        db.session.add(sq)
-        db.session.commit()
-
     # Options to send to the template
     options_dict = None
     if session.current_module not in (ModuleType.WRITING, ModuleType.SPEAKING) and new_q.options:
@@ -1157,6 +1350,7 @@ def get_question(session_id):
         .order_by(Response.id.desc())
         .first()
     )
+    midx, mtotal = _module_position(session)
 
     return render_template(
         "exam.html",
@@ -1172,8 +1366,8 @@ def get_question(session_id):
         speaking_response_seconds=current_app.config.get("SPEAKING_RESPONSE_SECONDS", 60),
         sq=sq,
         existing_response=existing_response,
-        module_index=_module_position(session)[0],
-        module_total=_module_position(session)[1],
+        module_index=midx,
+        module_total=mtotal,
         overall_progress=_overall_progress_percent(session),
         reading_passage=reading_passage,
         reading_question=reading_question,
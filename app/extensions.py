@@ -5,4 +5,20 @@ from flask_migrate import Migrate
 # Create the database and login manager here (clean separation)
 db = SQLAlchemy()
 login_manager = LoginManager()
-migrate = Migrate()
\ No newline at end of file
+migrate = Migrate()
+
+
+def dialect_insert(bind=None):
+    """
+    The dialect's `insert` construct (with on_conflict_do_nothing / on_conflict_do_update) for
+    SQLite and PostgreSQL, or None on other databases, where callers fall back to plain
+    INSERT / UPDATE. `bind` defaults to the session's engine; a Connection works too.
+    """
+    name = (bind if bind is not None else db.session.get_bind()).dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
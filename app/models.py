@@ -2,7 +2,9 @@ from app.extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import enum
+import hashlib
 from datetime import datetime
+from sqlalchemy.orm import validates
 
 # --- ENUMS ---
 class UserRole(enum.Enum):
@@ -83,8 +85,14 @@ class Student(User):
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        # One copy of a question per module+level (dedup key for bulk ingest, see QuestionBankService)
+        db.Index('ix_questions_module_difficulty_text_hash', 'module', 'difficulty', 'text_hash', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
+    # sha256 of the normalised text (kept in sync by the validator below)
+    text_hash = db.Column(db.String(64), nullable=False)
     module = db.Column(db.Enum(ModuleType), nullable=False)
     difficulty = db.Column(db.Enum(CEFRLevel), nullable=False)
     question_type = db.Column(db.Enum(QuestionType), default=QuestionType.MULTIPLE_CHOICE)
@@ -94,8 +102,26 @@ class Question(db.Model):
     # Listening questions can point to a playable audio URL (or static file URL)
     audio_url = db.Column(db.Text, nullable=True)
 
+    @staticmethod
+    def normalize_text(text: str | None) -> str:
+        """Whitespace-collapsed, case-folded text used for duplicate detection."""
+        return " ".join((text or "").split()).casefold()
+
+    @staticmethod
+    def hash_text(text: str | None) -> str:
+        return hashlib.sha256(Question.normalize_text(text).encode("utf-8")).hexdigest()
+
+    @validates('text')
+    def _sync_text_hash(self, key, value):
+        self.text_hash = Question.hash_text(value)
+        return value
+
 class TestSession(db.Model):
     __tablename__ = 'test_sessions'
+    __table_args__ = (
+        # Latest-session-per-student lookups (see ReportRepository)
+        db.Index('ix_test_sessions_user_start', 'user_id', 'start_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
@@ -106,6 +132,10 @@ class TestSession(db.Model):
     current_module = db.Column(db.Enum(ModuleType), default=ModuleType.GRAMMAR)
     current_question_index = db.Column(db.Integer, default=0)
     current_difficulty = db.Column(db.Enum(CEFRLevel), default=CEFRLevel.A1)
+    # Exam plan fixed at start (module order, per-module counts/offsets, time limits, listening pool) as JSON
+    exam_plan_json = db.Column(db.Text)
+    # Incremental adaptive engine state (policy, streak, rating, per-band history) as JSON; see AdaptiveService
+    adaptive_state_json = db.Column(db.Text)
     
     responses = db.relationship('Response', backref='session', lazy='dynamic')
     module_attempts = db.relationship('SessionModuleAttempt', backref='session', lazy='dynamic')
@@ -122,6 +152,8 @@ class SessionModuleAttempt(db.Model):
     ended_at = db.Column(db.DateTime)
     time_limit_seconds = db.Column(db.Integer, nullable=False, default=0)
     status = db.Column(db.Enum(ModuleAttemptStatus), default=ModuleAttemptStatus.IN_PROGRESS, nullable=False)
+    # Pre-drawn, shuffled question ids per difficulty band for this module (JSON), see QuestionDrawService
+    draw_pool_json = db.Column(db.Text)
 
     __table_args__ = (
         db.UniqueConstraint('session_id', 'module', name='uq_session_module_attempt'),
@@ -168,13 +200,36 @@ class Response(db.Model):
     transcript = db.Column(db.Text)
     stt_provider = db.Column(db.String(50))
     stt_status = db.Column(db.String(50))
+    # Open-ended grading: "pending" until the background grader sets is_correct, then "graded"
+    grading_status = db.Column(db.String(20), index=True)
+    grading_level = db.Column(db.Enum(CEFRLevel))
     
     question = db.relationship('Question')
+
+
+class ResponseAnalysis(db.Model):
+    """Stored AI analysis of a Writing/Speaking response (computed once, served from the DB)."""
+    __tablename__ = 'response_analyses'
+    id = db.Column(db.Integer, primary_key=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('responses.id'), nullable=False, unique=True, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # "writing" | "speaking"
+    # Analysis prompt version; rows with an older version are recomputed
+    version = db.Column(db.Integer, nullable=False)
+    # sha256 of (prompt, answer/transcript) the analysis was computed from
+    input_hash = db.Column(db.String(64), nullable=False)
+    # Whether Groq was available when computed (local-only results are redone once AI is on)
+    ai_enabled = db.Column(db.Boolean, default=False, nullable=False)
+    data = db.Column(db.Text)  # JSON dict as returned by NLPService.analyze_*_response_ai
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, onupdate=datetime.utcnow)
+
+    response = db.relationship('Response', backref=db.backref('analysis', uselist=False, cascade='all, delete-orphan'))
+
     
 class Report(db.Model):
     __tablename__ = 'reports'
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('test_sessions.id'))
+    session_id = db.Column(db.Integer, db.ForeignKey('test_sessions.id'), index=True)
     score = db.Column(db.Float)
     level_result = db.Column(db.Enum(CEFRLevel))
     ai_feedback = db.Column(db.Text)  # Long report written by AI
@@ -192,6 +247,97 @@ class Report(db.Model):
     module_stats_json = db.Column(db.Text)
 
 
+
+# --- Materialised instructor-dashboard stats (maintained by DashboardStatsService) ---
+class DailyModuleStat(db.Model):
+    """Response totals per module and day (UTC date the session started)."""
+    __tablename__ = 'daily_module_stats'
+    day = db.Column(db.Date, primary_key=True)
+    module = db.Column(db.Enum(ModuleType), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    wrong = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailySessionStat(db.Model):
+    """Sessions started per day, and the READY reports (count, score sum) of those sessions."""
+    __tablename__ = 'daily_session_stats'
+    day = db.Column(db.Date, primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    ready_reports = db.Column(db.Integer, nullable=False, default=0)
+    ready_score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class StudentStat(db.Model):
+    """One row per student: latest session + its report, and the level used for the CEFR distribution."""
+    __tablename__ = 'student_stats'
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    latest_session_id = db.Column(db.Integer)
+    latest_started_at = db.Column(db.DateTime, index=True)
+    report_status = db.Column(db.Enum(ReportStatus))
+    report_score = db.Column(db.Float, index=True)
+    report_level = db.Column(db.Enum(CEFRLevel))
+    module_stats_json = db.Column(db.Text)
+    # Latest report level, else the student's current_level
+    level = db.Column(db.Enum(CEFRLevel), index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, onupdate=datetime.utcnow)
+
+class Job(db.Model):
+    """Background job queue row (see JobQueue): claimed by in-process workers or `flask jobs work`."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers pick the oldest due queued job
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True)
+    payload_json = db.Column(db.Text)
+    # queued | running | done | failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    # Set while queued/running so the same work is not enqueued twice; cleared when finished
+    dedupe_key = db.Column(db.String(100), unique=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, onupdate=datetime.utcnow)
+
+
+class ExamState(db.Model):
+    """Server-side per-exam key/value state (see ExamStateStore); the cookie only carries the login."""
+    __tablename__ = 'exam_state'
+    session_id = db.Column(db.Integer, db.ForeignKey('test_sessions.id', ondelete='CASCADE'), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, onupdate=datetime.utcnow)
+
+
+class ExamContent(db.Model):
+    """Content-addressed exam material (e.g. a reading passage version), id = sha256 of the body."""
+    __tablename__ = 'exam_content'
+    id = db.Column(db.String(64), primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RoadmapCacheEntry(db.Model):
+    """AI study roadmap shared by all reports of one quantised score profile (see RoadmapCache)."""
+    __tablename__ = 'roadmap_cache'
+    # sha1 of the profile (level, module score bands, weeks)
+    key = db.Column(db.String(40), primary_key=True)
+    profile_json = db.Column(db.Text, nullable=False)
+    data_json = db.Column(db.Text, nullable=False)  # roadmap JSON as returned by the model
+    # Monday the stored calendar starts on; hits are shifted to their own start date
+    start_date = db.Column(db.Date, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    accessed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class LearningPlan(db.Model):
     __tablename__ = 'learning_plans'
     id = db.Column(db.Integer, primary_key=True)
@@ -1,29 +1,232 @@
-from app.models import Response, Question, get_level_score, get_level_from_score
-from sqlalchemy import desc
+import json
+import math
+from flask import current_app
+from sqlalchemy.orm import joinedload
+from app.extensions import db
+from app.models import Response, Question, CEFRLevel, get_level_score, get_level_from_score
+from app.services.grading_service import GradingService
+
+
+class StaircasePolicy:
+    """
+    The 2-up/2-down staircase: step up whenever the last `up` answers in the current
+    module were correct, down whenever the last `down` were incorrect.
+    """
+
+    name = "staircase"
+
+    def __init__(self, up: int = 2, down: int = 2):
+        self.up = max(1, int(up))
+        self.down = max(1, int(down))
+
+    def update(self, state: dict, level_score: int, difficulty_score: int | None, is_correct: bool | None) -> int:
+        streak = int(state.get("streak", 0))
+        if is_correct is True:
+            streak = streak + 1 if streak > 0 else 1
+        elif is_correct is False:
+            streak = streak - 1 if streak < 0 else -1
+        else:
+            # Not graded yet (open-ended): breaks the streak, like a missing answer
+            streak = 0
+
+        # The streak is not reset after a step: as long as the last `up` answers are
+        # correct the level keeps climbing (same as the original last-N-answers rule).
+        if streak >= self.up:
+            level_score = min(6, level_score + 1)
+        elif streak <= -self.down:
+            level_score = max(1, level_score - 1)
+        state["streak"] = streak
+        return level_score
+
+
+class EloPolicy:
+    """
+    Elo/1-PL IRT style estimate: the candidate's rating (on the 1..6 level scale) moves
+    by k * (outcome - expected), where expected is the logistic win probability against
+    the question's difficulty. The served level is the rounded rating.
+    """
+
+    name = "elo"
+
+    def __init__(self, k: float = 0.4, scale: float = 1.0):
+        self.k = float(k)
+        self.scale = float(scale) or 1.0
+
+    def update(self, state: dict, level_score: int, difficulty_score: int | None, is_correct: bool | None) -> int:
+        rating = float(state.get("rating", level_score))
+        if is_correct is not None:
+            difficulty = float(difficulty_score or level_score)
+            expected = 1.0 / (1.0 + math.exp(-(rating - difficulty) / self.scale))
+            rating += self.k * ((1.0 if is_correct else 0.0) - expected)
+            rating = min(6.0, max(1.0, rating))
+        state["rating"] = round(rating, 4)
+        return int(min(6, max(1, round(rating))))
+
 
 class AdaptiveService:
+    """
+    Incremental adaptive engine. Each answer updates a compact per-session state in O(1)
+    (no queries); the state is stored on TestSession.adaptive_state_json:
+
+        {"policy": "staircase", "level": "B2", "module": "Grammar", "streak": 1,
+         "rating": 4.2, "answered": 7, "history": {"B2": [5, 3], "C1": [2, 1]}}
+
+    history is per difficulty band [answered, correct]. The policy (ADAPTIVE_POLICY:
+    "staircase" (default) or "elo") decides the next level; replay() runs a policy
+    offline over historical responses for tuning.
+    """
+
+    POLICIES = {
+        StaircasePolicy.name: StaircasePolicy,
+        EloPolicy.name: EloPolicy,
+    }
+
     @staticmethod
-    def calculate_next_level(session):
-        # Take only the last 3 answers in the current module
-        recent_responses = session.responses.join(Response.question).filter(
-            Question.module == session.current_module
-        ).order_by(desc(Response.id)).limit(3).all()
-
-        if not recent_responses:
-            return session.current_difficulty
-
-        current_score = get_level_score(session.current_difficulty)
-        # More stable adaptation:
-        # - Increase only on 2 consecutive correct answers
-        # - Decrease only on 2 consecutive incorrect answers
-        last = recent_responses[0]
-        prev = recent_responses[1] if len(recent_responses) >= 2 else None
-
-        if prev is not None and last.is_correct is True and prev.is_correct is True:
-            new_score = min(6, current_score + 1)
-        elif prev is not None and last.is_correct is False and prev.is_correct is False:
-            new_score = max(1, current_score - 1)
+    def get_policy(name: str | None = None):
+        cfg = current_app.config
+        name = (name or cfg.get("ADAPTIVE_POLICY") or StaircasePolicy.name).lower()
+        if name == EloPolicy.name:
+            return EloPolicy(k=float(cfg.get("ADAPTIVE_ELO_K", 0.4) or 0.4))
+        return StaircasePolicy()
+
+    @staticmethod
+    def new_state(level: CEFRLevel, policy_name: str) -> dict:
+        return {
+            "policy": policy_name,
+            "level": level.value,
+            "module": None,
+            "streak": 0,
+            "rating": float(get_level_score(level)),
+            "answered": 0,
+            "history": {},
+        }
+
+    @staticmethod
+    def load_state(session, policy_name: str) -> dict:
+        state = None
+        if session.adaptive_state_json:
+            try:
+                state = json.loads(session.adaptive_state_json)
+            except Exception:
+                state = None
+        level = session.current_difficulty or CEFRLevel.B2
+        if not isinstance(state, dict) or state.get("policy") != policy_name:
+            return AdaptiveService.new_state(level, policy_name)
+        if state.get("level") != level.value:
+            # The level was changed outside the engine; follow it.
+            state["level"] = level.value
+            state["rating"] = float(get_level_score(level))
+            state["streak"] = 0
+        return state
+
+    @staticmethod
+    def apply(state: dict, policy, module, difficulty: CEFRLevel | None, is_correct: bool | None) -> CEFRLevel:
+        """Pure O(1) state transition for one answer; returns the next level."""
+        module_name = module.value if module is not None else None
+        if state.get("module") != module_name:
+            # Streaks are per module
+            state["module"] = module_name
+            state["streak"] = 0
+
+        level_score = get_level_score(CEFRLevel(state["level"]))
+        difficulty_score = get_level_score(difficulty) if difficulty else None
+        new_score = policy.update(state, level_score, difficulty_score, is_correct)
+
+        band = (difficulty or CEFRLevel(state["level"])).value
+        answered, correct = state["history"].get(band, [0, 0])
+        state["history"][band] = [answered + 1, correct + (1 if is_correct is True else 0)]
+        state["answered"] = int(state.get("answered", 0)) + 1
+
+        level = get_level_from_score(new_score)
+        state["level"] = level.value
+        return level
+
+    @staticmethod
+    def record_answer(
+        session,
+        module,
+        difficulty: CEFRLevel | None,
+        is_correct: bool | None,
+        response_id: int | None = None,
+        resubmitted: bool = False,
+    ) -> CEFRLevel:
+        """
+        Feeds one answer into the session's adaptive state, stores the updated blob on the
+        session and returns the next level (the caller assigns it and commits).
+
+        An open-ended answer still waiting for its background grade (is_correct None, with a
+        response_id) is parked in state["pending"] and applied by a later call in the same module
+        once GradingService has filled in is_correct, so Writing/Speaking keep moving the level.
+        A changed answer to a question already answered (resubmitted, after "prev") is not fed
+        in again: each question counts once, as with one Response row per question.
+        """
+        policy = AdaptiveService.get_policy()
+        state = AdaptiveService.load_state(session, policy.name)
+        AdaptiveService._apply_graded(state, policy, module)
+        if resubmitted:
+            level = CEFRLevel(state["level"])
+        elif is_correct is None and response_id is not None:
+            pending = state.setdefault("pending", [])
+            if response_id not in pending:
+                pending.append(response_id)
+            level = CEFRLevel(state["level"])
         else:
-            new_score = current_score
-                
-        return get_level_from_score(new_score)
\ No newline at end of file
+            level = AdaptiveService.apply(state, policy, module, difficulty, is_correct)
+        session.adaptive_state_json = json.dumps(state, separators=(",", ":"))
+        return level
+
+    @staticmethod
+    def _apply_graded(state: dict, policy, module) -> None:
+        """
+        Applies parked answers of `module` whose grade has arrived, in submission order (one
+        query). Grades of an earlier module that arrive after it ended are dropped, so they
+        cannot move the current module's staircase.
+        """
+        pending = state.get("pending") or []
+        if not pending:
+            return
+        rows = (
+            db.session.query(
+                Response.id, Response.grading_status, Response.is_correct, Question.module, Question.difficulty
+            )
+            .outerjoin(Question, Question.id == Response.question_id)
+            .filter(Response.id.in_(pending))
+            .all()
+        )
+        by_id = {row.id: row for row in rows}
+        still_pending = []
+        for response_id in pending:
+            row = by_id.get(response_id)
+            if row is None or row.module != module:
+                continue
+            if row.grading_status == GradingService.PENDING:
+                still_pending.append(response_id)
+            elif row.is_correct is not None:
+                AdaptiveService.apply(state, policy, row.module, row.difficulty, row.is_correct)
+        state["pending"] = still_pending
+
+    @staticmethod
+    def replay(answers, policy=None, start_level: CEFRLevel = CEFRLevel.B2) -> tuple[list[CEFRLevel], dict]:
+        """
+        Offline replay: runs a policy over (module, difficulty, is_correct) answers in order
+        and returns (level after each answer, final state). Nothing is written.
+        """
+        policy = policy or AdaptiveService.get_policy()
+        state = AdaptiveService.new_state(start_level, policy.name)
+        levels = [AdaptiveService.apply(state, policy, m, d, c) for m, d, c in answers]
+        return levels, state
+
+    @staticmethod
+    def session_answers(session_id: int) -> list[tuple]:
+        """A finished session's answers as replay input, in submission order."""
+        rows = (
+            Response.query.options(joinedload(Response.question))
+            .filter(Response.session_id == session_id)
+            .order_by(Response.id.asc())
+            .all()
+        )
+        return [
+            (r.question.module, r.question.difficulty, r.is_correct)
+            for r in rows
+            if r.question is not None
+        ]
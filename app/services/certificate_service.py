@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from io import BytesIO
+
+from flask import current_app
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from app.extensions import db
+from app.models import Report, TestSession, User
+
+
+class CertificateService:
+    """
+    Certificate PDFs: the static template (background, border, logo, fixed wording) with the
+    per-candidate fields (name, level, score, date, ID) drawn on top.
+
+    Finished PDFs are kept in a per-process LRU keyed by session_id and an ETag derived from
+    report.updated_at and the overlaid fields, so repeat downloads (and the end-of-window
+    spikes) cost a dict lookup instead of a render, and revalidations get a 304.
+    """
+
+    PAGE_SIZE = landscape(letter)
+
+    _cache: OrderedDict[tuple[int, str], bytes] = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fields(session: TestSession, report: Report) -> dict[str, str]:
+        """Variable fields of one certificate (the holder is the session's student, not the viewer)."""
+        holder = db.session.get(User, session.user_id)
+        completed = session.end_time or report.created_at or datetime.utcnow()
+        return {
+            "name": holder.name if holder else "",
+            "level": report.level_result.value if report.level_result else "N/A",
+            "score": str(int(report.score or 0)),
+            "date": completed.strftime("%d.%m.%Y"),
+            "certificate_id": f"CERT-{session.id}-{session.user_id}",
+        }
+
+    @staticmethod
+    def _draw_template(c: canvas.Canvas) -> None:
+        width, height = CertificateService.PAGE_SIZE
+        title_font = "Helvetica-Bold"
+        # Use bold body text for better readability in the certificate
+        text_font = "Helvetica-Bold"
+
+        # Background color (light beige)
+        c.setFillColor(colors.HexColor("#f5f5f0"))
+        c.rect(0, 0, width, height, fill=1, stroke=0)
+
+        # Border
+        c.setLineWidth(3)
+        c.setStrokeColor(colors.HexColor("#6366f1"))
+        c.rect(0.5 * inch, 0.5 * inch, width - inch, height - inch, fill=0, stroke=1)
+
+        # Logo section (left side)
+        c.setFont("Helvetica-Bold", 16)
+        c.setFillColor(colors.HexColor("#6366f1"))
+        c.drawString(1 * inch, height - 1.2 * inch, "🎓 English AI")
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(colors.HexColor("#6366f1"))
+        c.drawString(1 * inch, height - 1.5 * inch, "Student Portal")
+
+        # Certificate title
+        c.setFont(title_font, 48)
+        c.setFillColor(colors.HexColor("#1a1a1a"))
+        c.drawCentredString(width / 2, height - 2.5 * inch, "Certificate of Achievement")
+
+        # "This certifies that" text
+        c.setFont(text_font, 14)
+        c.setFillColor(colors.HexColor("#333333"))
+        c.drawCentredString(width / 2, height - 3.2 * inch, "This certifies that")
+
+        # Achievement text
+        c.setFont(text_font, 13)
+        c.setFillColor(colors.HexColor("#333333"))
+        y_pos = height - 4.7 * inch
+        for line in (
+            "has successfully completed the",
+            "English AI Student Portal English Proficiency Test",
+            "and was awarded a certificate in",
+        ):
+            c.drawCentredString(width / 2, y_pos, line)
+            y_pos -= 0.3 * inch
+
+    @staticmethod
+    def _draw_fields(c: canvas.Canvas, fields: dict[str, str]) -> None:
+        width, height = CertificateService.PAGE_SIZE
+        y_pos = height - 4.7 * inch - 3 * 0.3 * inch
+
+        # User name (large and bold)
+        c.setFont("Helvetica-Bold", 36)
+        c.setFillColor(colors.HexColor("#1a1a1a"))
+        c.drawCentredString(width / 2, height - 3.9 * inch, fields["name"])
+
+        # Level result (prominent)
+        c.setFont("Helvetica-Bold", 32)
+        c.setFillColor(colors.HexColor("#6366f1"))
+        c.drawCentredString(width / 2, y_pos - 0.4 * inch, f"English Level - {fields['level']}")
+
+        # Score display
+        c.setFont("Helvetica-Bold", 12)
+        c.setFillColor(colors.HexColor("#333333"))
+        c.drawCentredString(width / 2, y_pos - 0.9 * inch, f"Overall Score: {fields['score']}%")
+
+        # Date and certificate ID/serial number
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(colors.HexColor("#333333"))
+        c.drawCentredString(width / 2 - 2 * inch, 1 * inch, f"Date: {fields['date']}")
+        c.drawCentredString(width / 2 + 2 * inch, 1 * inch, f"ID: {fields['certificate_id']}")
+
+    @staticmethod
+    def render(fields: dict[str, str]) -> bytes:
+        buf = BytesIO()
+        c = canvas.Canvas(buf, pagesize=CertificateService.PAGE_SIZE)
+        CertificateService._draw_template(c)
+        CertificateService._draw_fields(c, fields)
+        c.save()
+        return buf.getvalue()
+
+    @staticmethod
+    def version(session: TestSession, report: Report) -> tuple[str, dict[str, str]]:
+        """(etag, fields): the etag changes with report.updated_at or any overlaid field."""
+        fields = CertificateService.fields(session, report)
+        updated_at = report.updated_at.isoformat() if report.updated_at else ""
+        etag = hashlib.sha1(
+            json.dumps([session.id, updated_at, fields], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        return etag, fields
+
+    @staticmethod
+    def get(session_id: int, etag: str, fields: dict[str, str]) -> bytes:
+        """PDF bytes for one certificate version, rendered at most once per process."""
+        cls = CertificateService
+        key = (session_id, etag)
+        with cls._lock:
+            pdf = cls._cache.get(key)
+            if pdf is not None:
+                cls._cache.move_to_end(key)
+                return pdf
+
+        pdf = cls.render(fields)
+
+        max_entries = max(1, int(current_app.config.get("CERTIFICATE_CACHE_MAX_ENTRIES", 256) or 256))
+        with cls._lock:
+            # A newer report version supersedes the cached one for the same session
+            for stale in [k for k in cls._cache if k[0] == session_id and k != key]:
+                del cls._cache[stale]
+            cls._cache[key] = pdf
+            while len(cls._cache) > max_entries:
+                cls._cache.popitem(last=False)
+        return pdf
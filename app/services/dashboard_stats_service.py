@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.extensions import db, dialect_insert
+from app.models import (
+    DailyModuleStat,
+    DailySessionStat,
+    Question,
+    Report,
+    ReportStatus,
+    Response,
+    Student,
+    StudentStat,
+    TestSession,
+)
+
+
+class DashboardStatsService:
+    """
+    Materialised aggregates behind the instructor dashboard.
+
+    - daily_module_stats: responses / correct / wrong per (day, module)
+    - daily_session_stats: sessions started per day and their READY reports (count, score sum)
+    - student_stats: latest session + report per student and the level for the CEFR distribution
+
+    An after_flush hook turns every ORM change to Response, TestSession, Report and Student
+    into counter deltas / per-student refreshes in the same transaction, so the dashboard
+    only reads these small tables. Bulk statements bypass the ORM; call rebuild() after them
+    (the admin question-bank refresh does, and `flask --app run stats rebuild` is available).
+    Days are the UTC date the session started.
+    """
+
+    _listening = False
+    _lock = threading.Lock()
+    _checked = False
+
+    @staticmethod
+    def init_app(app) -> None:
+        with DashboardStatsService._lock:
+            if not DashboardStatsService._listening:
+                event.listen(Session, "after_flush", DashboardStatsService._after_flush)
+                DashboardStatsService._listening = True
+
+    # --- flush hook ------------------------------------------------------------
+
+    @staticmethod
+    def _committed(obj, attr: str):
+        """Value of `attr` before this flush (None if it had none)."""
+        hist = inspect(obj).attrs[attr].history
+        if hist.deleted:
+            return hist.deleted[0]
+        if hist.unchanged:
+            return hist.unchanged[0]
+        return None
+
+    @staticmethod
+    def _changed(obj, attr: str) -> bool:
+        return inspect(obj).attrs[attr].history.has_changes()
+
+    @staticmethod
+    def _day(value) -> date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str) and value:
+            return date.fromisoformat(value[:10])
+        return datetime.utcnow().date()
+
+    @staticmethod
+    def _lookup(session, conn, model, column, ids: set) -> dict:
+        """{id: column value}, from the identity map where possible, else one query."""
+        out = {}
+        missing = set()
+        for pk in ids:
+            if pk is None:
+                continue
+            obj = session.identity_map.get(identity_key(model, pk))
+            if obj is not None and column.key in obj.__dict__:
+                out[pk] = obj.__dict__[column.key]
+            else:
+                missing.add(pk)
+        if missing:
+            for pk, value in conn.execute(select(model.id, column).where(model.id.in_(missing))):
+                out[pk] = value
+        return out
+
+    @staticmethod
+    def _after_flush(session, flush_context) -> None:
+        responses, sessions, reports, students = [], [], [], []
+        for kind, objs in (("new", session.new), ("dirty", session.dirty), ("deleted", session.deleted)):
+            for obj in objs:
+                if isinstance(obj, Response):
+                    responses.append((kind, obj))
+                elif isinstance(obj, TestSession):
+                    sessions.append((kind, obj))
+                elif isinstance(obj, Report):
+                    reports.append((kind, obj))
+                elif isinstance(obj, Student):
+                    students.append((kind, obj))
+        if not (responses or sessions or reports or students):
+            return
+
+        conn = session.connection()
+        module_deltas: dict = defaultdict(lambda: [0, 0, 0])  # (day, module) -> [total, correct, wrong]
+        session_deltas: dict = defaultdict(lambda: [0, 0, 0.0])  # day -> [sessions, ready, score_sum]
+        refresh_students: set[int] = set()
+        drop_students: set[int] = set()
+
+        # Responses -> daily module counters
+        if responses:
+            questions = DashboardStatsService._lookup(
+                session, conn, Question, Question.module, {r.question_id for _k, r in responses}
+            )
+            starts = DashboardStatsService._lookup(
+                session, conn, TestSession, TestSession.start_time, {r.session_id for _k, r in responses}
+            )
+            for kind, resp in responses:
+                if kind == "dirty" and not DashboardStatsService._changed(resp, "is_correct"):
+                    continue
+                module = questions.get(resp.question_id)
+                if module is None:
+                    continue
+                delta = module_deltas[(DashboardStatsService._day(starts.get(resp.session_id)), module)]
+                if kind != "new":
+                    old = DashboardStatsService._committed(resp, "is_correct")
+                    delta[0] -= 1
+                    delta[1] -= 1 if old is True else 0
+                    delta[2] -= 1 if old is False else 0
+                if kind != "deleted":
+                    delta[0] += 1
+                    delta[1] += 1 if resp.is_correct is True else 0
+                    delta[2] += 1 if resp.is_correct is False else 0
+
+        # Sessions -> sessions per day, latest session per student
+        for kind, sess in sessions:
+            if kind == "dirty":
+                continue
+            session_deltas[DashboardStatsService._day(sess.start_time)][0] += 1 if kind == "new" else -1
+            refresh_students.add(sess.user_id)
+
+        # Reports -> READY count / score per day, latest report per student
+        if reports:
+            owners = DashboardStatsService._lookup(
+                session, conn, TestSession, TestSession.user_id, {r.session_id for _k, r in reports}
+            )
+            starts = DashboardStatsService._lookup(
+                session, conn, TestSession, TestSession.start_time, {r.session_id for _k, r in reports}
+            )
+
+            def _contribution(status, score) -> tuple[int, float]:
+                return (1, float(score or 0.0)) if status == ReportStatus.READY else (0, 0.0)
+
+            for kind, rep in reports:
+                if kind == "dirty" and not any(
+                    DashboardStatsService._changed(rep, a)
+                    for a in ("status", "score", "level_result", "module_stats_json")
+                ):
+                    continue
+                delta = session_deltas[DashboardStatsService._day(starts.get(rep.session_id))]
+                if kind != "new":
+                    n, total = _contribution(
+                        DashboardStatsService._committed(rep, "status"), DashboardStatsService._committed(rep, "score")
+                    )
+                    delta[1] -= n
+                    delta[2] -= total
+                if kind != "deleted":
+                    n, total = _contribution(rep.status, rep.score)
+                    delta[1] += n
+                    delta[2] += total
+                if owners.get(rep.session_id) is not None:
+                    refresh_students.add(owners[rep.session_id])
+
+        # Students -> own row (current_level feeds the CEFR distribution)
+        for kind, student in students:
+            if kind == "deleted":
+                drop_students.add(student.id)
+            elif kind == "new" or DashboardStatsService._changed(student, "current_level"):
+                refresh_students.add(student.id)
+
+        DashboardStatsService._apply_module_deltas(conn, module_deltas)
+        DashboardStatsService._apply_session_deltas(conn, session_deltas)
+        refresh_students -= drop_students
+        if drop_students:
+            conn.execute(delete(StudentStat).where(StudentStat.student_id.in_(drop_students)))
+        if refresh_students:
+            DashboardStatsService._refresh_students(session, conn, refresh_students)
+
+    # --- writers ---------------------------------------------------------------
+
+    @staticmethod
+    def _increment(conn, model, keys: dict, counters: dict) -> None:
+        """Adds `counters` to the row identified by `keys`, creating it if needed."""
+        if not any(counters.values()):
+            return
+        table = model.__table__
+        upsert = dialect_insert(conn)
+        if upsert is not None:
+            stmt = upsert(model).values(**keys, **counters)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+            )
+            conn.execute(stmt)
+            return
+        where = [table.c[k] == v for k, v in keys.items()]
+        result = conn.execute(
+            update(model).where(*where).values({name: table.c[name] + v for name, v in counters.items()})
+        )
+        if not result.rowcount:
+            conn.execute(insert(model).values(**keys, **counters))
+
+    @staticmethod
+    def _apply_module_deltas(conn, deltas: dict) -> None:
+        for (day, module), (total, correct, wrong) in deltas.items():
+            DashboardStatsService._increment(
+                conn, DailyModuleStat, {"day": day, "module": module}, {"total": total, "correct": correct, "wrong": wrong}
+            )
+
+    @staticmethod
+    def _apply_session_deltas(conn, deltas: dict) -> None:
+        for day, (sessions, ready, score_sum) in deltas.items():
+            DashboardStatsService._increment(
+                conn,
+                DailySessionStat,
+                {"day": day},
+                {"sessions": sessions, "ready_reports": ready, "ready_score_sum": score_sum},
+            )
+
+    @staticmethod
+    def _student_rows(conn, student_levels: dict, only_these: bool = True) -> list[dict]:
+        """student_stats rows for {student_id: current_level} (latest session by start_time, then id)."""
+        latest = (
+            select(
+                TestSession.user_id,
+                TestSession.id,
+                TestSession.start_time,
+                func.row_number()
+                .over(partition_by=TestSession.user_id, order_by=(TestSession.start_time.desc(), TestSession.id.desc()))
+                .label("rn"),
+            )
+            .where(TestSession.user_id.in_(list(student_levels)) if only_these else True)
+            .subquery()
+        )
+        # First report per session, as Report.query.filter_by(session_id=...).first()
+        first_report = (
+            select(Report.session_id, func.min(Report.id).label("report_id")).group_by(Report.session_id).subquery()
+        )
+        rows = conn.execute(
+            select(
+                latest.c.user_id,
+                latest.c.id,
+                latest.c.start_time,
+                Report.status,
+                Report.score,
+                Report.level_result,
+                Report.module_stats_json,
+            )
+            .select_from(latest)
+            .outerjoin(first_report, first_report.c.session_id == latest.c.id)
+            .outerjoin(Report, Report.id == first_report.c.report_id)
+            .where(latest.c.rn == 1)
+        ).all()
+        by_student = {r[0]: r for r in rows}
+
+        out = []
+        now = datetime.utcnow()
+        for student_id, current_level in student_levels.items():
+            r = by_student.get(student_id)
+            report_level = r[5] if r else None
+            out.append(
+                {
+                    "student_id": student_id,
+                    "latest_session_id": r[1] if r else None,
+                    "latest_started_at": r[2] if r else None,
+                    "report_status": r[3] if r else None,
+                    "report_score": r[4] if r else None,
+                    "report_level": report_level,
+                    "module_stats_json": r[6] if r else None,
+                    "level": report_level or current_level,
+                    "updated_at": now,
+                }
+            )
+        return out
+
+    @staticmethod
+    def _refresh_students(session, conn, student_ids: set[int]) -> None:
+        # Users that are not students get no row
+        levels = DashboardStatsService._lookup(session, conn, Student, Student.current_level, student_ids)
+        if not levels:
+            return
+        rows = DashboardStatsService._student_rows(conn, levels)
+        upsert = dialect_insert(conn)
+        if upsert is not None:
+            # Upsert, so concurrent transactions refreshing the same student do not collide on the key
+            stmt = upsert(StudentStat).values(rows)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["student_id"],
+                    set_={name: stmt.excluded[name] for name in rows[0] if name != "student_id"},
+                )
+            )
+            return
+        conn.execute(delete(StudentStat).where(StudentStat.student_id.in_(list(levels))))
+        conn.execute(insert(StudentStat), rows)
+
+    # --- rebuild ---------------------------------------------------------------
+
+    @staticmethod
+    def rebuild() -> dict:
+        """Recomputes all stats tables from scratch and commits. Returns row counts."""
+        conn = db.session.connection()
+        conn.execute(delete(DailyModuleStat))
+        conn.execute(delete(DailySessionStat))
+        conn.execute(delete(StudentStat))
+
+        day_col = func.date(TestSession.start_time)
+        module_counts: dict = defaultdict(lambda: [0, 0, 0])
+        for day, module, is_correct, n in conn.execute(
+            select(day_col, Question.module, Response.is_correct, func.count(Response.id))
+            .select_from(Response)
+            .join(Question, Question.id == Response.question_id)
+            .join(TestSession, TestSession.id == Response.session_id)
+            .group_by(day_col, Question.module, Response.is_correct)
+        ):
+            c = module_counts[(DashboardStatsService._day(day), module)]
+            c[0] += n
+            c[1] += n if is_correct is True else 0
+            c[2] += n if is_correct is False else 0
+        if module_counts:
+            conn.execute(
+                insert(DailyModuleStat),
+                [
+                    {"day": day, "module": module, "total": t, "correct": c, "wrong": w}
+                    for (day, module), (t, c, w) in module_counts.items()
+                ],
+            )
+
+        session_counts: dict = defaultdict(lambda: [0, 0, 0.0])
+        for day, n in conn.execute(select(day_col, func.count(TestSession.id)).group_by(day_col)):
+            session_counts[DashboardStatsService._day(day)][0] += n
+        for day, n, score_sum in conn.execute(
+            select(day_col, func.count(Report.id), func.coalesce(func.sum(Report.score), 0.0))
+            .select_from(Report)
+            .join(TestSession, TestSession.id == Report.session_id)
+            .where(Report.status == ReportStatus.READY)
+            .group_by(day_col)
+        ):
+            c = session_counts[DashboardStatsService._day(day)]
+            c[1] += n
+            c[2] += float(score_sum or 0.0)
+        if session_counts:
+            conn.execute(
+                insert(DailySessionStat),
+                [
+                    {"day": day, "sessions": s, "ready_reports": r, "ready_score_sum": t}
+                    for day, (s, r, t) in session_counts.items()
+                ],
+            )
+
+        levels = dict(conn.execute(select(Student.id, Student.current_level)).all())
+        if levels:
+            conn.execute(insert(StudentStat), DashboardStatsService._student_rows(conn, levels, only_these=False))
+        db.session.commit()
+        return {
+            "daily_module_stats": len(module_counts),
+            "daily_session_stats": len(session_counts),
+            "student_stats": len(levels),
+        }
+
+    @staticmethod
+    def ensure_built() -> None:
+        """Builds the tables once per process if they are missing rows (e.g. first run on an existing DB)."""
+        if DashboardStatsService._checked:
+            return
+        students = db.session.query(func.count(Student.id)).scalar() or 0
+        stats = db.session.query(func.count(StudentStat.student_id)).scalar() or 0
+        if stats != students:
+            DashboardStatsService.rebuild()
+        DashboardStatsService._checked = True
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+
+from sqlalchemy import delete, insert, select, update
+
+from app.extensions import db, dialect_insert
+from app.models import ExamContent, ExamState
+
+
+class ExamStateStore:
+    """
+    Server-side exam state, so nothing exam-specific rides in the signed cookie and any worker
+    can serve any exam request.
+
+    - exam_state: small per-session values keyed by (session_id, key), e.g. the content id of
+      the reading passage version a candidate is reading.
+    - exam_content: content-addressed material bodies (id = sha256), written once per version
+      and cached in-process once read (they never change).
+
+    Writes are only flushed: they belong to the caller's request transaction, which commits
+    (or rolls back) them together with the answer / session changes they go with.
+    """
+
+    _content_cache: dict[str, str] = {}
+    _content_lock = threading.Lock()
+
+    @staticmethod
+    def get(session_id: int, key: str) -> str | None:
+        return db.session.execute(
+            select(ExamState.value).where(ExamState.session_id == session_id, ExamState.key == key)
+        ).scalar()
+
+    @staticmethod
+    def set(session_id: int, key: str, value: str) -> None:
+        upsert = dialect_insert()
+        if upsert is not None:
+            stmt = upsert(ExamState).values(session_id=session_id, key=key, value=value)
+            db.session.execute(
+                stmt.on_conflict_do_update(index_elements=["session_id", "key"], set_={"value": stmt.excluded.value})
+            )
+        else:
+            result = db.session.execute(
+                update(ExamState)
+                .where(ExamState.session_id == session_id, ExamState.key == key)
+                .values(value=value)
+            )
+            if not result.rowcount:
+                db.session.execute(insert(ExamState).values(session_id=session_id, key=key, value=value))
+        db.session.flush()
+
+    @staticmethod
+    def delete(session_id: int, key: str | None = None) -> None:
+        """Drops one key, or all state of the session when key is None."""
+        stmt = delete(ExamState).where(ExamState.session_id == session_id)
+        if key is not None:
+            stmt = stmt.where(ExamState.key == key)
+        db.session.execute(stmt)
+        db.session.flush()
+
+    @staticmethod
+    def put_content(kind: str, body: str) -> str:
+        """
+        Makes sure `body` is stored and returns its content id. The insert-if-missing is flushed
+        with the caller's transaction (one statement per call, so a rolled-back request cannot
+        leave an id pointing at nothing).
+        """
+        content_id = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        upsert = dialect_insert()
+        if upsert is not None:
+            db.session.execute(
+                upsert(ExamContent)
+                .values(id=content_id, kind=kind, body=body)
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+        elif db.session.get(ExamContent, content_id) is None:
+            db.session.add(ExamContent(id=content_id, kind=kind, body=body))
+        db.session.flush()
+        return content_id
+
+    @staticmethod
+    def content(content_id: str) -> str | None:
+        body = ExamStateStore._content_cache.get(content_id)
+        if body is not None:
+            return body
+        body = db.session.execute(select(ExamContent.body).where(ExamContent.id == content_id)).scalar()
+        if body is not None:
+            with ExamStateStore._content_lock:
+                ExamStateStore._content_cache[content_id] = body
+        return body
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import current_app
+
+
+class GenerationExecutor:
+    """
+    Runs independent question-generation requests (per module / per batch) in parallel.
+
+    run() fans tasks out on a bounded thread pool, each task inside its own app context,
+    and returns their results in order. Leaf LLM calls wrap themselves in slot(), which
+    enforces the process-wide limits: at most GENERATION_MAX_CONCURRENCY requests in
+    flight and GENERATION_RATE_LIMIT_PER_MINUTE request starts (token bucket, 0 = off).
+    Only leaves take a slot, so nested fan-outs (modules -> batches) cannot deadlock.
+    """
+
+    _init_lock = threading.Lock()
+    _slots: threading.BoundedSemaphore | None = None
+    _rate_lock = threading.Lock()
+    _tokens = 0.0
+    _last = 0.0
+
+    @staticmethod
+    def _max_concurrency() -> int:
+        return max(1, int(current_app.config.get("GENERATION_MAX_CONCURRENCY", 4) or 4))
+
+    @staticmethod
+    def _get_slots() -> threading.BoundedSemaphore:
+        if GenerationExecutor._slots is None:
+            with GenerationExecutor._init_lock:
+                if GenerationExecutor._slots is None:
+                    size = GenerationExecutor._max_concurrency()
+                    GenerationExecutor._tokens = float(size)
+                    GenerationExecutor._last = time.monotonic()
+                    GenerationExecutor._slots = threading.BoundedSemaphore(size)
+        return GenerationExecutor._slots
+
+    @staticmethod
+    def _throttle() -> None:
+        per_minute = float(current_app.config.get("GENERATION_RATE_LIMIT_PER_MINUTE", 0) or 0)
+        if per_minute <= 0:
+            return
+        rate = per_minute / 60.0
+        burst = float(GenerationExecutor._max_concurrency())
+        with GenerationExecutor._rate_lock:
+            now = time.monotonic()
+            tokens = min(burst, GenerationExecutor._tokens + (now - GenerationExecutor._last) * rate)
+            GenerationExecutor._last = now
+            # Reserve a token now (may go negative) and sleep until it is earned.
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            GenerationExecutor._tokens = tokens - 1
+        if wait > 0:
+            time.sleep(wait)
+
+    @staticmethod
+    @contextmanager
+    def slot():
+        """Hold one LLM request slot (concurrency + rate limit) for the duration of the block."""
+        slots = GenerationExecutor._get_slots()
+        slots.acquire()
+        try:
+            GenerationExecutor._throttle()
+            yield
+        finally:
+            slots.release()
+
+    @staticmethod
+    def run(tasks: list, label: str = "generation") -> list:
+        """
+        Runs zero-argument callables concurrently and returns their results in order.
+        A task that raises is logged and yields None.
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        app = current_app._get_current_object()
+
+        def _guarded(task):
+            try:
+                return task()
+            except Exception as e:
+                app.logger.warning(f"{label} task failed: {e}")
+                return None
+
+        def _call(task):
+            with app.app_context():
+                return _guarded(task)
+
+        if len(tasks) == 1:
+            # Nothing to overlap with; run in the caller's thread and app context.
+            return [_guarded(tasks[0])]
+
+        workers = min(len(tasks), GenerationExecutor._max_concurrency())
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=label) as pool:
+            return list(pool.map(_call, tasks))
@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import current_app
+from app.extensions import db
+from app.models import Response, CEFRLevel
+from app.services.nlp_service import NLPService
+
+
+class GradingService:
+    """
+    Background grading of open-ended (Writing/Speaking) answers.
+
+    The exam POST stores the Response immediately with grading_status="pending" and
+    enqueues its session here; a small worker pool grades all pending answers of the
+    session in one batched LLM call and fills in is_correct. Submissions that arrive
+    while a session's job is still queued ride along with that job.
+    Report generation calls reconcile_session() so no pending grade is left behind
+    (including ones whose worker was lost to a process restart).
+    """
+
+    PENDING = "pending"
+    GRADED = "graded"
+
+    _executor: ThreadPoolExecutor | None = None
+    _lock = threading.Lock()
+    # session_id -> futures still running for that session
+    _inflight: dict[int, set] = {}
+    # sessions with a job submitted but not started yet
+    _queued: set[int] = set()
+
+    @staticmethod
+    def _get_executor() -> ThreadPoolExecutor:
+        if GradingService._executor is None:
+            with GradingService._lock:
+                if GradingService._executor is None:
+                    workers = int(current_app.config.get("GRADING_WORKERS", 4) or 4)
+                    GradingService._executor = ThreadPoolExecutor(
+                        max_workers=max(1, workers), thread_name_prefix="grading"
+                    )
+        return GradingService._executor
+
+    @staticmethod
+    def mark_pending(resp: Response, level: CEFRLevel) -> None:
+        resp.is_correct = None
+        resp.grading_status = GradingService.PENDING
+        resp.grading_level = level
+
+    @staticmethod
+    def enqueue(resp: Response) -> None:
+        """Schedule grading for a committed pending response (returns immediately)."""
+        app = current_app._get_current_object()
+        session_id = resp.session_id
+        executor = GradingService._get_executor()
+
+        with GradingService._lock:
+            if session_id in GradingService._queued:
+                # A job for this session has not started yet; it will pick this answer up.
+                return
+            GradingService._queued.add(session_id)
+            future = executor.submit(GradingService._run, app, session_id)
+            GradingService._inflight.setdefault(session_id, set()).add(future)
+
+        def _done(f):
+            with GradingService._lock:
+                pending = GradingService._inflight.get(session_id)
+                if pending is not None:
+                    pending.discard(f)
+                    if not pending:
+                        GradingService._inflight.pop(session_id, None)
+
+        future.add_done_callback(_done)
+
+    @staticmethod
+    def _run(app, session_id: int) -> None:
+        with GradingService._lock:
+            GradingService._queued.discard(session_id)
+        with app.app_context():
+            try:
+                GradingService.grade_pending([session_id])
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Background grading failed for session {session_id}: {e}")
+
+    @staticmethod
+    def grade_pending(session_ids: list[int] | None = None, limit: int | None = None) -> int:
+        """
+        Grades pending open-ended responses (of the given sessions, or of all sessions)
+        with batched LLM calls and commits. Returns the number of responses graded.
+        """
+        query = Response.query.filter(Response.grading_status == GradingService.PENDING)
+        if session_ids is not None:
+            query = query.filter(Response.session_id.in_(session_ids))
+        pending = query.order_by(Response.id.asc()).limit(limit).all()
+        if not pending:
+            return 0
+
+        items = []
+        for resp in pending:
+            level = resp.grading_level or (resp.session.current_difficulty if resp.session else None)
+            items.append(
+                {
+                    "id": resp.id,
+                    "question": resp.question.text if resp.question else "",
+                    "answer": resp.text_answer or "",
+                    "level": level.value if level else "B2",
+                }
+            )
+        verdicts = NLPService.evaluate_open_ended_batch(items)
+
+        # The student may have edited an answer while the LLM was running;
+        # in that case a newer job owns its grade.
+        graded = 0
+        answers = {it["id"]: it["answer"] for it in items}
+        for resp in pending:
+            db.session.refresh(resp)
+            if resp.grading_status != GradingService.PENDING:
+                continue
+            if (resp.text_answer or "") != answers[resp.id] or resp.id not in verdicts:
+                continue
+            resp.is_correct = bool(verdicts[resp.id])
+            resp.grading_status = GradingService.GRADED
+            graded += 1
+        db.session.commit()
+        return graded
+
+    @staticmethod
+    def reconcile_session(session_id: int) -> int:
+        """
+        Makes sure every open-ended response of a session is graded: waits (bounded)
+        for in-flight workers, then grades whatever is still pending inline.
+        Returns the number of responses graded inline.
+        """
+        with GradingService._lock:
+            futures = set(GradingService._inflight.get(session_id) or ())
+        if futures:
+            timeout = float(current_app.config.get("GRADING_RECONCILE_TIMEOUT_SECONDS", 30) or 30)
+            wait(futures, timeout=timeout)
+            db.session.expire_all()
+        return GradingService.grade_pending([session_id])
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-from collections import Counter, defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any
@@ -11,14 +10,14 @@ from sqlalchemy import case, func
 from app.extensions import db
 from app.models import (
     CEFRLevel,
+    DailyModuleStat,
+    DailySessionStat,
     ModuleType,
-    Question,
-    Report,
-    ReportStatus,
-    Response,
     Student,
-    TestSession,
+    StudentStat,
 )
+from app.services.dashboard_stats_service import DashboardStatsService
+from app.services.session_score_service import SessionScoreService
 
 
 @dataclass(frozen=True)
@@ -30,126 +29,97 @@ class InstructorDashboardData:
 
 
 class InstructorDashboardService:
+    MODULE_ORDER = [
+        ModuleType.VOCABULARY.value,
+        ModuleType.GRAMMAR.value,
+        ModuleType.READING.value,
+        ModuleType.WRITING.value,
+        ModuleType.LISTENING.value,
+        ModuleType.SPEAKING.value,
+    ]
+
+    @staticmethod
+    def _module_scores_for_session(session_id: int) -> dict[str, float]:
+        if not session_id:
+            return {}
+        scores = SessionScoreService.for_session(session_id)
+        out: dict[str, float] = {}
+        for name in InstructorDashboardService.MODULE_ORDER:
+            pct = scores.module_percentage(ModuleType(name))
+            if pct is not None:
+                out[name] = pct
+        return out
+
+    @staticmethod
+    def _stored_module_scores(module_stats_json: str | None) -> dict[str, float]:
+        module_scores: dict[str, float] = {}
+        if module_stats_json:
+            try:
+                raw = json.loads(module_stats_json)
+                if isinstance(raw, dict):
+                    for k in InstructorDashboardService.MODULE_ORDER:
+                        v = raw.get(k)
+                        if isinstance(v, (int, float)):
+                            module_scores[k] = float(v)
+            except Exception:
+                module_scores = {}
+        return module_scores
+
     @staticmethod
     def build(*, days: int = 7, max_rows: int = 8) -> InstructorDashboardData:
         """Builds instructor dashboard data.
 
         Notes:
-        - Designed for demo-scale SQLite: uses a few simple queries + small N+1 loops.
+        - Reads the materialised stats tables (see DashboardStatsService): a handful of indexed
+          reads instead of per-student lookups and scans over responses.
+        - Time-window figures cover the last `days` calendar days (UTC, by session start).
         - Uses latest session/report per student when available.
         """
+        DashboardStatsService.ensure_built()
 
-        since_dt = datetime.utcnow() - timedelta(days=days)
+        now = datetime.utcnow()
+        since_dt = now - timedelta(days=days)
+        first_day = now.date() - timedelta(days=days - 1)
 
         total_students = Student.query.count()
 
-        active_student_ids = (
-            db.session.query(TestSession.user_id)
-            .filter(TestSession.start_time >= since_dt)
-            .distinct()
-            .all()
-        )
-        active_this_week = len([r[0] for r in active_student_ids])
-
-        # Completion rate: % of sessions with a READY report (overall, last N days)
-        sessions_total = db.session.query(func.count(TestSession.id)).filter(TestSession.start_time >= since_dt).scalar() or 0
-        sessions_ready = (
-            db.session.query(func.count(Report.id))
-            .join(TestSession, TestSession.id == Report.session_id)
-            .filter(TestSession.start_time >= since_dt)
-            .filter(Report.status == ReportStatus.READY)
+        active_this_week = (
+            db.session.query(func.count(StudentStat.student_id))
+            .filter(StudentStat.latest_started_at >= since_dt)
             .scalar()
             or 0
         )
-        completion_rate = round((sessions_ready / sessions_total * 100.0), 1) if sessions_total else 0.0
 
+        # Sessions per day + READY reports of those sessions (last N days)
+        day_rows = DailySessionStat.query.filter(DailySessionStat.day >= first_day).all()
+        sessions_total = sum(r.sessions for r in day_rows)
+        sessions_ready = sum(r.ready_reports for r in day_rows)
+        ready_score_sum = sum(r.ready_score_sum for r in day_rows)
+
+        # Completion rate: % of sessions with a READY report
+        completion_rate = round((sessions_ready / sessions_total * 100.0), 1) if sessions_total else 0.0
         # Avg score from READY reports in timeframe
-        avg_score = (
-            db.session.query(func.avg(Report.score))
-            .join(TestSession, TestSession.id == Report.session_id)
-            .filter(TestSession.start_time >= since_dt)
-            .filter(Report.status == ReportStatus.READY)
-            .scalar()
+        avg_score = round(ready_score_sum / sessions_ready, 1) if sessions_ready else 0.0
+
+        # Leaderboard rows: latest session/report per student, best overall first
+        rows = (
+            db.session.query(StudentStat, Student)
+            .join(Student, Student.id == StudentStat.student_id)
+            .filter(StudentStat.latest_session_id.isnot(None))
+            .order_by(
+                case((StudentStat.report_score.is_(None), 1), else_=0),
+                StudentStat.report_score.desc(),
+                Student.id.desc(),
+            )
+            .limit(max_rows)
+            .all()
         )
-        avg_score = round(float(avg_score), 1) if avg_score is not None else 0.0
-
-        # Leaderboard rows: latest session/report per student
-        students = Student.query.order_by(Student.id.desc()).limit(max(50, max_rows * 6)).all()
         leaderboard: list[dict[str, Any]] = []
-
-        module_order = [
-            ModuleType.VOCABULARY.value,
-            ModuleType.GRAMMAR.value,
-            ModuleType.READING.value,
-            ModuleType.WRITING.value,
-            ModuleType.LISTENING.value,
-            ModuleType.SPEAKING.value,
-        ]
-
-        level_dist: Counter[str] = Counter()
-
-        def _module_scores_for_session(session_id: int) -> dict[str, float]:
-            if not session_id:
-                return {}
-            totals = (
-                db.session.query(Question.module, func.count(Response.id))
-                .join(Response, Response.question_id == Question.id)
-                .filter(Response.session_id == session_id)
-                .group_by(Question.module)
-                .all()
-            )
-            corrects = (
-                db.session.query(Question.module, func.count(Response.id))
-                .join(Response, Response.question_id == Question.id)
-                .filter(Response.session_id == session_id)
-                .filter(Response.is_correct == True)  # noqa: E712
-                .group_by(Question.module)
-                .all()
-            )
-            total_by_mod = {m.value if m else "": int(c or 0) for (m, c) in totals}
-            corr_by_mod = {m.value if m else "": int(c or 0) for (m, c) in corrects}
-            out: dict[str, float] = {}
-            for name in module_order:
-                t = total_by_mod.get(name, 0)
-                if t <= 0:
-                    continue
-                out[name] = round((corr_by_mod.get(name, 0) / t) * 100.0, 1)
-            return out
-
-        for s in students:
-            last_session = (
-                TestSession.query.filter_by(user_id=s.id)
-                .order_by(TestSession.start_time.desc())
-                .first()
-            )
-            if not last_session:
-                # Still include student in distribution using current_level
-                if s.current_level:
-                    level_dist[s.current_level.value] += 1
-                continue
-
-            last_report = Report.query.filter_by(session_id=last_session.id).first()
-            level_val = last_report.level_result.value if (last_report and last_report.level_result) else None
-
-            # Distribution: prefer latest report level; otherwise student's current_level
-            dist_level = level_val or (s.current_level.value if s.current_level else None)
-            if dist_level:
-                level_dist[dist_level] += 1
-
-            module_scores: dict[str, float] = {}
-            if last_report and last_report.module_stats_json:
-                try:
-                    raw = json.loads(last_report.module_stats_json)
-                    if isinstance(raw, dict):
-                        for k in module_order:
-                            v = raw.get(k)
-                            if isinstance(v, (int, float)):
-                                module_scores[k] = float(v)
-                except Exception:
-                    module_scores = {}
-
+        for stat, s in rows:
+            has_report = stat.report_status is not None
+            module_scores = InstructorDashboardService._stored_module_scores(stat.module_stats_json)
             if not module_scores:
-                module_scores = _module_scores_for_session(last_session.id)
+                module_scores = InstructorDashboardService._module_scores_for_session(stat.latest_session_id)
 
             leaderboard.append(
                 {
@@ -159,78 +129,58 @@ class InstructorDashboardService:
                         "email": s.email,
                         "level": getattr(s.current_level, "value", None),
                     },
-                    "last_attempt": last_session.start_time,
+                    "last_attempt": stat.latest_started_at,
                     "report": {
-                        "session_id": last_session.id,
-                        "overall": round(float(last_report.score or 0.0), 1) if last_report else None,
-                        "level": level_val,
-                        "status": (last_report.status.value if (last_report and last_report.status) else "No report"),
+                        "session_id": stat.latest_session_id,
+                        "overall": round(float(stat.report_score or 0.0), 1) if has_report else None,
+                        "level": stat.report_level.value if stat.report_level else None,
+                        "status": stat.report_status.value if has_report else "No report",
                     },
                     "module_scores": module_scores,
                 }
             )
 
-        # sort by overall desc when available
-        leaderboard.sort(key=lambda r: (r.get("report") or {}).get("overall") or -1, reverse=True)
-        leaderboard = leaderboard[:max_rows]
-
-        # CEFR distribution: ensure stable ordering A1..C2
-        cefr_levels = [lvl.value for lvl in CEFRLevel]
-        cefr_distribution = [{"level": lv, "count": int(level_dist.get(lv, 0))} for lv in cefr_levels]
+        # CEFR distribution: latest report level, else current_level; stable ordering A1..C2
+        level_dist = dict(
+            db.session.query(StudentStat.level, func.count(StudentStat.student_id))
+            .filter(StudentStat.level.isnot(None))
+            .group_by(StudentStat.level)
+            .all()
+        )
+        cefr_distribution = [{"level": lvl.value, "count": int(level_dist.get(lvl, 0))} for lvl in CEFRLevel]
 
-        # Average by module (directly from responses in timeframe, so it works even without reports)
+        # Average by module (from responses in timeframe, so it works even without reports)
         # avg = correct / total * 100
         mod_rows = (
             db.session.query(
-                Question.module,
-                func.count(Response.id).label("total"),
-                func.sum(case((Response.is_correct == True, 1), else_=0)).label("correct"),  # noqa: E712
+                DailyModuleStat.module,
+                func.sum(DailyModuleStat.total),
+                func.sum(DailyModuleStat.correct),
+                func.sum(DailyModuleStat.wrong),
             )
-            .join(Response, Response.question_id == Question.id)
-            .join(TestSession, TestSession.id == Response.session_id)
-            .filter(TestSession.start_time >= since_dt)
-            .group_by(Question.module)
+            .filter(DailyModuleStat.day >= first_day)
+            .group_by(DailyModuleStat.module)
             .all()
         )
-        totals_by_mod = {m.value if m else "": int(t or 0) for (m, t, _c) in mod_rows}
-        corr_by_mod = {m.value if m else "": int(c or 0) for (m, _t, c) in mod_rows}
+        totals_by_mod = {m.value: int(t or 0) for (m, t, _c, _w) in mod_rows}
+        corr_by_mod = {m.value: int(c or 0) for (m, _t, c, _w) in mod_rows}
 
         avg_by_module = []
-        for name in module_order:
+        for name in InstructorDashboardService.MODULE_ORDER:
             t = totals_by_mod.get(name, 0)
             c = corr_by_mod.get(name, 0)
             avg_by_module.append({"module": name, "avg": round((c / t) * 100.0, 1) if t else 0.0})
 
         # Attempts per day (last N days)
-        day_counts: dict[str, int] = defaultdict(int)
-        sessions = (
-            TestSession.query.filter(TestSession.start_time >= since_dt)
-            .order_by(TestSession.start_time.asc())
-            .all()
-        )
-        for sess in sessions:
-            d = (sess.start_time or datetime.utcnow()).date().isoformat()
-            day_counts[d] += 1
+        day_counts = {r.day.isoformat(): r.sessions for r in day_rows}
         attempts_series = []
         for i in range(days - 1, -1, -1):
-            d = (datetime.utcnow().date() - timedelta(days=i)).isoformat()
+            d = (now.date() - timedelta(days=i)).isoformat()
             attempts_series.append({"date": d, "count": int(day_counts.get(d, 0))})
 
         # Top mistake categories (by module, last N days)
-        wrong = (
-            db.session.query(Question.module, func.count(Response.id))
-            .join(Response, Response.question_id == Question.id)
-            .join(TestSession, TestSession.id == Response.session_id)
-            .filter(TestSession.start_time >= since_dt)
-            .filter(Response.is_correct == False)  # noqa: E712
-            .group_by(Question.module)
-            .order_by(func.count(Response.id).desc())
-            .limit(5)
-            .all()
-        )
-        top_mistakes = [
-            {"module": (m.value if m else "Unknown"), "count": int(c or 0)} for (m, c) in wrong
-        ]
+        wrong = sorted(((m, int(w or 0)) for (m, _t, _c, w) in mod_rows if w), key=lambda x: x[1], reverse=True)[:5]
+        top_mistakes = [{"module": m.value, "count": c} for (m, c) in wrong]
 
         return InstructorDashboardData(
             kpis={
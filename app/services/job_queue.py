@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+
+from app.extensions import db, dialect_insert
+from app.models import Job
+
+
+class JobQueue:
+    """
+    Persistent background jobs (report enrichment and friends) on the `jobs` table.
+
+    enqueue() inserts a row and returns; a fixed pool of worker threads per process
+    (JOB_WORKERS, 0 = none) and/or `flask --app run jobs work` processes claim due rows with a
+    conditional UPDATE (status queued -> running), so any number of workers can share the table
+    and each job runs once at a time. A failing job is retried with exponential backoff
+    (JOB_BACKOFF_SECONDS doubling up to JOB_BACKOFF_MAX_SECONDS) until JOB_MAX_ATTEMPTS, then
+    marked failed and its give-up hook runs.
+
+    Nothing lives only in memory: a job whose worker died is requeued once its lease
+    (JOB_LEASE_SECONDS) expires (or marked failed if that was its last attempt), and recover()
+    also re-enqueues work the registered kinds find orphaned (e.g. reports left ENRICHING by a
+    restart). Handlers must be idempotent. Finished rows are deleted after JOB_RETENTION_SECONDS.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    # kind -> (handler(**payload), on_give_up(error=..., **payload) | None)
+    _handlers: dict[str, tuple] = {}
+    # callables that enqueue orphaned work, run by recover()
+    _recoverers: list = []
+    _cond = threading.Condition()
+    _threads: list[threading.Thread] = []
+    _started = False
+    _last_stale_check = 0.0
+
+    @staticmethod
+    def init_app(app) -> None:
+        from app.services.report_service import ReportService
+
+        ReportService.register_jobs()
+
+        @app.before_request
+        def _start_job_workers():
+            if not JobQueue._started:
+                JobQueue.start(app)
+
+    @staticmethod
+    def register(kind: str, handler, on_give_up=None, recover=None) -> None:
+        JobQueue._handlers[kind] = (handler, on_give_up)
+        if recover is not None and recover not in JobQueue._recoverers:
+            JobQueue._recoverers.append(recover)
+
+    @staticmethod
+    def _cfg(name: str, default: float) -> float:
+        value = current_app.config.get(name, default)
+        return float(default if value is None else value)
+
+    # --- producers -----------------------------------------------------------
+
+    @staticmethod
+    def enqueue(
+        kind: str,
+        payload: dict | None = None,
+        *,
+        dedupe_key: str | None = None,
+        delay_seconds: float = 0,
+    ) -> bool:
+        """
+        Queues a job and commits. With a dedupe_key, nothing is added while a queued or running
+        job has the same key. Returns True when a row was inserted.
+        """
+        now = datetime.utcnow()
+        values = {
+            "kind": kind,
+            "payload_json": json.dumps(payload or {}),
+            "status": JobQueue.QUEUED,
+            "dedupe_key": dedupe_key,
+            "attempts": 0,
+            "max_attempts": max(1, int(JobQueue._cfg("JOB_MAX_ATTEMPTS", 5))),
+            "run_after": now + timedelta(seconds=delay_seconds),
+            "created_at": now,
+            "updated_at": now,
+        }
+        upsert = dialect_insert()
+        if dedupe_key and upsert is not None:
+            result = db.session.execute(
+                upsert(Job).values(**values).on_conflict_do_nothing(index_elements=["dedupe_key"])
+            )
+            inserted = bool(result.rowcount)
+        elif dedupe_key and db.session.execute(select(Job.id).where(Job.dedupe_key == dedupe_key)).first():
+            inserted = False
+        else:
+            db.session.execute(insert(Job).values(**values))
+            inserted = True
+        db.session.commit()
+
+        if inserted:
+            JobQueue.wake()
+        return inserted
+
+    @staticmethod
+    def wake() -> None:
+        with JobQueue._cond:
+            JobQueue._cond.notify()
+
+    # --- consumers -----------------------------------------------------------
+
+    @staticmethod
+    def start(app, workers: int | None = None) -> None:
+        """Starts this process's worker threads (once); the first one runs recover() first."""
+        with JobQueue._cond:
+            if JobQueue._started:
+                return
+            JobQueue._started = True
+            if workers is None:
+                workers = int(app.config.get("JOB_WORKERS", 4) or 0)
+            prefix = f"{socket.gethostname()}:{os.getpid()}"
+            for n in range(max(0, workers)):
+                thread = threading.Thread(
+                    target=JobQueue._worker,
+                    args=(app, f"{prefix}:{n}", n == 0),
+                    name=f"job-worker-{n}",
+                    daemon=True,
+                )
+                JobQueue._threads.append(thread)
+                thread.start()
+
+    @staticmethod
+    def _worker(app, worker_id: str, recover_first: bool) -> None:
+        if recover_first:
+            with app.app_context():
+                try:
+                    JobQueue.recover()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning(f"Job recovery failed: {e}")
+                finally:
+                    db.session.remove()
+
+        poll = float(app.config.get("JOB_POLL_SECONDS", 2) or 2)
+        while True:
+            ran = False
+            with app.app_context():
+                try:
+                    ran = JobQueue.run_next(worker_id)
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning(f"Job worker {worker_id} error: {e}")
+                finally:
+                    db.session.remove()
+            if not ran:
+                with JobQueue._cond:
+                    JobQueue._cond.wait(timeout=poll)
+
+    @staticmethod
+    def _claim(worker_id: str) -> Job | None:
+        now = datetime.utcnow()
+        for _ in range(5):
+            job_id = db.session.execute(
+                select(Job.id)
+                .where(Job.status == JobQueue.QUEUED, Job.run_after <= now)
+                .order_by(Job.run_after, Job.id)
+                .limit(1)
+            ).scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobQueue.QUEUED)
+                .values(status=JobQueue.RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(Job, job_id)
+            # Another worker claimed it first; try the next one
+        return None
+
+    @staticmethod
+    def run_next(worker_id: str) -> bool:
+        """Claims and runs one due job. Returns False when there was nothing to do."""
+        lease = JobQueue._cfg("JOB_LEASE_SECONDS", 600)
+        if time.monotonic() - JobQueue._last_stale_check > lease / 2:
+            JobQueue._last_stale_check = time.monotonic()
+            JobQueue.requeue_stale()
+            JobQueue.prune()
+
+        job = JobQueue._claim(worker_id)
+        if job is None:
+            return False
+
+        job_id, kind = job.id, job.kind
+        handler = JobQueue._handlers.get(kind, (None, None))[0]
+        try:
+            payload = json.loads(job.payload_json or "{}")
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind {kind!r}")
+            handler(**payload)
+        except Exception as e:
+            db.session.rollback()
+            error = f"{type(e).__name__}: {e}"
+            job = db.session.get(Job, job_id)
+            job.last_error = error
+            job.locked_by = None
+            job.locked_at = None
+            if job.attempts < job.max_attempts:
+                delay = JobQueue.backoff_seconds(job.attempts)
+                job.status = JobQueue.QUEUED
+                job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                current_app.logger.warning(
+                    f"Job {job_id} ({kind}) failed, attempt {job.attempts}/{job.max_attempts}; "
+                    f"retrying in {delay:.0f}s: {error}"
+                )
+                db.session.commit()
+                return True
+
+            job.status = JobQueue.FAILED
+            job.dedupe_key = None
+            current_app.logger.error(f"Job {job_id} ({kind}) gave up after {job.attempts} attempts: {error}")
+            db.session.commit()
+            JobQueue._give_up(job_id, kind, payload, error)
+            return True
+
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(status=JobQueue.DONE, dedupe_key=None, locked_by=None, locked_at=None, last_error=None)
+        )
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def _give_up(job_id: int, kind: str, payload: dict, error: str) -> None:
+        """Runs the give-up hook of a job that was just marked failed."""
+        on_give_up = JobQueue._handlers.get(kind, (None, None))[1]
+        if on_give_up is None:
+            return
+        try:
+            on_give_up(error=error, **payload)
+        except Exception as hook_error:
+            db.session.rollback()
+            current_app.logger.error(f"Give-up hook of job {job_id} ({kind}) failed: {hook_error}")
+
+    @staticmethod
+    def backoff_seconds(attempts: int) -> float:
+        base = JobQueue._cfg("JOB_BACKOFF_SECONDS", 15)
+        cap = JobQueue._cfg("JOB_BACKOFF_MAX_SECONDS", 600)
+        # Exponential, with jitter so jobs that failed together do not retry together
+        return min(cap, base * (2 ** max(0, attempts - 1))) * random.uniform(0.5, 1.0)
+
+    # --- recovery ------------------------------------------------------------
+
+    @staticmethod
+    def requeue_stale() -> int:
+        """
+        Puts running jobs whose lease expired (their worker died) back in the queue; those that
+        were on their last attempt are marked failed instead and their give-up hook runs.
+        Returns the number requeued.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=JobQueue._cfg("JOB_LEASE_SECONDS", 600))
+        expired = (Job.status == JobQueue.RUNNING, Job.locked_at < cutoff)
+
+        exhausted = db.session.execute(
+            select(Job.id, Job.kind, Job.payload_json, Job.attempts).where(*expired, Job.attempts >= Job.max_attempts)
+        ).all()
+        given_up = []
+        for job_id, kind, payload_json, attempts in exhausted:
+            error = f"Lease expired on its last attempt ({attempts}); the worker running it stopped"
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, *expired)
+                .values(status=JobQueue.FAILED, dedupe_key=None, locked_by=None, locked_at=None, last_error=error)
+            )
+            if result.rowcount == 1:
+                given_up.append((job_id, kind, payload_json, error))
+
+        result = db.session.execute(
+            update(Job)
+            .where(*expired, Job.attempts < Job.max_attempts)
+            .values(status=JobQueue.QUEUED, locked_by=None, locked_at=None, run_after=datetime.utcnow())
+        )
+        db.session.commit()
+        if result.rowcount:
+            current_app.logger.warning(f"Requeued {result.rowcount} job(s) with an expired lease")
+
+        for job_id, kind, payload_json, error in given_up:
+            current_app.logger.error(f"Job {job_id} ({kind}) gave up: {error}")
+            try:
+                payload = json.loads(payload_json or "{}")
+            except ValueError:
+                continue
+            JobQueue._give_up(job_id, kind, payload, error)
+        return result.rowcount or 0
+
+    @staticmethod
+    def prune(retention_seconds: float | None = None) -> int:
+        """
+        Deletes done and failed jobs last updated more than retention_seconds ago (default:
+        JOB_RETENTION_SECONDS; 0 keeps them forever). Returns the number deleted.
+        """
+        if retention_seconds is None:
+            retention_seconds = JobQueue._cfg("JOB_RETENTION_SECONDS", 7 * 24 * 3600)
+        if retention_seconds <= 0:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+        result = db.session.execute(
+            delete(Job).where(Job.status.in_((JobQueue.DONE, JobQueue.FAILED)), Job.updated_at < cutoff)
+        )
+        db.session.commit()
+        return result.rowcount or 0
+
+    @staticmethod
+    def recover() -> dict:
+        """Requeues expired leases and re-enqueues orphaned work (called when workers start)."""
+        requeued = JobQueue.requeue_stale()
+        enqueued = 0
+        for recoverer in JobQueue._recoverers:
+            enqueued += int(recoverer() or 0)
+        if enqueued:
+            current_app.logger.warning(f"Recovered {enqueued} orphaned job(s)")
+        return {"requeued": requeued, "enqueued": enqueued}
+
+    # --- introspection -------------------------------------------------------
+
+    @staticmethod
+    def snapshot() -> dict:
+        counts = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        oldest = (
+            db.session.query(func.min(Job.run_after))
+            .filter(Job.status == JobQueue.QUEUED, Job.run_after <= datetime.utcnow())
+            .scalar()
+        )
+        return {
+            "workers": len(JobQueue._threads),
+            "counts": {s: int(counts.get(s, 0)) for s in (JobQueue.QUEUED, JobQueue.RUNNING, JobQueue.DONE, JobQueue.FAILED)},
+            "oldest_due_seconds": int((datetime.utcnow() - oldest).total_seconds()) if oldest else 0,
+        }
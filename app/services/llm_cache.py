@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class MemoryCacheBackend:
+    """In-process LRU dict (per worker process)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, int(max_entries))
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, ttl: float) -> str | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, created_at = item
+            if ttl and time.time() - created_at > ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> int:
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache shared by all worker processes on a host (separate file from the app DB).
+    LRU is tracked through accessed_at; expired rows are dropped on read.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, ttl: float) -> str | None:
+        conn = self._conn()
+        row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        now = time.time()
+        if ttl and now - created_at > ttl:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return value
+
+    def set(self, key: str, value: str) -> int:
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        evicted = 0
+        if count > self.max_entries:
+            evicted = count - self.max_entries
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (evicted,),
+            )
+        conn.commit()
+        return evicted
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+
+    def size(self) -> int:
+        return int(self._conn().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM chat completions.
+
+    Key = sha256 of (model, temperature, max_tokens, system prompt, user prompt), so identical
+    requests are answered from the cache. Backend is chosen by LLM_CACHE_BACKEND:
+    "sqlite" (default, file under instance/), "memory" or "none".
+    """
+
+    _instance = None
+    _instance_config = None
+    _lock = threading.Lock()
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl = float(ttl_seconds or 0)
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0, "errors": 0}
+
+    @staticmethod
+    def get() -> "LLMCache | None":
+        cfg = current_app.config
+        kind = (cfg.get("LLM_CACHE_BACKEND") or "sqlite").lower()
+        path = cfg.get("LLM_CACHE_PATH") or os.path.join(current_app.instance_path, "llm_cache.sqlite")
+        max_entries = int(cfg.get("LLM_CACHE_MAX_ENTRIES", 5000) or 5000)
+        ttl = float(cfg.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600) or 0)
+        config_key = (kind, path, max_entries, ttl)
+
+        if LLMCache._instance_config == config_key:
+            return LLMCache._instance
+        with LLMCache._lock:
+            if LLMCache._instance_config != config_key:
+                if kind == "none":
+                    instance = None
+                elif kind == "memory":
+                    instance = LLMCache(MemoryCacheBackend(max_entries), ttl)
+                else:
+                    instance = LLMCache(SQLiteCacheBackend(path, max_entries), ttl)
+                LLMCache._instance = instance
+                LLMCache._instance_config = config_key
+        return LLMCache._instance
+
+    @staticmethod
+    def make_key(model: str, temperature, system_prompt: str, user_prompt: str, max_tokens=None) -> str:
+        payload = json.dumps(
+            [model, temperature, max_tokens, system_prompt or "", user_prompt or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def lookup(self, key: str) -> str | None:
+        try:
+            value = self.backend.get(key, self.ttl)
+        except Exception as e:
+            self._count("errors")
+            current_app.logger.warning(f"LLM cache read failed: {e}")
+            return None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def store(self, key: str, value: str) -> None:
+        try:
+            evicted = self.backend.set(key, value)
+        except Exception as e:
+            self._count("errors")
+            current_app.logger.warning(f"LLM cache write failed: {e}")
+            return
+        self._count("stores")
+        if evicted:
+            self._count("evictions", evicted)
+
+    def note_bypass(self) -> None:
+        self._count("bypassed")
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            data = dict(self.stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups * 100.0, 1) if lookups else 0.0
+        try:
+            data["entries"] = self.backend.size()
+        except Exception:
+            data["entries"] = None
+        data["backend"] = type(self.backend).__name__
+        return data
@@ -0,0 +1,303 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from flask import current_app
+from groq import Groq
+import groq
+from app.services.request_metrics import RequestMetrics
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised instead of calling Groq when the circuit is open or too many calls are in flight."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. CLOSED -> OPEN after `threshold` unhealthy calls in a row
+    (timeouts, connection errors, 429/5xx, or calls slower than the slow-call limit);
+    OPEN rejects calls for `cooldown` seconds, then HALF_OPEN lets one probe through:
+    success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def is_open(self, cooldown: float) -> bool:
+        with self._lock:
+            return self.state == CircuitBreaker.OPEN and time.monotonic() - self.opened_at < cooldown
+
+    def allow(self, cooldown: float) -> bool:
+        with self._lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN:
+                if time.monotonic() - self.opened_at < cooldown:
+                    return False
+                self.state = CircuitBreaker.HALF_OPEN
+                self._probing = False
+            # HALF_OPEN: one probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def cancel_probe(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, threshold: int) -> bool:
+        """Returns True if this failure tripped the breaker."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == CircuitBreaker.HALF_OPEN or (
+                self.state == CircuitBreaker.CLOSED and self.failures >= threshold
+            ):
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                return True
+            return False
+
+
+class LLMGateway:
+    """
+    Single path for all Groq calls (chat, speech-to-text, model listing).
+
+    - One pooled Groq client per (API key, timeout), reused by every thread.
+    - Per-call timeout (LLM_TIMEOUT_SECONDS); the SDK's own retries are off.
+    - Bounded retries with exponential backoff and full jitter for transient errors
+      (timeouts, connection errors, 429, 5xx), LLM_MAX_RETRIES.
+    - A circuit breaker (LLM_BREAKER_THRESHOLD / LLM_BREAKER_COOLDOWN_SECONDS) and a cap on
+      calls in flight (LLM_MAX_IN_FLIGHT) so a slow Groq fails fast into the callers'
+      offline fallbacks instead of holding request threads.
+    - Per-method latency histograms, error/retry counters and token usage for the admin
+      Performance page; call time is also charged to the current request (RequestMetrics).
+    """
+
+    LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    _client_lock = threading.Lock()
+    _clients: dict = {}
+    _slots: threading.BoundedSemaphore | None = None
+    _slots_size = 0
+    breaker = CircuitBreaker()
+
+    _stats_lock = threading.Lock()
+    _stats: dict = defaultdict(
+        lambda: {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "rejected": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "buckets": [0] * (len(LLMGateway.LATENCY_BUCKETS_MS) + 1),
+        }
+    )
+
+    # --- configuration -----------------------------------------------------
+
+    @staticmethod
+    def _cfg(name: str, default: float) -> float:
+        value = current_app.config.get(name, default)
+        return float(default if value is None else value)
+
+    @staticmethod
+    def client(api_key: str | None = None) -> Groq | None:
+        """Shared Groq client for the configured key (None when no key is configured)."""
+        api_key = api_key or current_app.config.get("GROQ_API_KEY")
+        if not api_key:
+            return None
+        timeout = LLMGateway._cfg("LLM_TIMEOUT_SECONDS", 30)
+        key = (api_key, timeout)
+        client = LLMGateway._clients.get(key)
+        if client is None:
+            with LLMGateway._client_lock:
+                client = LLMGateway._clients.get(key)
+                if client is None:
+                    client = Groq(api_key=api_key, timeout=timeout, max_retries=0)
+                    LLMGateway._clients[key] = client
+        return client
+
+    @staticmethod
+    def is_open() -> bool:
+        """True while the breaker rejects calls (callers can skip straight to their fallbacks)."""
+        return LLMGateway.breaker.is_open(LLMGateway._cfg("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+
+    @staticmethod
+    def _get_slots() -> threading.BoundedSemaphore:
+        size = max(1, int(LLMGateway._cfg("LLM_MAX_IN_FLIGHT", 16)))
+        if LLMGateway._slots is None or LLMGateway._slots_size != size:
+            with LLMGateway._client_lock:
+                if LLMGateway._slots is None or LLMGateway._slots_size != size:
+                    LLMGateway._slots = threading.BoundedSemaphore(size)
+                    LLMGateway._slots_size = size
+        return LLMGateway._slots
+
+    @staticmethod
+    def is_transient(exc: Exception) -> bool:
+        if isinstance(exc, (groq.APITimeoutError, groq.APIConnectionError, groq.RateLimitError)):
+            return True
+        return isinstance(exc, groq.APIStatusError) and getattr(exc, "status_code", 0) >= 500
+
+    # --- calls ---------------------------------------------------------------
+
+    @staticmethod
+    def call(method: str, fn):
+        """
+        Runs fn(client) through the breaker, in-flight cap, retry loop and metrics.
+        Raises LLMUnavailableError when rejected; other errors propagate after retries.
+        """
+        client = LLMGateway.client()
+        if client is None:
+            raise LLMUnavailableError("GROQ_API_KEY is not configured.")
+
+        cooldown = LLMGateway._cfg("LLM_BREAKER_COOLDOWN_SECONDS", 30)
+        threshold = max(1, int(LLMGateway._cfg("LLM_BREAKER_THRESHOLD", 5)))
+        retries = max(0, int(LLMGateway._cfg("LLM_MAX_RETRIES", 2)))
+        slow_ms = LLMGateway._cfg("LLM_SLOW_CALL_SECONDS", 15) * 1000.0
+
+        if not LLMGateway.breaker.allow(cooldown):
+            LLMGateway._count(method, "rejected")
+            raise LLMUnavailableError("LLM circuit is open; using offline fallback.")
+        slots = LLMGateway._get_slots()
+        if not slots.acquire(timeout=LLMGateway._cfg("LLM_QUEUE_TIMEOUT_SECONDS", 2)):
+            # Not a Groq failure; give a half-open probe back without judging it.
+            LLMGateway.breaker.cancel_probe()
+            LLMGateway._count(method, "rejected")
+            raise LLMUnavailableError("Too many LLM calls in flight; using offline fallback.")
+
+        try:
+            with RequestMetrics.track_llm():
+                attempt = 0
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        result = fn(client)
+                    except Exception as e:
+                        elapsed_ms = (time.perf_counter() - start) * 1000.0
+                        LLMGateway._observe(method, elapsed_ms, error=True)
+                        if not LLMGateway.is_transient(e):
+                            # Groq answered (e.g. 400/401): the service itself is reachable.
+                            LLMGateway.breaker.record_success()
+                            raise
+                        if LLMGateway.breaker.record_failure(threshold):
+                            current_app.logger.warning(f"LLM circuit opened after {method} failure: {e}")
+                            raise
+                        if attempt >= retries or LLMGateway.breaker.state != CircuitBreaker.CLOSED:
+                            raise
+                        attempt += 1
+                        LLMGateway._count(method, "retries")
+                        # Exponential backoff with full jitter
+                        time.sleep(random.uniform(0, min(4.0, 0.5 * (2 ** attempt))))
+                        continue
+
+                    elapsed_ms = (time.perf_counter() - start) * 1000.0
+                    LLMGateway._observe(method, elapsed_ms, usage=getattr(result, "usage", None))
+                    if slow_ms and elapsed_ms > slow_ms:
+                        if LLMGateway.breaker.record_failure(threshold):
+                            current_app.logger.warning(
+                                f"LLM circuit opened: {method} took {elapsed_ms:.0f} ms"
+                            )
+                    else:
+                        LLMGateway.breaker.record_success()
+                    return result
+        finally:
+            slots.release()
+
+    @staticmethod
+    def chat(method: str, messages: list, *, model: str, temperature: float, max_tokens: int | None = None) -> str:
+        """Chat completion; returns the message content ("" if empty)."""
+        kwargs = {"messages": messages, "model": model, "temperature": temperature}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        resp = LLMGateway.call(method, lambda client: client.chat.completions.create(**kwargs))
+        return (resp.choices[0].message.content if resp and resp.choices else "") or ""
+
+    @staticmethod
+    def transcribe(filepath: str, model: str):
+        def _run(client):
+            with open(filepath, "rb") as f:
+                return client.audio.transcriptions.create(model=model, file=f)
+
+        return LLMGateway.call("transcribe", _run)
+
+    @staticmethod
+    def list_models():
+        return LLMGateway.call("models.list", lambda client: client.models.list())
+
+    # --- metrics ---------------------------------------------------------------
+
+    @staticmethod
+    def _count(method: str, name: str) -> None:
+        with LLMGateway._stats_lock:
+            LLMGateway._stats[method][name] += 1
+
+    @staticmethod
+    def _observe(method: str, elapsed_ms: float, *, error: bool = False, usage=None) -> None:
+        bucket = len(LLMGateway.LATENCY_BUCKETS_MS)
+        for i, upper in enumerate(LLMGateway.LATENCY_BUCKETS_MS):
+            if elapsed_ms <= upper:
+                bucket = i
+                break
+        with LLMGateway._stats_lock:
+            s = LLMGateway._stats[method]
+            s["calls"] += 1
+            s["errors"] += 1 if error else 0
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+            s["buckets"][bucket] += 1
+            if usage is not None:
+                s["prompt_tokens"] += int(getattr(usage, "prompt_tokens", 0) or 0)
+                s["completion_tokens"] += int(getattr(usage, "completion_tokens", 0) or 0)
+
+    @staticmethod
+    def snapshot() -> dict:
+        with LLMGateway._stats_lock:
+            methods = {name: dict(s, buckets=list(s["buckets"])) for name, s in LLMGateway._stats.items()}
+        labels = [f"≤{ms / 1000:g}s" for ms in LLMGateway.LATENCY_BUCKETS_MS] + [
+            f">{LLMGateway.LATENCY_BUCKETS_MS[-1] / 1000:g}s"
+        ]
+        rows = []
+        for name, s in sorted(methods.items()):
+            calls = s["calls"] or 1
+            rows.append(
+                dict(
+                    s,
+                    method=name,
+                    avg_ms=round(s["total_ms"] / calls, 1),
+                    max_ms=round(s["max_ms"], 1),
+                )
+            )
+        breaker = LLMGateway.breaker
+        return {
+            "breaker_state": breaker.state,
+            "breaker_failures": breaker.failures,
+            "breaker_trips": breaker.trips,
+            "bucket_labels": labels,
+            "methods": rows,
+        }
+
+    @staticmethod
+    def reset_stats() -> None:
+        with LLMGateway._stats_lock:
+            LLMGateway._stats.clear()
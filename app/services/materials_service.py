@@ -0,0 +1,99 @@
+import pathlib
+import threading
+from flask import current_app
+from app.services.exam_state_store import ExamStateStore
+from app.services.question_bank_service import QuestionBankService
+
+
+class MaterialsService:
+    """
+    Process-wide registry of the parsed exam source files under data/
+    (reading passage/questions and the listening pool markdown files).
+
+    Every file is read and regex-parsed once; the result is kept in memory keyed by
+    its path and reused for as long as the file's (mtime, size) stamp is unchanged.
+    Editing a file on disk invalidates its entry and the next access re-parses it.
+
+    Returned question lists are shared between requests: treat them as read-only.
+    """
+
+    _lock = threading.Lock()
+    # (kind, path) -> (stamp, parsed value)
+    _entries: dict[tuple[str, str], tuple[tuple[int, int] | None, object]] = {}
+
+    @staticmethod
+    def _data_dir() -> pathlib.Path:
+        return pathlib.Path(current_app.root_path).parent / "data"
+
+    @staticmethod
+    def _stamp(path: pathlib.Path) -> tuple[int, int] | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _load(kind: str, path: pathlib.Path, parser):
+        key = (kind, str(path))
+        stamp = MaterialsService._stamp(path)
+        entry = MaterialsService._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        with MaterialsService._lock:
+            # Another thread may have parsed the same version while we waited.
+            entry = MaterialsService._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            value = parser(path)
+            MaterialsService._entries[key] = (stamp, value)
+            return value
+
+    @staticmethod
+    def _read_passage(path: pathlib.Path) -> str:
+        if not path.exists():
+            current_app.logger.warning(f"Reading passage file not found: {path}")
+            return ""
+        return path.read_text(encoding="utf-8").strip()
+
+    @staticmethod
+    def reading_passage() -> str:
+        path = MaterialsService._data_dir() / "reading" / "reading_passage"
+        return MaterialsService._load("reading_passage", path, MaterialsService._read_passage)
+
+    @staticmethod
+    def reading_passage_id() -> str | None:
+        """Content id of the current reading passage version (its body is stored in exam_content)."""
+        passage = MaterialsService.reading_passage()
+        return ExamStateStore.put_content("reading_passage", passage) if passage else None
+
+    @staticmethod
+    def reading_questions() -> tuple[dict, ...]:
+        path = MaterialsService._data_dir() / "reading" / "reading_questions"
+        return MaterialsService._load(
+            "reading_questions",
+            path,
+            lambda p: tuple(QuestionBankService._parse_reading_questions(p)),
+        )
+
+    @staticmethod
+    def listening_questions(pool: int, base_dir: pathlib.Path | None = None) -> tuple[dict, ...]:
+        """Parsed questions of listening pool 1/2 (part1 followed by part2), in file order."""
+        base_dir = base_dir or MaterialsService._data_dir() / "listening"
+        parsed: list[dict] = []
+        for part in (1, 2):
+            md_file = base_dir / f"pool{pool}_part{part}.md"
+            parsed.extend(
+                MaterialsService._load(
+                    "listening",
+                    md_file,
+                    lambda p: tuple(QuestionBankService._parse_md_questions(p)),
+                )
+            )
+        return tuple(parsed)
+
+    @staticmethod
+    def clear() -> None:
+        with MaterialsService._lock:
+            MaterialsService._entries.clear()
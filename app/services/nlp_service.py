@@ -1,15 +1,16 @@
 import os
-from groq import Groq
 from flask import current_app
 import json
 import re
 import math
 from collections import Counter
+from functools import partial
+from app.services.llm_cache import LLMCache
+from app.services.llm_gateway import LLMGateway
+from app.services.generation_executor import GenerationExecutor
 
 
 class NLPService:
-    _client = None
-    _client_key = None
     # Example guidance (from user-provided samples)
     GRAMMAR_EXAMPLES = (
         "Good evening and welcome to News Channel. I’m Jake Purple bringing you the latest news stories of the day. "
@@ -50,16 +51,77 @@ class NLPService:
     )
     @staticmethod
     def _get_client():
+        """
+        Shared Groq client, or None when AI is unavailable: no API key, or the LLM gateway's
+        circuit breaker is open (callers then take their offline fallbacks without waiting).
+        """
         api_key = current_app.config.get("GROQ_API_KEY")
         if not api_key:
             # If this is None, no Groq calls will happen (usage will stay at 0)
             current_app.logger.warning("GROQ_API_KEY is missing; Groq client not initialized.")
             return None
-        if NLPService._client and NLPService._client_key == api_key:
-            return NLPService._client
-        NLPService._client_key = api_key
-        NLPService._client = Groq(api_key=api_key)
-        return NLPService._client
+        if LLMGateway.is_open():
+            return None
+        return LLMGateway.client(api_key)
+
+    @staticmethod
+    def _chat(
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        model: str,
+        temperature: float,
+        max_tokens: int | None = None,
+        cache: bool = True,
+        expect_json: bool = False,
+        method: str = "chat",
+    ) -> str:
+        """
+        Single entry point for chat completions; returns the message content ("" if empty).
+        Responses are served from / stored in the LLM response cache (see LLMCache) unless
+        cache=False, which generation calls use because they must return fresh content.
+        With expect_json=True only content that parses (see _safe_json_load) is cached, so a
+        malformed completion is retried on the next call instead of replayed from the cache.
+        Calls go through LLMGateway (timeouts, retries, circuit breaker, per-`method` metrics);
+        API errors propagate so callers keep their own fallbacks.
+        """
+        client = NLPService._get_client()
+        if not client:
+            raise RuntimeError("Groq client is not configured.")
+
+        llm_cache = LLMCache.get()
+        key = None
+        if llm_cache is not None:
+            if cache:
+                key = LLMCache.make_key(model, temperature, system_prompt, user_prompt, max_tokens)
+                hit = llm_cache.lookup(key)
+                if hit is not None and (not expect_json or NLPService._parses_as_json(hit)):
+                    return hit
+            else:
+                llm_cache.note_bypass()
+
+        content = LLMGateway.chat(
+            method,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+        if key and content.strip() and (not expect_json or NLPService._parses_as_json(content)):
+            llm_cache.store(key, content)
+        return content
+
+    @staticmethod
+    def _parses_as_json(content: str) -> bool:
+        try:
+            NLPService._safe_json_load(content)
+            return True
+        except Exception:
+            return False
 
     @staticmethod
     def _ai_enabled() -> bool:
@@ -121,16 +183,14 @@ REQUIRED JSON FORMAT:
         """.strip()
 
         try:
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+            response_content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="generate_adaptive_question",
                 model="llama-3.3-70b-versatile",  # Groq fast model
                 temperature=0.3,
-            )
-
-            response_content = chat_completion.choices[0].message.content.strip()
+                cache=False,
+            ).strip()
 
             # Sometimes the model wraps output in ```json fences; strip them
             if "```" in response_content:
@@ -199,16 +259,14 @@ OUTPUT REQUIREMENTS:
         """.strip()
 
         try:
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+            response_content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="generate_10_mcq_for_module",
                 model="llama-3.3-70b-versatile",
                 temperature=0.4,
-            )
-
-            response_content = chat_completion.choices[0].message.content.strip()
+                cache=False,
+            ).strip()
             if "```" in response_content:
                 response_content = re.sub(r"```json\s*|\s*```", "", response_content)
 
@@ -287,16 +345,15 @@ Example:
 """.strip()
 
         try:
-            resp = client.chat.completions.create(
+            content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="generate_example_guided_open_ended",
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
                 temperature=0.4,
                 max_tokens=800,
+                cache=False,
             )
-            content = resp.choices[0].message.content if resp and resp.choices else ""
             if not content:
                 return []
 
@@ -347,17 +404,15 @@ question (string), options (object A-D), correct_answer ("A"|"B"|"C"|"D")
 """.strip()
 
         try:
-            resp = client.chat.completions.create(
+            content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="generate_example_guided_mcq",
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
                 temperature=0.4,
                 max_tokens=1200,
+                cache=False,
             )
-
-            content = resp.choices[0].message.content if resp and resp.choices else ""
             if not content:
                 return []
 
@@ -434,17 +489,15 @@ Output JSON with this schema:
 """.strip()
 
         try:
-            resp = client.chat.completions.create(
+            content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="generate_reading_set",
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
                 temperature=0.4,
                 max_tokens=1500,
+                cache=False,
             )
-
-            content = resp.choices[0].message.content if resp and resp.choices else ""
             if not content:
                 return []
 
@@ -649,12 +702,22 @@ Output JSON with this schema:
 
         return "<ul><li>" + "</li><li>".join(parts) + "</li></ul>"
 
+    # Bump when the writing/speaking analysis prompts change so stored analyses
+    # (ResponseAnalysis rows) are recomputed.
+    WRITING_ANALYSIS_VERSION = 1
+    SPEAKING_ANALYSIS_VERSION = 1
+
     @staticmethod
     def analyze_writing_response_ai(text: str, prompt: str | None = None) -> dict:
         """
         AI-assisted writing analysis using Groq. Returns same schema as analyze_writing_response.
         Falls back to local analysis when AI is unavailable or fails.
         """
+        return NLPService.writing_analysis_with_source(text, prompt)[0]
+
+    @staticmethod
+    def writing_analysis_with_source(text: str, prompt: str | None = None) -> tuple[dict, bool]:
+        """analyze_writing_response_ai plus whether the AI produced it (False: local fallback)."""
         raw = (text or "").strip()
         prompt_text = (prompt or "").strip()
 
@@ -663,16 +726,16 @@ Output JSON with this schema:
 
         # Skip AI analysis for very short answers to reduce calls
         if len(raw.split()) < 15:
-            return fallback
+            return fallback, False
 
         if not NLPService._ai_enabled():
-            return fallback
+            return fallback, False
         client = NLPService._get_client()
         if not client:
-            return fallback
+            return fallback, False
 
         if not raw:
-            return fallback
+            return fallback, False
 
         system_prompt = (
             "You are a strict NLP analysis engine. Output ONLY valid JSON."
@@ -697,21 +760,19 @@ Response:
 """.strip()
 
         try:
-            resp = client.chat.completions.create(
+            content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="analyze_writing_response_ai",
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
                 temperature=0.0,
                 max_tokens=300,
+                expect_json=True,
             )
-
-            content = resp.choices[0].message.content if resp and resp.choices else ""
             if not content:
-                return fallback
+                return fallback, False
 
-            data = json.loads(content)
+            data = NLPService._safe_json_load(content)
 
             # Basic schema safeguards
             data.setdefault("word_count", fallback.get("word_count", 0))
@@ -723,9 +784,9 @@ Response:
             data.setdefault("tense_distribution", fallback.get("tense_distribution", {"past": 0, "present": 0, "future": 0}))
             data.setdefault("warnings", fallback.get("warnings", []))
 
-            return data
+            return data, True
         except Exception:
-            return fallback
+            return fallback, False
 
     @staticmethod
     def analyze_speaking_response_ai(transcript: str, prompt: str | None = None) -> dict:
@@ -733,6 +794,11 @@ Response:
         AI-assisted speaking analysis based on transcript and prompt.
         Returns dict with summary, strengths, improvements, score_suggestion, and warnings.
         """
+        return NLPService.speaking_analysis_with_source(transcript, prompt)[0]
+
+    @staticmethod
+    def speaking_analysis_with_source(transcript: str, prompt: str | None = None) -> tuple[dict, bool]:
+        """analyze_speaking_response_ai plus whether the AI produced it (False: placeholder feedback)."""
         raw = (transcript or "").strip()
         prompt_text = (prompt or "").strip()
 
@@ -743,7 +809,7 @@ Response:
                 "improvements": ["Provide a spoken response to receive feedback."],
                 "score_suggestion": None,
                 "warnings": ["Speech-to-text transcript is empty."],
-            }
+            }, False
 
         # Skip AI analysis for very short transcripts to reduce calls
         if len(raw.split()) < 6:
@@ -753,7 +819,7 @@ Response:
                 "improvements": ["Provide a longer response to receive feedback."],
                 "score_suggestion": None,
                 "warnings": ["Transcript too short."],
-            }
+            }, False
 
         if not NLPService._ai_enabled():
             return {
@@ -762,7 +828,7 @@ Response:
                 "improvements": ["Try again later or enable AI feedback."],
                 "score_suggestion": None,
                 "warnings": ["AI feedback disabled."],
-            }
+            }, False
         client = NLPService._get_client()
         if not client:
             return {
@@ -771,7 +837,7 @@ Response:
                 "improvements": ["Try again later or enable AI feedback."],
                 "score_suggestion": None,
                 "warnings": ["GROQ_API_KEY is missing."],
-            }
+            }, False
 
         system_prompt = "You are a speaking assessment assistant. Output ONLY valid JSON. No code fences. Use list-style phrasing in arrays."
         user_prompt = f"""
@@ -789,17 +855,15 @@ Transcript:
 """.strip()
 
         try:
-            resp = client.chat.completions.create(
+            content = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="analyze_speaking_response_ai",
                 model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
                 temperature=0.0,
                 max_tokens=350,
+                expect_json=True,
             )
-
-            content = resp.choices[0].message.content if resp and resp.choices else ""
             if not content:
                 raise ValueError("Empty AI response")
 
@@ -819,7 +883,7 @@ Transcript:
             data.setdefault("improvements", [])
             data.setdefault("score_suggestion", None)
             data.setdefault("warnings", [])
-            return data
+            return data, True
         except Exception:
             return {
                 "summary": "AI feedback could not be generated.",
@@ -827,7 +891,7 @@ Transcript:
                 "improvements": ["Please try again later."],
                 "score_suggestion": None,
                 "warnings": ["AI feedback error."],
-            }
+            }, False
 
     @staticmethod
     def format_speaking_analysis(analysis: dict) -> str:
@@ -852,23 +916,33 @@ Transcript:
         Generate a question bank using the requested ETS prompt.
         Returns: { "Grammar": [q,...], ... }
         """
-        bank = {}
+        def _one(fn, *args, **kwargs):
+            with GenerationExecutor.slot():
+                return fn(*args, **kwargs)
+
+        # One task per generation request (per module, or per question on the one-by-one path),
+        # all issued concurrently within the configured concurrency/rate limits.
+        tasks, owners = [], []
         for m in modules:
             # Writing must always be open-ended
             if m.lower() == "writing":
-                bank[m] = NLPService.generate_writing_set(count=count_per_module, difficulty=difficulty)
-                continue
-
-            if int(count_per_module) == 10:
-                bank[m] = NLPService.generate_10_mcq_for_module(m, difficulty=difficulty)
+                tasks.append(partial(_one, NLPService.generate_writing_set, count=count_per_module, difficulty=difficulty))
+                owners.append(m)
+            elif int(count_per_module) == 10:
+                tasks.append(partial(_one, NLPService.generate_10_mcq_for_module, m, difficulty=difficulty))
+                owners.append(m)
             else:
                 # fallback: generate one-by-one
-                items = []
                 for _ in range(count_per_module):
-                    q = NLPService.generate_adaptive_question(m, difficulty)
-                    if q:
-                        items.append(q)
-                bank[m] = items
+                    tasks.append(partial(_one, NLPService.generate_adaptive_question, m, difficulty))
+                    owners.append(m)
+
+        bank = {m: [] for m in modules}
+        for m, result in zip(owners, GenerationExecutor.run(tasks, label="question-bank")):
+            if isinstance(result, list):
+                bank[m].extend(result)
+            elif result:
+                bank[m].append(result)
         return bank
 
     @staticmethod
@@ -896,16 +970,14 @@ Transcript:
         """
 
         try:
-            chat_completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+            text = NLPService._chat(
+                system_prompt,
+                user_prompt,
+                method="evaluate_open_ended",
                 model="llama3-8b-8192",
                 temperature=0.1,
-            )
-
-            text = chat_completion.choices[0].message.content.strip()
+                expect_json=True,
+            ).strip()
             # Clean JSON: extract only the JSON object from the response
             json_match = re.search(r"\{.*\}", text, re.DOTALL)
             if json_match:
@@ -917,3 +989,80 @@ Transcript:
             current_app.logger.error(f"Error evaluating open-ended response for '{question_text[:50]}...': {e}")
             # Default to True (pass) if evaluation fails, to be lenient
             return True
+
+    # Max answers graded per batch call (keeps prompt + output well inside the model context)
+    GRADING_BATCH_SIZE = 20
+
+    @staticmethod
+    def evaluate_open_ended_batch(items: list[dict]) -> dict:
+        """
+        Grade many open-ended answers with one chat completion per GRADING_BATCH_SIZE items.
+        items: [{"id": 1, "question": "...", "answer": "...", "level": "B2"}, ...]
+        Returns {id: passed}. Items whose verdict is missing from the batch output (or whose
+        batch failed to parse) are graded one-by-one via evaluate_open_ended.
+        """
+        if not items:
+            return {}
+        if not NLPService._ai_enabled():
+            return {it["id"]: True for it in items}
+        client = NLPService._get_client()
+        if not client:
+            return {it["id"]: True for it in items}
+
+        system_prompt = (
+            'You are an expert English teacher and CEFR evaluator. '
+            'Evaluate using contemporary standard English usage (2020s), focusing on communicative adequacy, '
+            'clarity, coherence, and appropriate vocabulary/grammar for the target CEFR level. '
+            'Be reasonably tolerant of minor mistakes that do not impede meaning. '
+            'You grade several answers at once, each independently. '
+            'Output ONLY valid JSON: {"results": [{"id": <id>, "passed": true|false}, ...]}.'
+        )
+
+        verdicts: dict = {}
+        size = NLPService.GRADING_BATCH_SIZE
+        for start in range(0, len(items), size):
+            chunk = items[start:start + size]
+            payload = [
+                {
+                    "id": it["id"],
+                    "question": it.get("question") or "",
+                    "student_answer": it.get("answer") or "",
+                    "target_level": it.get("level") or "B2",
+                }
+                for it in chunk
+            ]
+            user_prompt = (
+                "For each item below, decide whether the student answer is acceptable for its target level "
+                "in contemporary English. Return one result per item id.\n\n"
+                f"Items:\n{json.dumps(payload, ensure_ascii=False)}"
+            )
+
+            try:
+                content = NLPService._chat(
+                    system_prompt,
+                    user_prompt,
+                    method="evaluate_open_ended_batch",
+                    model="llama3-8b-8192",
+                    temperature=0.1,
+                    max_tokens=40 + 20 * len(chunk),
+                    expect_json=True,
+                )
+                data = NLPService._safe_json_load(content.strip())
+                results = data.get("results") if isinstance(data, dict) else data
+                wanted = {str(it["id"]): it["id"] for it in chunk}
+                for row in results or []:
+                    if not isinstance(row, dict) or not isinstance(row.get("passed"), bool):
+                        continue
+                    key = wanted.get(str(row.get("id")))
+                    if key is not None:
+                        verdicts[key] = row["passed"]
+            except Exception as e:
+                current_app.logger.warning(f"Batch grading failed for {len(chunk)} answers; grading one-by-one: {e}")
+
+        # Fallback: anything the batch did not cover is graded individually
+        for it in items:
+            if it["id"] not in verdicts:
+                verdicts[it["id"]] = NLPService.evaluate_open_ended(
+                    it.get("question") or "", it.get("answer") or "", it.get("level") or "B2"
+                )
+        return verdicts
@@ -1,8 +1,10 @@
 import json
 from flask import current_app
-from app.extensions import db
+from app.extensions import db, dialect_insert
+from sqlalchemy import insert as sqlalchemy_insert
 from app.models import Question, ModuleType, QuestionType, CEFRLevel
 from app.services.nlp_service import NLPService
+from app.services.generation_executor import GenerationExecutor
 import pathlib
 import re
 from flask import current_app
@@ -63,16 +65,89 @@ class QuestionBankService:
         suffix = "Write 150–200 words. Include a clear thesis and at least 2 supporting points."
         return f"{raw}\n\n{suffix}"
 
+    # Rows per statement for hash lookups / multi-row inserts (stays well under SQLite's bind limit)
+    INGEST_CHUNK_SIZE = 500
+
+    @staticmethod
+    def _existing_hashes(module: ModuleType, difficulty: CEFRLevel, hashes: list[str]) -> set[str]:
+        found: set[str] = set()
+        size = QuestionBankService.INGEST_CHUNK_SIZE
+        for i in range(0, len(hashes), size):
+            found.update(
+                h
+                for (h,) in db.session.query(Question.text_hash).filter(
+                    Question.module == module,
+                    Question.difficulty == difficulty,
+                    Question.text_hash.in_(hashes[i : i + size]),
+                )
+            )
+        return found
+
     @staticmethod
-    def _exists(text: str, module: ModuleType, difficulty: CEFRLevel) -> bool:
-        return (
-            Question.query.filter_by(text=text, module=module, difficulty=difficulty).first()
-            is not None
-        )
+    def _bulk_insert(rows: list[dict]) -> int:
+        """
+        Multi-row INSERT of question rows. On SQLite/PostgreSQL it is
+        INSERT ... ON CONFLICT DO NOTHING on the (module, difficulty, text_hash) index,
+        so rows inserted concurrently by another worker are skipped instead of failing.
+        """
+        upsert = dialect_insert()
+        inserted = 0
+        size = QuestionBankService.INGEST_CHUNK_SIZE
+        for i in range(0, len(rows), size):
+            chunk = rows[i : i + size]
+            if upsert is not None:
+                stmt = (
+                    upsert(Question)
+                    .values(chunk)
+                    .on_conflict_do_nothing(index_elements=["module", "difficulty", "text_hash"])
+                )
+            else:
+                stmt = sqlalchemy_insert(Question).values(chunk)
+            result = db.session.execute(stmt)
+            inserted += result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(chunk)
+        return inserted
+
+    @staticmethod
+    def ingest(module: ModuleType, difficulty: CEFRLevel, rows: list[dict]) -> int:
+        """
+        Set-based dedup + insert for one module/level. `rows` are Question column dicts
+        (text, question_type, options, correct_answer, audio_url). Texts are normalised and
+        hashed; duplicates within the batch and rows already in the DB are dropped with one
+        lookup query, the rest go in with one multi-row insert. Commits; returns rows inserted.
+        """
+        fresh: dict[str, dict] = {}
+        for row in rows:
+            text = (row.get("text") or "").strip()
+            if not text:
+                continue
+            text_hash = Question.hash_text(text)
+            if text_hash in fresh:
+                continue
+            fresh[text_hash] = {
+                "text": text,
+                "text_hash": text_hash,
+                "module": module,
+                "difficulty": difficulty,
+                "question_type": row.get("question_type") or QuestionType.MULTIPLE_CHOICE,
+                "options": row.get("options"),
+                "correct_answer": row.get("correct_answer"),
+                "audio_url": row.get("audio_url"),
+            }
+        if not fresh:
+            return 0
+
+        for text_hash in QuestionBankService._existing_hashes(module, difficulty, list(fresh)):
+            fresh.pop(text_hash, None)
+        if not fresh:
+            return 0
+
+        created = QuestionBankService._bulk_insert(list(fresh.values()))
+        db.session.commit()
+        return created
 
     @staticmethod
     def add_questions(module: ModuleType, difficulty: CEFRLevel, questions: list[dict]) -> int:
-        created = 0
+        rows = []
         for q in questions:
             if not q or not q.get("text"):
                 continue
@@ -84,9 +159,6 @@ class QuestionBankService:
             if module == ModuleType.WRITING:
                 text = QuestionBankService._ensure_writing_word_range(text)
 
-            if QuestionBankService._exists(text, module, difficulty):
-                continue
-
             # Enforce OPEN_ENDED for Writing; otherwise use provided type/default MCQ
             if module == ModuleType.WRITING:
                 q_type = QuestionType.OPEN_ENDED
@@ -103,20 +175,44 @@ class QuestionBankService:
                 options_json = json.dumps(options) if isinstance(options, dict) else None
                 correct = q.get("correct_answer")
 
-            new_q = Question(
-                text=text,
-                module=module,
-                difficulty=difficulty,
-                question_type=q_type,
-                options=options_json,
-                correct_answer=correct,
+            rows.append(
+                {
+                    "text": text,
+                    "question_type": q_type,
+                    "options": options_json,
+                    "correct_answer": correct,
+                }
             )
-            db.session.add(new_q)
-            created += 1
 
-        if created:
-            db.session.commit()
-        return created
+        return QuestionBankService.ingest(module, difficulty, rows)
+
+    @staticmethod
+    def import_json(path: pathlib.Path) -> dict:
+        """
+        Imports a JSON question file (list of {module, difficulty, question_type, text,
+        options, correct_answer}, e.g. data/question_bank_b2.json). One ingest per
+        module+level; already-present questions are skipped.
+        Returns {"created": n, "skipped": n, "invalid": n}.
+        """
+        items = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+        if not isinstance(items, list):
+            raise ValueError("Question file must contain a JSON list.")
+
+        groups: dict[tuple[ModuleType, CEFRLevel], list[dict]] = {}
+        invalid = 0
+        for item in items:
+            try:
+                module = ModuleType[str(item["module"]).upper()]
+                difficulty = CEFRLevel[str(item["difficulty"]).upper()]
+            except Exception:
+                invalid += 1
+                continue
+            groups.setdefault((module, difficulty), []).append(item)
+
+        created = 0
+        for (module, difficulty), questions in groups.items():
+            created += QuestionBankService.add_questions(module, difficulty, questions)
+        return {"created": created, "skipped": len(items) - invalid - created, "invalid": invalid}
 
     @staticmethod
     def _parse_reading_questions(md_path: pathlib.Path) -> list[dict]:
@@ -176,123 +272,150 @@ class QuestionBankService:
 
     @staticmethod
     def ensure_reading_from_files(difficulty: CEFRLevel = CEFRLevel.B2) -> dict:
-        base_dir = pathlib.Path(current_app.root_path).parent / "data" / "reading"
-        questions_path = base_dir / "reading_questions"
+        from app.services.materials_service import MaterialsService
 
-        questions = QuestionBankService._parse_reading_questions(questions_path)
-        created = 0
+        questions = MaterialsService.reading_questions()
+        parsed = []
         for q in questions:
             text = (q.get("text") or "").strip()
             if not text:
                 continue
-            exists = Question.query.filter_by(module=ModuleType.READING, text=text).first()
             correct = (q.get("correct_answer") or "").strip().upper() if q.get("correct_answer") else None
             if correct and correct not in ("A", "B", "C", "D"):
                 correct = None
 
             options_json = json.dumps(q.get("options")) if isinstance(q.get("options"), dict) else None
-
+            parsed.append((Question.hash_text(text), text, options_json, correct))
+
+        # Existing reading rows (any level) for these texts, in one query
+        hashes = [h for h, _, _, _ in parsed]
+        existing_rows = {
+            row.text_hash: row
+            for row in Question.query.filter(
+                Question.module == ModuleType.READING, Question.text_hash.in_(hashes)
+            ).all()
+        } if hashes else {}
+
+        new_rows = []
+        changed = False
+        for text_hash, text, options_json, correct in parsed:
+            exists = existing_rows.get(text_hash)
             if exists:
-                changed = False
+                # Don't touch difficulty/question_type for existing rows.
                 if options_json and (exists.options or "") != options_json:
                     exists.options = options_json
                     changed = True
                 if correct and (exists.correct_answer or "") != correct:
                     exists.correct_answer = correct
                     changed = True
-                if changed:
-                    # Don't touch difficulty/question_type for existing rows.
-                    db.session.commit()
                 continue
-            new_q = Question(
-                text=text,
-                module=ModuleType.READING,
-                difficulty=difficulty,
-                question_type=QuestionType.MULTIPLE_CHOICE,
-                options=options_json,
-                correct_answer=correct,
+            new_rows.append(
+                {
+                    "text": text,
+                    "question_type": QuestionType.MULTIPLE_CHOICE,
+                    "options": options_json,
+                    "correct_answer": correct,
+                }
             )
-            db.session.add(new_q)
-            created += 1
-        if created:
+        if changed:
             db.session.commit()
+        created = QuestionBankService.ingest(ModuleType.READING, difficulty, new_rows)
         existing = Question.query.filter_by(module=ModuleType.READING).count()
         return {"ok": True, "created": created, "existing": existing}
 
+    # Questions requested per generation call when filling a pool
+    GENERATION_BATCH_SIZE = 10
+
+    @staticmethod
+    def _generate_batch(module: ModuleType, difficulty: CEFRLevel, count: int) -> list[dict]:
+        """One generation request for module+level (no DB access; runs on a worker thread)."""
+        with GenerationExecutor.slot():
+            # Writing/Speaking: always open-ended
+            if module == ModuleType.WRITING:
+                return NLPService.generate_writing_set(count=count, difficulty=difficulty.value) or []
+            if module == ModuleType.SPEAKING:
+                return NLPService.generate_speaking_set(count=count, difficulty=difficulty.value) or []
+            if module in (ModuleType.GRAMMAR, ModuleType.VOCABULARY):
+                examples = NLPService.GRAMMAR_EXAMPLES if module == ModuleType.GRAMMAR else NLPService.VOCAB_EXAMPLES
+                batch = NLPService.generate_example_guided_mcq(
+                    module=module.value,
+                    difficulty=difficulty.value,
+                    count=count,
+                    examples=examples,
+                )
+                if batch:
+                    return batch
+            # 10 MCQ using the ETS prompt
+            return NLPService.generate_10_mcq_for_module(module.value, difficulty=difficulty.value) or []
+
     @staticmethod
     def ensure_module_level_pool(module: ModuleType, difficulty: CEFRLevel, min_count: int) -> dict:
         """
         Ensures there are at least min_count questions in DB for given module+level.
         If Groq is not available, returns without generating.
         """
-        existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-        if existing >= min_count:
-            return {"ok": True, "created": 0, "existing": existing, "target": min_count}
-
-        client = NLPService._get_client()
-        if not client:
-            return {"ok": False, "created": 0, "existing": existing, "target": min_count, "error": "AI unavailable"}
-
-        created_total = 0
-        # Writing: always open-ended, generate smaller batches
-        if module == ModuleType.WRITING:
-            while existing < min_count:
-                remaining = max(1, min_count - existing)
-                batch = NLPService.generate_writing_set(count=remaining, difficulty=difficulty.value)
-                if not batch:
-                    break
-                created_total += QuestionBankService.add_questions(module, difficulty, batch)
-                existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-        elif module == ModuleType.READING:
-            # Reading: load from local files (no AI)
-            result = QuestionBankService.ensure_reading_from_files(difficulty=CEFRLevel.B2)
-            created_total += result.get("created", 0)
-            existing = Question.query.filter_by(module=module).count()
-        elif module == ModuleType.GRAMMAR:
-            while existing < min_count:
-                remaining = max(1, min_count - existing)
-                batch = NLPService.generate_example_guided_mcq(
-                    module="Grammar",
-                    difficulty=difficulty.value,
-                    count=remaining,
-                    examples=NLPService.GRAMMAR_EXAMPLES,
-                )
-                if not batch:
-                    batch = NLPService.generate_10_mcq_for_module(module.value, difficulty=difficulty.value)
-                created_total += QuestionBankService.add_questions(module, difficulty, batch)
-                existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-        elif module == ModuleType.VOCABULARY:
-            while existing < min_count:
-                remaining = max(1, min_count - existing)
-                batch = NLPService.generate_example_guided_mcq(
-                    module="Vocabulary",
-                    difficulty=difficulty.value,
-                    count=remaining,
-                    examples=NLPService.VOCAB_EXAMPLES,
-                )
-                if not batch:
-                    batch = NLPService.generate_10_mcq_for_module(module.value, difficulty=difficulty.value)
-                created_total += QuestionBankService.add_questions(module, difficulty, batch)
-                existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-        elif module == ModuleType.SPEAKING:
-            while existing < min_count:
-                remaining = max(1, min_count - existing)
-                batch = NLPService.generate_speaking_set(count=remaining, difficulty=difficulty.value)
-                if not batch:
-                    break
-                created_total += QuestionBankService.add_questions(module, difficulty, batch)
-                existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-        else:
-            # Generate in batches of 10 MCQ using the ETS prompt
-            max_batches = max(1, (min_count - existing + 9) // 10)
-            for _ in range(max_batches):
-                batch = NLPService.generate_10_mcq_for_module(module.value, difficulty=difficulty.value)
-                created_total += QuestionBankService.add_questions(module, difficulty, batch)
-                existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
-                if existing >= min_count:
-                    break
-
-        return {"ok": True, "created": created_total, "existing": existing, "target": min_count}
+        return QuestionBankService.ensure_module_level_pools({module: min_count}, difficulty)[module]
+
+    @staticmethod
+    def ensure_module_level_pools(targets: dict[ModuleType, int], difficulty: CEFRLevel) -> dict[ModuleType, dict]:
+        """
+        ensure_module_level_pool for several modules at once: {module: min_count} -> {module: result}.
+        Only the LLM requests run on the generation pool (all modules' batches together); counts,
+        Reading file loads and inserts stay on the calling thread, so there is one DB writer.
+        """
+        results: dict[ModuleType, dict] = {}
+        existing = {}
+        for module, min_count in targets.items():
+            existing[module] = Question.query.filter_by(module=module, difficulty=difficulty).count()
+            if existing[module] >= min_count:
+                results[module] = {"ok": True, "created": 0, "existing": existing[module], "target": min_count}
+            elif module == ModuleType.READING:
+                # Reading: load from local files (no AI)
+                result = QuestionBankService.ensure_reading_from_files(difficulty=CEFRLevel.B2)
+                count = Question.query.filter_by(module=module).count()
+                results[module] = {"ok": True, "created": result.get("created", 0), "existing": count, "target": min_count}
+
+        pending = [module for module in targets if module not in results]
+        if pending and not NLPService._get_client():
+            for module in pending:
+                results[module] = {
+                    "ok": False,
+                    "created": 0,
+                    "existing": existing[module],
+                    "target": targets[module],
+                    "error": "AI unavailable",
+                }
+            pending = []
+
+        # Generate every module's shortfall as parallel batch requests, then insert on this thread.
+        created_total = {module: 0 for module in pending}
+        while pending:
+            tasks = []
+            for module in pending:
+                remaining = targets[module] - existing[module]
+                for i in range(0, remaining, QuestionBankService.GENERATION_BATCH_SIZE):
+                    n = min(QuestionBankService.GENERATION_BATCH_SIZE, remaining - i)
+                    tasks.append(
+                        (module, lambda module=module, n=n: QuestionBankService._generate_batch(module, difficulty, n))
+                    )
+            batches = GenerationExecutor.run([task for _, task in tasks], label="pool")
+
+            created = {module: 0 for module in pending}
+            for (module, _), batch in zip(tasks, batches):
+                if batch:
+                    created[module] += QuestionBankService.add_questions(module, difficulty, batch)
+            still_short = []
+            for module in pending:
+                created_total[module] += created[module]
+                existing[module] = Question.query.filter_by(module=module, difficulty=difficulty).count()
+                # Nothing usable came back (AI failure or all duplicates); don't spin.
+                if existing[module] < targets[module] and created[module]:
+                    still_short.append(module)
+            pending = still_short
+
+        for module, created in created_total.items():
+            results[module] = {"ok": True, "created": created, "existing": existing[module], "target": targets[module]}
+        return {module: results[module] for module in targets}
 
     # --- Listening specific: load from markdown pools ---
     @staticmethod
@@ -364,32 +487,21 @@ class QuestionBankService:
         pool: 1 or 2
         audio_filename: e.g., 'listeningaudio1.mp3'
         """
-        base_dir = base_dir or pathlib.Path(current_app.root_path).parent / "data" / "listening"
-        part1 = base_dir / f"pool{pool}_part1.md"
-        part2 = base_dir / f"pool{pool}_part2.md"
-
-        questions = []
-        for md_file in (part1, part2):
-            questions.extend(QuestionBankService._parse_md_questions(md_file))
-
-        created = 0
-        for idx, q in enumerate(questions, start=1):
-            if QuestionBankService._exists(q["text"], ModuleType.LISTENING, CEFRLevel.B2):
-                continue
-            options_json = json.dumps(q.get("options")) if isinstance(q.get("options"), dict) else None
-            new_q = Question(
-                text=q["text"],
-                module=ModuleType.LISTENING,
-                difficulty=CEFRLevel.B2,
-                question_type=QuestionType.MULTIPLE_CHOICE,
-                options=options_json,
-                correct_answer=q.get("correct_answer"),
-                audio_url=f"/static/audio/{audio_filename}",
-            )
-            db.session.add(new_q)
-            created += 1
-        if created:
-            db.session.commit()
+        from app.services.materials_service import MaterialsService
+
+        questions = MaterialsService.listening_questions(pool, base_dir=base_dir)
+
+        rows = [
+            {
+                "text": q["text"],
+                "question_type": QuestionType.MULTIPLE_CHOICE,
+                "options": json.dumps(q.get("options")) if isinstance(q.get("options"), dict) else None,
+                "correct_answer": q.get("correct_answer"),
+                "audio_url": f"/static/audio/{audio_filename}",
+            }
+            for q in questions
+        ]
+        created = QuestionBankService.ingest(ModuleType.LISTENING, CEFRLevel.B2, rows)
         existing = Question.query.filter_by(module=ModuleType.LISTENING).count()
         return {"ok": True, "created": created, "existing": existing}
 
@@ -0,0 +1,87 @@
+import json
+import random
+from collections import defaultdict
+from app.extensions import db
+from app.models import (
+    Question,
+    ModuleType,
+    QuestionType,
+    CEFRLevel,
+    SessionModuleAttempt,
+    SessionQuestion,
+)
+
+
+class QuestionDrawService:
+    """
+    Per-session question draw engine.
+
+    When a module starts, one query loads the candidate question ids of that module
+    (minus anything already served in the session), they are shuffled per difficulty
+    band and a short list per band is stored on the module attempt. Each new question
+    is then popped from the band the adaptive level asks for, so serving a question
+    never needs an ORDER BY random() over the questions table.
+
+    Stored on SessionModuleAttempt.draw_pool_json as {"B2": [12, 7, ...], "C1": [...]}.
+    """
+
+    @staticmethod
+    def build_pool(attempt: SessionModuleAttempt, per_band: int) -> dict[str, list[int]]:
+        module = attempt.module
+        served = db.session.query(SessionQuestion.question_id).filter(
+            SessionQuestion.session_id == attempt.session_id
+        )
+        query = db.session.query(Question.id, Question.difficulty).filter(
+            Question.module == module,
+            ~Question.id.in_(served),
+        )
+        # Writing/Speaking must not use MC questions
+        if module in (ModuleType.WRITING, ModuleType.SPEAKING):
+            query = query.filter(Question.question_type != QuestionType.MULTIPLE_CHOICE)
+
+        by_band: dict[str, list[int]] = defaultdict(list)
+        for qid, difficulty in query.all():
+            if difficulty:
+                by_band[difficulty.value].append(qid)
+
+        per_band = max(1, int(per_band))
+        pool = {band: random.sample(ids, min(per_band, len(ids))) for band, ids in by_band.items()}
+        attempt.draw_pool_json = json.dumps(pool)
+        return pool
+
+    @staticmethod
+    def _load_pool(attempt: SessionModuleAttempt) -> dict[str, list[int]] | None:
+        if not attempt.draw_pool_json:
+            return None
+        try:
+            pool = json.loads(attempt.draw_pool_json)
+        except Exception:
+            return None
+        return pool if isinstance(pool, dict) else None
+
+    @staticmethod
+    def draw(
+        attempt: SessionModuleAttempt,
+        candidates: list[CEFRLevel],
+        per_band: int,
+    ) -> Question | None:
+        """
+        Pops the next question for the first difficulty in `candidates` that still has
+        items left (builds the pool on first use). Returns None when every band is empty.
+        The updated pool is written back to the attempt; the caller commits.
+        """
+        pool = QuestionDrawService._load_pool(attempt)
+        if pool is None:
+            pool = QuestionDrawService.build_pool(attempt, per_band)
+
+        question = None
+        for diff in candidates:
+            band = pool.get(diff.value) or []
+            while band and question is None:
+                # Ids can go stale if the bank was refreshed after the pool was drawn.
+                question = db.session.get(Question, band.pop())
+            if question:
+                break
+
+        attempt.draw_pool_json = json.dumps(pool)
+        return question
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.extensions import db
+from app.models import Question, ModuleType, CEFRLevel
+from app.services.question_bank_service import QuestionBankService
+
+
+class QuestionPoolManager:
+    """
+    Keeps the question bank topped up per (module, CEFR level) in the background.
+
+    Request handlers call signal(), which only records the (module, level) in a small
+    de-duplicated queue and returns. A single daemon thread per process drains the queue:
+    when a pool is below its low watermark it is refilled up to the high watermark
+    (QuestionBankService.ensure_module_level_pool, which calls Groq). Watermarks are
+    multiples of the module's per-exam question count:
+    QUESTION_POOL_LOW_WATERMARK (default 2) and QUESTION_POOL_HIGH_WATERMARK (default 4).
+    """
+
+    _cond = threading.Condition()
+    # (module, level) -> questions needed per exam; insertion order = refill order
+    _pending: "OrderedDict[tuple[ModuleType, CEFRLevel], int]" = OrderedDict()
+    # (module, level) currently being refilled
+    _active: set[tuple[ModuleType, CEFRLevel]] = set()
+    _thread: threading.Thread | None = None
+
+    @staticmethod
+    def watermarks(per_exam: int) -> tuple[int, int]:
+        cfg = current_app.config
+        per_exam = max(1, int(per_exam))
+        low = per_exam * max(1, int(cfg.get("QUESTION_POOL_LOW_WATERMARK", 2) or 2))
+        high = per_exam * max(1, int(cfg.get("QUESTION_POOL_HIGH_WATERMARK", 4) or 4))
+        return low, max(low, high)
+
+    @staticmethod
+    def signal(module: ModuleType, difficulty: CEFRLevel, per_exam: int) -> None:
+        """Ask for (module, difficulty) to be checked and refilled if low. Never blocks on the LLM."""
+        if module == ModuleType.LISTENING:
+            # Listening comes from the fixed markdown/audio pools
+            return
+        key = (module, difficulty)
+        with QuestionPoolManager._cond:
+            if key in QuestionPoolManager._pending or key in QuestionPoolManager._active:
+                return
+            QuestionPoolManager._pending[key] = max(1, int(per_exam))
+            QuestionPoolManager._ensure_worker()
+            QuestionPoolManager._cond.notify()
+
+    @staticmethod
+    def _ensure_worker() -> None:
+        # Caller holds _cond
+        thread = QuestionPoolManager._thread
+        if thread is not None and thread.is_alive():
+            return
+        app = current_app._get_current_object()
+        thread = threading.Thread(
+            target=QuestionPoolManager._worker, args=(app,), name="question-pool", daemon=True
+        )
+        QuestionPoolManager._thread = thread
+        thread.start()
+
+    @staticmethod
+    def _worker(app) -> None:
+        while True:
+            with QuestionPoolManager._cond:
+                while not QuestionPoolManager._pending:
+                    QuestionPoolManager._cond.wait()
+                key, per_exam = QuestionPoolManager._pending.popitem(last=False)
+                QuestionPoolManager._active.add(key)
+            try:
+                with app.app_context():
+                    try:
+                        QuestionPoolManager.refill(key[0], key[1], per_exam)
+                    except Exception as e:
+                        db.session.rollback()
+                        app.logger.warning(f"Pool refill failed for {key[0].value}/{key[1].value}: {e}")
+                    finally:
+                        db.session.remove()
+            finally:
+                with QuestionPoolManager._cond:
+                    QuestionPoolManager._active.discard(key)
+
+    @staticmethod
+    def refill(module: ModuleType, difficulty: CEFRLevel, per_exam: int) -> dict:
+        """Refills (module, difficulty) up to the high watermark if it is below the low one."""
+        low, high = QuestionPoolManager.watermarks(per_exam)
+        existing = Question.query.filter_by(module=module, difficulty=difficulty).count()
+        if existing >= low:
+            return {"ok": True, "created": 0, "existing": existing, "target": low}
+        return QuestionBankService.ensure_module_level_pool(module=module, difficulty=difficulty, min_count=high)
+
+    @staticmethod
+    def pending() -> list[tuple[str, str]]:
+        with QuestionPoolManager._cond:
+            keys = list(QuestionPoolManager._active) + list(QuestionPoolManager._pending)
+        return [(m.value, d.value) for m, d in keys]
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from sqlalchemy import and_, case, func, or_, select
+
+from app.extensions import db
+from app.models import CEFRLevel, Report, ReportStatus, Student, StudentStat, TestSession
+from app.services.dashboard_stats_service import DashboardStatsService
+
+
+@dataclass(frozen=True)
+class ReportPage:
+    rows: list[dict[str, Any]]  # {"student": Student, "session": TestSession|None, "report": Report|None}
+    total: int
+    page: int
+    per_page: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.per_page)) if self.per_page else 1
+
+
+class ReportRepository:
+    """
+    Set-based "latest session + report" lookups for instructor pages, exports and dashboards.
+
+    The latest session per student is picked with ROW_NUMBER() over (user_id ORDER BY
+    start_time DESC, id DESC) and a session's report is its first one (MIN(id)), the same
+    rows the old per-student `.first()` lookups returned, in one query per page.
+
+    The leaderboard helpers read the materialised student_stats rows instead (the same source
+    as the dashboard table) and select only the exported columns.
+    """
+
+    NO_REPORT = "No report"
+    LEADERBOARD_COLUMNS = ("student_id", "name", "email", "last_attempt", "level", "overall", "status", "session_id")
+
+    @staticmethod
+    def _first_report_per_session():
+        return (
+            db.session.query(Report.session_id, func.min(Report.id).label("report_id"))
+            .group_by(Report.session_id)
+            .subquery()
+        )
+
+    @staticmethod
+    def latest_per_student(
+        *,
+        page: int = 1,
+        per_page: int = 25,
+        level: str | None = None,
+        status: str | None = None,
+        q: str | None = None,
+        with_session_only: bool = False,
+        order: str = "recent",
+    ) -> ReportPage:
+        """
+        One page of students with their latest session and its report.
+
+        Filters: level (report level, else the student's current level), status (a ReportStatus
+        value or "No report"), q (substring of name or email, case-insensitive).
+        order: "recent" (newest students first) or "score" (best report first, no report last).
+        """
+        page = max(1, int(page or 1))
+        per_page = max(1, int(per_page or 25))
+
+        latest = (
+            db.session.query(
+                TestSession.id.label("session_id"),
+                TestSession.user_id.label("user_id"),
+                func.row_number()
+                .over(partition_by=TestSession.user_id, order_by=(TestSession.start_time.desc(), TestSession.id.desc()))
+                .label("rn"),
+            )
+            .subquery()
+        )
+        first_report = ReportRepository._first_report_per_session()
+
+        query = (
+            db.session.query(Student, TestSession, Report)
+            .outerjoin(latest, and_(latest.c.user_id == Student.id, latest.c.rn == 1))
+            .outerjoin(TestSession, TestSession.id == latest.c.session_id)
+            .outerjoin(first_report, first_report.c.session_id == TestSession.id)
+            .outerjoin(Report, Report.id == first_report.c.report_id)
+        )
+
+        if with_session_only:
+            query = query.filter(TestSession.id.isnot(None))
+        if level:
+            try:
+                level_enum = CEFRLevel(level)
+            except ValueError:
+                return ReportPage(rows=[], total=0, page=page, per_page=per_page)
+            query = query.filter(
+                or_(
+                    Report.level_result == level_enum,
+                    and_(Report.level_result.is_(None), Student.current_level == level_enum),
+                )
+            )
+        if status:
+            if status == ReportRepository.NO_REPORT:
+                query = query.filter(Report.id.is_(None))
+            else:
+                try:
+                    query = query.filter(Report.status == ReportStatus(status))
+                except ValueError:
+                    return ReportPage(rows=[], total=0, page=page, per_page=per_page)
+        q = (q or "").strip().lower()
+        if q:
+            query = query.filter(
+                or_(
+                    func.lower(Student.name).contains(q, autoescape=True),
+                    func.lower(Student.email).contains(q, autoescape=True),
+                )
+            )
+
+        total = query.order_by(None).count()
+
+        if order == "score":
+            query = query.order_by(
+                case((Report.score.is_(None), 1), else_=0), Report.score.desc(), Student.id.desc()
+            )
+        else:
+            query = query.order_by(Student.id.desc())
+
+        rows = [
+            {"student": s, "session": sess, "report": rep}
+            for s, sess, rep in query.offset((page - 1) * per_page).limit(per_page).all()
+        ]
+        return ReportPage(rows=rows, total=total, page=page, per_page=per_page)
+
+    @staticmethod
+    def sessions_with_reports(user_id: int) -> list[dict[str, Any]]:
+        """All sessions of one user (newest first) with their report, in one query."""
+        first_report = ReportRepository._first_report_per_session()
+        rows = (
+            db.session.query(TestSession, Report)
+            .outerjoin(first_report, first_report.c.session_id == TestSession.id)
+            .outerjoin(Report, Report.id == first_report.c.report_id)
+            .filter(TestSession.user_id == user_id)
+            .order_by(TestSession.start_time.desc(), TestSession.id.desc())
+            .all()
+        )
+        return [{"session": sess, "report": rep} for sess, rep in rows]
+
+    @staticmethod
+    def _leaderboard_select(*, level: str | None = None, status: str | None = None, q: str | None = None):
+        """Filtered leaderboard statement, or None when a filter value cannot match anything."""
+        stmt = (
+            select(
+                Student.id.label("student_id"),
+                Student.name,
+                Student.email,
+                StudentStat.latest_started_at.label("last_attempt"),
+                StudentStat.level,
+                StudentStat.report_score.label("overall"),
+                StudentStat.report_status.label("status"),
+                StudentStat.latest_session_id.label("session_id"),
+            )
+            .join(Student, Student.id == StudentStat.student_id)
+            .where(StudentStat.latest_session_id.isnot(None))
+        )
+        if level:
+            try:
+                stmt = stmt.where(StudentStat.level == CEFRLevel(level))
+            except ValueError:
+                return None
+        if status:
+            if status == ReportRepository.NO_REPORT:
+                stmt = stmt.where(StudentStat.report_status.is_(None))
+            else:
+                try:
+                    stmt = stmt.where(StudentStat.report_status == ReportStatus(status))
+                except ValueError:
+                    return None
+        q = (q or "").strip().lower()
+        if q:
+            stmt = stmt.where(
+                or_(
+                    func.lower(Student.name).contains(q, autoescape=True),
+                    func.lower(Student.email).contains(q, autoescape=True),
+                )
+            )
+        return stmt
+
+    @staticmethod
+    def _leaderboard_row(row) -> dict[str, Any]:
+        return {
+            "student_id": row.student_id,
+            "name": row.name,
+            "email": row.email,
+            "last_attempt": row.last_attempt,
+            "level": row.level.value if row.level else None,
+            "overall": round(float(row.overall or 0.0), 1) if row.status is not None else None,
+            "status": row.status.value if row.status is not None else ReportRepository.NO_REPORT,
+            "session_id": row.session_id,
+        }
+
+    @staticmethod
+    def _leaderboard_ordered(stmt):
+        # Best overall first, students without a report last
+        return stmt.order_by(
+            case((StudentStat.report_score.is_(None), 1), else_=0),
+            StudentStat.report_score.desc(),
+            Student.id.desc(),
+        )
+
+    @staticmethod
+    def leaderboard(
+        *,
+        page: int = 1,
+        per_page: int = 25,
+        level: str | None = None,
+        status: str | None = None,
+        q: str | None = None,
+    ) -> ReportPage:
+        """One page of leaderboard rows (plain dicts with LEADERBOARD_COLUMNS keys)."""
+        page = max(1, int(page or 1))
+        per_page = max(1, int(per_page or 25))
+
+        stmt = ReportRepository._leaderboard_select(level=level, status=status, q=q)
+        if stmt is None:
+            return ReportPage(rows=[], total=0, page=page, per_page=per_page)
+
+        DashboardStatsService.ensure_built()
+        total = db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar() or 0
+        result = db.session.execute(
+            ReportRepository._leaderboard_ordered(stmt).offset((page - 1) * per_page).limit(per_page)
+        )
+        rows = [ReportRepository._leaderboard_row(r) for r in result]
+        return ReportPage(rows=rows, total=int(total), page=page, per_page=per_page)
+
+    @staticmethod
+    def iter_leaderboard(
+        *,
+        level: str | None = None,
+        status: str | None = None,
+        q: str | None = None,
+        limit: int | None = None,
+        chunk_size: int = 500,
+    ) -> Iterator[dict[str, Any]]:
+        """Leaderboard rows for exports, fetched from the cursor in chunks of `chunk_size`."""
+        stmt = ReportRepository._leaderboard_select(level=level, status=status, q=q)
+        if stmt is None:
+            return
+
+        DashboardStatsService.ensure_built()
+        stmt = ReportRepository._leaderboard_ordered(stmt)
+        if limit:
+            stmt = stmt.limit(limit)
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            for row in result:
+                yield ReportRepository._leaderboard_row(row)
+        finally:
+            result.close()
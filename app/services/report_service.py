@@ -1,10 +1,13 @@
 from app.extensions import db
-# Imported Question and Response models here 👇
-from app.models import Report, ModuleType, CEFRLevel, Question, Response, ReportStatus, SessionQuestion
+from app.models import Report, CEFRLevel, ReportStatus
 from app.services.nlp_service import NLPService
+from app.services.grading_service import GradingService
+from app.services.session_score_service import SessionScoreService
+from app.services.job_queue import JobQueue
+from app.services.report_status_service import ReportStatusService
+from app.services.roadmap_cache import RoadmapCache, RoadmapProfile
+from app.services.llm_gateway import LLMGateway, LLMUnavailableError
 import json
-from flask import current_app
-from threading import Thread
 from datetime import date, datetime, timedelta
 from html import escape
 import re
@@ -27,28 +30,19 @@ class ReportService:
 
     @staticmethod
     def generate_report(session, target_level=None, target_weeks=None, goal_note=None):
-        # 1. Compute overall statistics (served total: unanswered lowers score)
-        total_served = SessionQuestion.query.filter_by(session_id=session.id).count()
-        correct_answers = session.responses.filter(Response.is_correct == True).count()
-        score_percentage = (correct_answers / total_served * 100) if total_served > 0 else 0
-        
-        # 2. Module-level statistics
-        module_stats = {}
-        for module in ModuleType:
-            # Logic: take this session's responses -> join Question -> filter by module
-            base_query = session.responses.join(Question).filter(Question.module == module)
-            
-            m_total = base_query.count()
-            m_correct = base_query.filter(Response.is_correct == True).count()
-            
-            if m_total > 0:
-                module_stats[module.value] = round((m_correct / m_total) * 100, 1)
-            else:
-                module_stats[module.value] = 0
+        # 0. Open-ended answers are graded in the background; settle any pending grades first
+        GradingService.reconcile_session(session.id)
+
+        # 1. Served / answered / correct per module, one grouped query
+        scores = SessionScoreService.for_session(session.id)
+        # Overall: served total, so unanswered questions lower the score
+        score_percentage = scores.percentage
+
+        # 2. Module-level statistics (correct over answered)
+        module_stats = scores.module_stats()
 
         # 3. Determine final level (score-based, stable)
         level_result = ReportService._level_from_percentage(score_percentage)
-        final_level = level_result.value
         module_stats_json = json.dumps(module_stats)
 
         # 4. Request an AI roadmap
@@ -78,36 +72,10 @@ class ReportService:
         db.session.add(report)
         db.session.commit()
 
-        # Async enrichment (non-blocking) to keep report generation fast (<10s)
+        # AI enrichment runs on the background job queue to keep report generation fast (<10s)
         if status == ReportStatus.ENRICHING:
-            app = current_app._get_current_object()
-
-            def _task():
-                with app.app_context():
-                    r = Report.query.get(report.id)
-                    if not r:
-                        return
-                    try:
-                        feedback = ReportService._get_ai_roadmap(
-                            final_level,
-                            module_stats,
-                            score_percentage,
-                            goal_note=r.goal_note,
-                            target_weeks=r.target_weeks,
-                        )
-                        r.ai_feedback = feedback
-                        # Learning plan removed - using static plan in template
-                        r.learning_plan = None
-                        r.learning_plan_error = None
-                        r.status = ReportStatus.READY
-                        r.ai_error = None
-                    except Exception as e:
-                        r.status = ReportStatus.FAILED
-                        r.ai_error = str(e)
-                    db.session.commit()
-
-            Thread(target=_task, daemon=True).start()
-        
+            JobQueue.enqueue("enrich_report", {"report_id": report.id}, dedupe_key=f"enrich_report:{report.id}")
+
         return report
 
     @staticmethod
@@ -115,17 +83,95 @@ class ReportService:
         """
         Re-generate learning plan asynchronously (used when goal is submitted after a report already exists).
         """
+        JobQueue.enqueue(
+            "refresh_learning_plan", {"report_id": report_id}, dedupe_key=f"refresh_learning_plan:{report_id}"
+        )
+
+    # --- background jobs (see JobQueue) ---------------------------------------
+
+    @staticmethod
+    def register_jobs() -> None:
+        JobQueue.register(
+            "enrich_report",
+            ReportService.enrich_report,
+            on_give_up=ReportService.enrichment_failed,
+            recover=ReportService.recover_enrichment,
+        )
+        JobQueue.register("refresh_learning_plan", ReportService.refresh_learning_plan)
+        JobQueue.register("refresh_roadmap", ReportService.refresh_roadmap)
+
+    @staticmethod
+    def enrich_report(report_id: int) -> None:
+        """Writes the AI roadmap of an ENRICHING report. LLM outages raise, so the job is retried."""
+        r = db.session.get(Report, report_id)
+        if not r or r.status != ReportStatus.ENRICHING:
+            return
+        if LLMGateway.is_open():
+            raise LLMUnavailableError("LLM circuit is open.")
+
+        try:
+            module_stats = json.loads(r.module_stats_json) if r.module_stats_json else {}
+        except Exception:
+            module_stats = {}
+        feedback = ReportService._get_ai_roadmap(
+            r.level_result.value if r.level_result else None,
+            module_stats,
+            r.score,
+            goal_note=r.goal_note,
+            target_weeks=r.target_weeks,
+        )
+        r.ai_feedback = feedback
+        # Learning plan removed - using static plan in template
+        r.learning_plan = None
+        r.learning_plan_error = None
+        r.status = ReportStatus.READY
+        r.ai_error = None
+        db.session.commit()
+        ReportStatusService.notify()
+
+    @staticmethod
+    def enrichment_failed(report_id: int, error: str) -> None:
+        r = db.session.get(Report, report_id)
+        if r and r.status == ReportStatus.ENRICHING:
+            r.status = ReportStatus.FAILED
+            r.ai_error = error
+            db.session.commit()
+            ReportStatusService.notify()
+
+    @staticmethod
+    def recover_enrichment() -> int:
+        """Queues enrichment for ENRICHING reports that lost their worker (e.g. a restart)."""
+        report_ids = [rid for (rid,) in db.session.query(Report.id).filter(Report.status == ReportStatus.ENRICHING)]
+        return sum(
+            JobQueue.enqueue("enrich_report", {"report_id": rid}, dedupe_key=f"enrich_report:{rid}")
+            for rid in report_ids
+        )
+
+    @staticmethod
+    def refresh_learning_plan(report_id: int) -> None:
         # Learning plan generation disabled - using static template plan
-        app = current_app._get_current_object()
-        def _task():
-            with app.app_context():
-                r = Report.query.get(report_id)
-                if not r:
-                    return
-                r.learning_plan = None
-                r.learning_plan_error = None
-                db.session.commit()
-        Thread(target=_task, daemon=True).start()
+        r = db.session.get(Report, report_id)
+        if not r:
+            return
+        r.learning_plan = None
+        r.learning_plan_error = None
+        db.session.commit()
+
+    @staticmethod
+    def refresh_roadmap(profile: dict) -> None:
+        """Regenerates an aged shared roadmap (see RoadmapCache) so cohorts do not keep one plan forever."""
+        if LLMGateway.is_open():
+            raise LLMUnavailableError("LLM circuit is open.")
+        if not NLPService._get_client():
+            return
+        profile = RoadmapProfile.from_payload(profile)
+        start_date = ReportService._roadmap_start_date()
+        data = ReportService._request_roadmap(
+            profile.level, profile.stats(), profile.score, None, start_date, profile.weeks
+        )
+        if not isinstance(data, dict):
+            raise ValueError("AI roadmap format error.")
+        RoadmapCache.store(profile, data, start_date)
 
     @staticmethod
     def _render_calendar_roadmap_html(data: dict, *, start_date: date, days_count: int) -> str:
@@ -267,11 +313,51 @@ class ReportService:
             weeks = 4
         weeks = max(2, min(5, weeks))
         days_count = weeks * 7
+        start_date = ReportService._roadmap_start_date()
+
+        # Without a personal goal, reports with the same level / score bands / weeks share a roadmap
+        profile = None if goal_note else RoadmapCache.profile(level, stats, weeks)
 
+        try:
+            if profile is not None:
+                cached = RoadmapCache.lookup(profile, start_date)
+                if cached is not None:
+                    data, refresh_due = cached
+                    if refresh_due:
+                        JobQueue.enqueue(
+                            "refresh_roadmap",
+                            {"profile": profile.to_payload()},
+                            dedupe_key=f"refresh_roadmap:{profile.key}",
+                        )
+                else:
+                    data = ReportService._request_roadmap(
+                        profile.level, profile.stats(), profile.score, None, start_date, weeks
+                    )
+                    if isinstance(data, dict):
+                        RoadmapCache.store(profile, data, start_date)
+            else:
+                data = ReportService._request_roadmap(level, stats, score, goal_note, start_date, weeks)
+
+            if not isinstance(data, dict):
+                return "AI roadmap format error."
+            return ReportService._render_calendar_roadmap_html(data, start_date=start_date, days_count=days_count)
+        except Exception as e:
+            if isinstance(e, LLMUnavailableError) or LLMGateway.is_transient(e):
+                # Groq is down or overloaded: let the enrichment job retry later
+                raise
+            return f"Error generating report: {e}"
+
+    @staticmethod
+    def _roadmap_start_date() -> date:
+        """Roadmaps start on the next Monday (today if it is one)."""
         today = date.today()
         days_until_monday = (7 - today.weekday()) % 7
-        start_date = today if days_until_monday == 0 else (today + timedelta(days=days_until_monday))
+        return today if days_until_monday == 0 else (today + timedelta(days=days_until_monday))
 
+    @staticmethod
+    def _request_roadmap(level, stats, score, goal_note, start_date: date, weeks: int):
+        """Asks the model for a calendar roadmap; returns the parsed JSON (a dict unless malformed)."""
+        days_count = weeks * 7
         system_prompt = (
             "You are an expert English teacher and study coach. "
             "Your ONLY job is to output valid JSON. Do NOT write explanations. Do NOT write markdown or code fences. "
@@ -318,26 +404,19 @@ REQUIRED JSON SCHEMA:
 IMPORTANT: calendar.days must contain exactly {days_count} entries, one for each consecutive date starting from start_date.
 """.strip()
 
-        try:
-            chat = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.7
-            )
-            response_content = (chat.choices[0].message.content or "").strip()
-
-            if "```" in response_content:
-                response_content = re.sub(r"```json\s*|\s*```", "", response_content)
-            json_match = re.search(r"\{.*\}", response_content, re.DOTALL)
-            if json_match:
-                response_content = json_match.group(0)
-
-            data = json.loads(response_content)
-            if not isinstance(data, dict):
-                return "AI roadmap format error."
-            return ReportService._render_calendar_roadmap_html(data, start_date=start_date, days_count=days_count)
-        except Exception as e:
-            return f"Error generating report: {e}"
\ No newline at end of file
+        response_content = NLPService._chat(
+            system_prompt,
+            prompt,
+            method="roadmap",
+            model="llama-3.3-70b-versatile",
+            temperature=0.7,
+            cache=False,
+        ).strip()
+
+        if "```" in response_content:
+            response_content = re.sub(r"```json\s*|\s*```", "", response_content)
+        json_match = re.search(r"\{.*\}", response_content, re.DOTALL)
+        if json_match:
+            response_content = json_match.group(0)
+
+        return json.loads(response_content)
\ No newline at end of file
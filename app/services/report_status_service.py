@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Report, ReportStatus
+from app.services.request_metrics import RequestMetrics
+
+
+@dataclass(frozen=True)
+class ReportVersion:
+    report_id: int
+    status: ReportStatus
+    updated_at: datetime | None
+
+    @property
+    def etag(self) -> str:
+        stamp = self.updated_at.isoformat() if self.updated_at else ""
+        return hashlib.sha1(f"{self.report_id}:{self.status.value}:{stamp}".encode("utf-8")).hexdigest()
+
+    @property
+    def settled(self) -> bool:
+        """Ready or Failed: the report body will not change without a new request from the student."""
+        return self.status in (ReportStatus.READY, ReportStatus.FAILED)
+
+
+class ReportStatusService:
+    """
+    Cheap report readiness checks for the result page.
+
+    version() reads only (id, status, updated_at) of a session's report, so a poll whose
+    If-None-Match still matches costs one narrow SELECT and a 304. wait_for_change() holds a
+    long-poll until the version changes: enrichment jobs in this process wake waiters through
+    notify(), and jobs running elsewhere (`flask jobs work`) are picked up by re-reading the
+    version every REPORT_WAIT_POLL_SECONDS.
+    """
+
+    _cond = threading.Condition()
+    # Bumped by notify(); a waiter that sees it move re-reads its version instead of sleeping
+    _generation = 0
+
+    @staticmethod
+    def version(session_id: int) -> ReportVersion | None:
+        row = db.session.execute(
+            select(Report.id, Report.status, Report.updated_at)
+            .where(Report.session_id == session_id)
+            .order_by(Report.id)
+            .limit(1)
+        ).first()
+        return ReportVersion(*row) if row else None
+
+    @staticmethod
+    def notify() -> None:
+        """Wakes waiting long-polls so they re-check their report (call after committing a status change)."""
+        cls = ReportStatusService
+        with cls._cond:
+            cls._generation += 1
+            cls._cond.notify_all()
+
+    @staticmethod
+    def wait_for_change(session_id: int, etag: str | None, timeout: float) -> ReportVersion | None:
+        """
+        Returns the report version once its etag differs from `etag`, or the unchanged version
+        after `timeout` seconds. Never holds a DB connection while sleeping.
+        """
+        cls = ReportStatusService
+        poll = max(0.1, float(current_app.config.get("REPORT_WAIT_POLL_SECONDS", 1) or 1))
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            with cls._cond:
+                generation = cls._generation
+            current = cls.version(session_id)
+            # End the read transaction so the next check sees commits from other workers
+            db.session.commit()
+            remaining = deadline - time.monotonic()
+            if current is None or current.etag != etag or remaining <= 0:
+                return current
+            with cls._cond:
+                if cls._generation == generation:
+                    cls._cond.wait(timeout=min(poll, remaining))
+
+    @staticmethod
+    def resolve(session_id: int, if_none_match, wait: str | None = None) -> ReportVersion | None:
+        """
+        Version to answer a status poll with. When the client already has the current version
+        (If-None-Match) and asked to `wait` seconds, holds until it changes or the wait (capped
+        at REPORT_WAIT_SECONDS) runs out; the caller answers 304 if it still matches.
+        """
+        current = ReportStatusService.version(session_id)
+        if current is None or not if_none_match.contains(current.etag):
+            return current
+
+        try:
+            seconds = float(wait or 0)
+        except (TypeError, ValueError):
+            seconds = 0.0
+        seconds = min(seconds, float(current_app.config.get("REPORT_WAIT_SECONDS", 25) or 0))
+        if seconds <= 0 or current.settled:
+            return current
+
+        with RequestMetrics.track_wait():
+            return ReportStatusService.wait_for_change(session_id, current.etag, seconds)
+
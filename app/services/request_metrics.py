@@ -0,0 +1,233 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestMetrics:
+    """
+    Per-request SQL / LLM instrumentation.
+
+    SQLAlchemy cursor events time every statement; LLM calls wrap themselves in track_llm().
+    Both add to a per-request record kept on flask.g (statements run by background threads
+    have no record and are ignored). When the request ends the record is:
+    - returned as X-DB-Queries / X-DB-Time-ms / X-LLM-Time-ms and Server-Timing headers,
+    - logged as one JSON line (INFO; WARNING above SLOW_REQUEST_MS),
+    - folded into per-endpoint aggregates shown on /admin/performance.
+    Aggregates are per worker process since start-up (or the last reset).
+    """
+
+    MAX_SAMPLES = 500  # latency samples kept per endpoint (for p95)
+    TOP_STATEMENTS = 5  # slowest statements kept per endpoint
+    STATEMENT_PREVIEW = 300
+
+    _lock = threading.Lock()
+    _endpoints: dict = {}
+    _listening = False
+
+    @staticmethod
+    def init_app(app) -> None:
+        if not app.config.get("REQUEST_METRICS_ENABLED", True):
+            return
+        RequestMetrics._listen()
+        app.before_request(RequestMetrics._start)
+        app.after_request(RequestMetrics._finish)
+
+    @staticmethod
+    def _listen() -> None:
+        with RequestMetrics._lock:
+            if RequestMetrics._listening:
+                return
+            event.listen(Engine, "before_cursor_execute", RequestMetrics._before_cursor)
+            event.listen(Engine, "after_cursor_execute", RequestMetrics._after_cursor)
+            event.listen(Engine, "handle_error", RequestMetrics._on_error)
+            RequestMetrics._listening = True
+
+    @staticmethod
+    def _current() -> dict | None:
+        try:
+            return g.get("_request_metrics")
+        except RuntimeError:
+            # No app context (e.g. a script using the engine directly)
+            return None
+
+    # --- SQLAlchemy events -------------------------------------------------
+
+    @staticmethod
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        record = RequestMetrics._current()
+        if record is None:
+            return
+        record["queries"] += 1
+        record["db_time"] += elapsed
+        slow_ms = float(current_app.config.get("SLOW_QUERY_MS", 50) or 0)
+        if elapsed * 1000.0 >= slow_ms:
+            record["slow"].append((elapsed, " ".join(statement.split())[: RequestMetrics.STATEMENT_PREVIEW]))
+
+    @staticmethod
+    def _on_error(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time so the
+        # pooled connection's stack stays aligned with the statements that do finish.
+        conn = context.connection
+        starts = conn.info.get("_query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+
+    # --- LLM calls ---------------------------------------------------------
+
+    @staticmethod
+    @contextmanager
+    def track_llm():
+        """Times an LLM/API call and charges it to the current request (if any)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = RequestMetrics._current()
+            if record is not None:
+                record["llm_calls"] += 1
+                record["llm_time"] += time.perf_counter() - start
+
+    @staticmethod
+    @contextmanager
+    def track_wait():
+        """Times a deliberate wait (long-poll); it is not counted towards SLOW_REQUEST_MS."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = RequestMetrics._current()
+            if record is not None:
+                record["wait_time"] += time.perf_counter() - start
+
+    # --- Flask hooks -------------------------------------------------------
+
+    @staticmethod
+    def _start():
+        g._request_metrics = {
+            "start": time.perf_counter(),
+            "queries": 0,
+            "db_time": 0.0,
+            "llm_calls": 0,
+            "llm_time": 0.0,
+            "wait_time": 0.0,
+            "slow": [],
+        }
+
+    @staticmethod
+    def _finish(response):
+        record = g.pop("_request_metrics", None)
+        if record is None or request.endpoint in (None, "static"):
+            return response
+
+        total_ms = (time.perf_counter() - record["start"]) * 1000.0
+        db_ms = record["db_time"] * 1000.0
+        llm_ms = record["llm_time"] * 1000.0
+        response.headers["X-DB-Queries"] = str(record["queries"])
+        response.headers["X-DB-Time-ms"] = f"{db_ms:.1f}"
+        response.headers["X-LLM-Time-ms"] = f"{llm_ms:.1f}"
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{record["queries"]} queries", '
+            f'llm;dur={llm_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+
+        slow = sorted(record["slow"], reverse=True)[: RequestMetrics.TOP_STATEMENTS]
+        line = {
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_queries": record["queries"],
+            "db_ms": round(db_ms, 1),
+            "llm_calls": record["llm_calls"],
+            "llm_ms": round(llm_ms, 1),
+            "wait_ms": round(record["wait_time"] * 1000.0, 1),
+            "slow_queries": [{"ms": round(t * 1000.0, 1), "sql": sql} for t, sql in slow],
+        }
+        slow_request_ms = float(current_app.config.get("SLOW_REQUEST_MS", 1000) or 0)
+        if slow_request_ms and total_ms - record["wait_time"] * 1000.0 >= slow_request_ms:
+            current_app.logger.warning(f"request_metrics {json.dumps(line)}")
+        else:
+            current_app.logger.info(f"request_metrics {json.dumps(line)}")
+
+        RequestMetrics._record(request.endpoint, total_ms, record, slow)
+        return response
+
+    # --- Aggregates --------------------------------------------------------
+
+    @staticmethod
+    def _record(endpoint: str, total_ms: float, record: dict, slow: list) -> None:
+        with RequestMetrics._lock:
+            agg = RequestMetrics._endpoints.get(endpoint)
+            if agg is None:
+                agg = RequestMetrics._endpoints[endpoint] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_ms": 0.0,
+                    "llm_calls": 0,
+                    "llm_ms": 0.0,
+                    "samples": deque(maxlen=RequestMetrics.MAX_SAMPLES),
+                    "slowest": [],
+                }
+            agg["count"] += 1
+            agg["total_ms"] += total_ms
+            agg["max_ms"] = max(agg["max_ms"], total_ms)
+            agg["queries"] += record["queries"]
+            agg["max_queries"] = max(agg["max_queries"], record["queries"])
+            agg["db_ms"] += record["db_time"] * 1000.0
+            agg["llm_calls"] += record["llm_calls"]
+            agg["llm_ms"] += record["llm_time"] * 1000.0
+            agg["samples"].append(total_ms)
+            if slow:
+                merged = agg["slowest"] + [(t * 1000.0, sql) for t, sql in slow]
+                agg["slowest"] = sorted(merged, reverse=True)[: RequestMetrics.TOP_STATEMENTS]
+
+    @staticmethod
+    def snapshot() -> list[dict]:
+        """Per-endpoint aggregates, slowest average first."""
+        with RequestMetrics._lock:
+            items = [(name, dict(agg, samples=list(agg["samples"]))) for name, agg in RequestMetrics._endpoints.items()]
+
+        rows = []
+        for name, agg in items:
+            count = agg["count"] or 1
+            samples = sorted(agg["samples"])
+            p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))] if samples else 0.0
+            rows.append(
+                {
+                    "endpoint": name,
+                    "count": agg["count"],
+                    "avg_ms": round(agg["total_ms"] / count, 1),
+                    "p95_ms": round(p95, 1),
+                    "max_ms": round(agg["max_ms"], 1),
+                    "avg_queries": round(agg["queries"] / count, 1),
+                    "max_queries": agg["max_queries"],
+                    "avg_db_ms": round(agg["db_ms"] / count, 1),
+                    "llm_calls": agg["llm_calls"],
+                    "avg_llm_ms": round(agg["llm_ms"] / count, 1),
+                    "slowest": [{"ms": round(ms, 1), "sql": sql} for ms, sql in agg["slowest"]],
+                }
+            )
+        rows.sort(key=lambda r: r["avg_ms"], reverse=True)
+        return rows
+
+    @staticmethod
+    def reset() -> None:
+        with RequestMetrics._lock:
+            RequestMetrics._endpoints.clear()
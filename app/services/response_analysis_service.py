@@ -0,0 +1,135 @@
+import hashlib
+import json
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import Response, ResponseAnalysis, ModuleType
+from app.services.nlp_service import NLPService
+
+
+class ResponseAnalysisService:
+    """
+    Writing/Speaking analyses are computed lazily on first view and persisted in
+    ResponseAnalysis, so later views (and instructors browsing sections) read them from
+    the DB instead of calling Groq again.
+
+    A stored row is reused while its version matches NLPService.*_ANALYSIS_VERSION, its
+    input hash matches the current prompt + answer (e.g. the STT transcript arrived
+    later), and it was not computed without the AI (unavailable, failed or skipped for a
+    short answer) while AI is now enabled.
+    """
+
+    WRITING = "writing"
+    SPEAKING = "speaking"
+
+    @staticmethod
+    def _kind(resp: Response) -> str | None:
+        q = resp.question
+        if not q:
+            return None
+        if q.module == ModuleType.WRITING:
+            return ResponseAnalysisService.WRITING
+        if q.module == ModuleType.SPEAKING:
+            return ResponseAnalysisService.SPEAKING
+        return None
+
+    @staticmethod
+    def _inputs(resp: Response, kind: str) -> tuple[str, str]:
+        prompt_text = resp.question.text if resp.question else ""
+        if kind == ResponseAnalysisService.SPEAKING:
+            answer = (resp.transcript or resp.text_answer or "").strip()
+        else:
+            answer = (resp.text_answer or "").strip()
+        return prompt_text, answer
+
+    @staticmethod
+    def _version(kind: str) -> int:
+        if kind == ResponseAnalysisService.SPEAKING:
+            return NLPService.SPEAKING_ANALYSIS_VERSION
+        return NLPService.WRITING_ANALYSIS_VERSION
+
+    @staticmethod
+    def _input_hash(prompt_text: str, answer: str) -> str:
+        payload = json.dumps([prompt_text or "", answer or ""], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _is_fresh(row: ResponseAnalysis, kind: str, input_hash: str, ai_enabled: bool) -> bool:
+        if row.kind != kind or row.version != ResponseAnalysisService._version(kind):
+            return False
+        if row.input_hash != input_hash:
+            return False
+        if ai_enabled and not row.ai_enabled:
+            return False
+        return bool(row.data)
+
+    @staticmethod
+    def _compute(kind: str, prompt_text: str, answer: str) -> tuple[dict, bool]:
+        """(analysis, whether the AI produced it)."""
+        if kind == ResponseAnalysisService.SPEAKING:
+            return NLPService.speaking_analysis_with_source(transcript=answer, prompt=prompt_text)
+        return NLPService.writing_analysis_with_source(text=answer, prompt=prompt_text)
+
+    @staticmethod
+    def analyses_for(responses: list[Response]) -> dict[int, dict]:
+        """
+        Returns {response_id: analysis dict} for the Writing/Speaking responses given.
+        Stored analyses are loaded in one query; missing or stale ones are computed,
+        saved and committed.
+        """
+        targets = [(r, ResponseAnalysisService._kind(r)) for r in responses]
+        targets = [(r, kind) for r, kind in targets if kind]
+        if not targets:
+            return {}
+
+        ids = [r.id for r, _ in targets]
+        stored = {
+            row.response_id: row
+            for row in ResponseAnalysis.query.filter(ResponseAnalysis.response_id.in_(ids)).all()
+        }
+        ai_enabled = bool(NLPService._ai_enabled() and NLPService._get_client())
+
+        results: dict[int, dict] = {}
+        changed = False
+        for resp, kind in targets:
+            prompt_text, answer = ResponseAnalysisService._inputs(resp, kind)
+            input_hash = ResponseAnalysisService._input_hash(prompt_text, answer)
+            row = stored.get(resp.id)
+            if row is not None and ResponseAnalysisService._is_fresh(row, kind, input_hash, ai_enabled):
+                try:
+                    results[resp.id] = json.loads(row.data)
+                    continue
+                except Exception:
+                    pass
+
+            data, ai_used = ResponseAnalysisService._compute(kind, prompt_text, answer)
+            results[resp.id] = data
+            payload = json.dumps(data, ensure_ascii=False)
+            version = ResponseAnalysisService._version(kind)
+            if (
+                row is not None
+                and (row.kind, row.version, row.input_hash, row.ai_enabled, row.data)
+                == (kind, version, input_hash, ai_used, payload)
+            ):
+                # Recomputed locally to the same result (e.g. a short answer the AI skips)
+                continue
+            if row is None:
+                row = ResponseAnalysis(response_id=resp.id)
+                db.session.add(row)
+            row.kind = kind
+            row.version = version
+            row.input_hash = input_hash
+            row.ai_enabled = ai_used
+            row.data = payload
+            changed = True
+
+        if changed:
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A concurrent view stored the same analysis first; theirs is as good as ours.
+                db.session.rollback()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Failed to store response analyses: {e}")
+        return results
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+
+from app.extensions import db, dialect_insert
+from app.models import ModuleType, RoadmapCacheEntry
+
+
+@dataclass(frozen=True)
+class RoadmapProfile:
+    level: str
+    # Lower bound of each module's score band, in ModuleType order
+    bands: tuple[int, ...]
+    band_width: int
+    weeks: int
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha1(json.dumps(self.to_payload(), sort_keys=True).encode("utf-8")).hexdigest()
+
+    def to_payload(self) -> dict:
+        return {"level": self.level, "bands": list(self.bands), "band_width": self.band_width, "weeks": self.weeks}
+
+    @staticmethod
+    def from_payload(payload: dict) -> "RoadmapProfile":
+        return RoadmapProfile(
+            level=str(payload["level"]),
+            bands=tuple(int(b) for b in payload["bands"]),
+            band_width=int(payload["band_width"]),
+            weeks=int(payload["weeks"]),
+        )
+
+    def _upper(self, low: int) -> int:
+        return 100 if low + self.band_width >= 100 else low + self.band_width - 1
+
+    def stats(self) -> dict[str, str]:
+        """Module performance as score ranges, e.g. {"Grammar": "40-59%"} (what the prompt sees)."""
+        return {m.value: f"{low}-{self._upper(low)}%" for m, low in zip(ModuleType, self.bands)}
+
+    @property
+    def score(self) -> int:
+        """Representative total score: mean of the band midpoints."""
+        mids = [(low + self._upper(low)) / 2 for low in self.bands]
+        return round(sum(mids) / len(mids)) if mids else 0
+
+
+class RoadmapCache:
+    """
+    AI study roadmaps shared between reports with the same quantised profile: CEFR level, each
+    module score rounded down to a ROADMAP_CACHE_BAND_WIDTH band, and plan length in weeks.
+    Reports with a personal goal note are not cached (their plan is specific to the student).
+
+    Entries live in the roadmap_cache table so every worker process shares them. A hit is
+    re-dated to the report's own start Monday. Entries older than ROADMAP_CACHE_REFRESH_SECONDS
+    are still served but flagged for a background refresh; entries older than
+    ROADMAP_CACHE_TTL_SECONDS are not served. Above ROADMAP_CACHE_MAX_ENTRIES (0 = cache off)
+    the least recently used entries are dropped.
+    """
+
+    @staticmethod
+    def profile(level: str | None, stats: dict, weeks: int) -> RoadmapProfile | None:
+        """Profile of one report, or None when the cache is off or the report has no level."""
+        if not level or int(current_app.config.get("ROADMAP_CACHE_MAX_ENTRIES", 500) or 0) <= 0:
+            return None
+        width = max(1, min(50, int(current_app.config.get("ROADMAP_CACHE_BAND_WIDTH", 20) or 20)))
+        bands = []
+        for module in ModuleType:
+            try:
+                pct = float((stats or {}).get(module.value) or 0)
+            except (TypeError, ValueError):
+                pct = 0.0
+            low = int(min(max(pct, 0.0), 100.0) // width) * width
+            # 100% shares the top band
+            bands.append(min(low, 100 - width) if low >= 100 else low)
+        return RoadmapProfile(level=str(level), bands=tuple(bands), band_width=width, weeks=int(weeks))
+
+    @staticmethod
+    def lookup(profile: RoadmapProfile, start_date: date) -> tuple[dict, bool] | None:
+        """(roadmap data re-dated to start_date, refresh due) for a fresh-enough entry, else None."""
+        entry = db.session.get(RoadmapCacheEntry, profile.key)
+        if entry is None:
+            return None
+        age = (datetime.utcnow() - entry.created_at).total_seconds()
+        ttl = float(current_app.config.get("ROADMAP_CACHE_TTL_SECONDS", 30 * 24 * 3600) or 0)
+        if ttl and age > ttl:
+            return None
+        try:
+            data = json.loads(entry.data_json)
+        except Exception:
+            return None
+
+        db.session.execute(
+            update(RoadmapCacheEntry)
+            .where(RoadmapCacheEntry.key == profile.key)
+            .values(hits=RoadmapCacheEntry.hits + 1, accessed_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+        refresh_after = float(current_app.config.get("ROADMAP_CACHE_REFRESH_SECONDS", 7 * 24 * 3600) or 0)
+        return RoadmapCache.redate(data, entry.start_date, start_date), bool(refresh_after and age > refresh_after)
+
+    @staticmethod
+    def store(profile: RoadmapProfile, data: dict, start_date: date) -> None:
+        values = {
+            "key": profile.key,
+            "profile_json": json.dumps(profile.to_payload(), sort_keys=True),
+            "data_json": json.dumps(data, ensure_ascii=False),
+            "start_date": start_date,
+            "hits": 0,
+            "created_at": datetime.utcnow(),
+            "accessed_at": datetime.utcnow(),
+        }
+        upsert = dialect_insert()
+        if upsert is not None:
+            stmt = upsert(RoadmapCacheEntry).values(**values)
+            db.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["key"],
+                    set_={
+                        "data_json": stmt.excluded.data_json,
+                        "start_date": stmt.excluded.start_date,
+                        "created_at": stmt.excluded.created_at,
+                        "accessed_at": stmt.excluded.accessed_at,
+                    },
+                )
+            )
+        else:
+            db.session.merge(RoadmapCacheEntry(**values))
+        db.session.commit()
+        RoadmapCache._evict()
+
+    @staticmethod
+    def _evict() -> None:
+        max_entries = int(current_app.config.get("ROADMAP_CACHE_MAX_ENTRIES", 500) or 0)
+        excess = (db.session.execute(select(func.count(RoadmapCacheEntry.key))).scalar() or 0) - max(1, max_entries)
+        if excess <= 0:
+            return
+        oldest = select(RoadmapCacheEntry.key).order_by(RoadmapCacheEntry.accessed_at).limit(excess)
+        db.session.execute(delete(RoadmapCacheEntry).where(RoadmapCacheEntry.key.in_(oldest.scalar_subquery())))
+        db.session.commit()
+
+    @staticmethod
+    def redate(data: dict, from_date: date, to_date: date) -> dict:
+        """Copy of a roadmap whose calendar is shifted from from_date to to_date (both Mondays)."""
+        shifted = copy.deepcopy(data)
+        calendar = shifted.get("calendar")
+        if not isinstance(calendar, dict):
+            return shifted
+        delta = timedelta(days=(to_date - from_date).days)
+        calendar["start_date"] = to_date.isoformat()
+        for day in calendar.get("days") if isinstance(calendar.get("days"), list) else []:
+            if not isinstance(day, dict) or not isinstance(day.get("date"), str):
+                continue
+            try:
+                day["date"] = (date.fromisoformat(day["date"]) + delta).isoformat()
+            except ValueError:
+                continue
+        return shifted
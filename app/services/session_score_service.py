@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import case, func, literal, select, union_all
+
+from app.extensions import db
+from app.models import ModuleType, Question, Response, SessionQuestion
+
+
+@dataclass(frozen=True)
+class ModuleCounts:
+    served: int = 0
+    answered: int = 0
+    correct: int = 0
+
+
+@dataclass(frozen=True)
+class SessionScore:
+    # Keyed by module; None collects responses whose question is missing
+    modules: dict[ModuleType | None, ModuleCounts]
+
+    @property
+    def served(self) -> int:
+        return sum(c.served for c in self.modules.values())
+
+    @property
+    def answered(self) -> int:
+        return sum(c.answered for c in self.modules.values())
+
+    @property
+    def correct(self) -> int:
+        return sum(c.correct for c in self.modules.values())
+
+    @property
+    def percentage(self) -> float:
+        """Correct answers over served questions (unanswered ones lower the score)."""
+        served = self.served
+        return (self.correct / served * 100) if served > 0 else 0
+
+    def module_percentage(self, module: ModuleType) -> float | None:
+        """Correct over answered in one module, rounded to 0.1; None when nothing was answered."""
+        counts = self.modules.get(module)
+        if not counts or counts.answered <= 0:
+            return None
+        return round((counts.correct / counts.answered) * 100, 1)
+
+    def module_stats(self) -> dict[str, float]:
+        """{module name: percentage} for every module (0 when unanswered), as stored on Report."""
+        stats: dict[str, float] = {}
+        for module in ModuleType:
+            pct = self.module_percentage(module)
+            stats[module.value] = pct if pct is not None else 0
+        return stats
+
+
+class SessionScoreService:
+    """
+    Per-module served / answered / correct counts for one exam session in a single GROUP BY
+    over session_questions and responses (UNION ALL), shared by report generation, the
+    instructor dashboard and the result page.
+    """
+
+    @staticmethod
+    def for_session(session_id: int) -> SessionScore:
+        served = select(
+            SessionQuestion.module.label("module"),
+            literal(1).label("served"),
+            literal(0).label("answered"),
+            literal(0).label("correct"),
+        ).where(SessionQuestion.session_id == session_id)
+        answered = (
+            select(
+                Question.module,
+                literal(0),
+                literal(1),
+                case((Response.is_correct == True, 1), else_=0),  # noqa: E712
+            )
+            .select_from(Response)
+            .outerjoin(Question, Question.id == Response.question_id)
+            .where(Response.session_id == session_id)
+        )
+        rows = union_all(served, answered).subquery()
+
+        result = db.session.execute(
+            select(
+                rows.c.module,
+                func.sum(rows.c.served),
+                func.sum(rows.c.answered),
+                func.sum(rows.c.correct),
+            ).group_by(rows.c.module)
+        )
+        return SessionScore(
+            modules={
+                module: ModuleCounts(served=int(s or 0), answered=int(a or 0), correct=int(c or 0))
+                for module, s, a, c in result
+            }
+        )
@@ -1,5 +1,5 @@
 from flask import current_app
-from groq import Groq
+from app.services.llm_gateway import LLMGateway
 
 
 class SpeechToTextService:
@@ -19,9 +19,7 @@ class SpeechToTextService:
 
         try:
             model = current_app.config.get("GROQ_STT_MODEL") or "whisper-large-v3"
-            client = Groq(api_key=api_key)
-            with open(filepath, "rb") as f:
-                resp = client.audio.transcriptions.create(model=model, file=f)
+            resp = LLMGateway.transcribe(filepath, model)
             transcript = getattr(resp, "text", None) or (
                 resp.get("text") if isinstance(resp, dict) else None
             )
@@ -26,8 +26,12 @@ function initTimer() {
 
     const textEl = badge.querySelector('[data-role="timerText"]');
 
-    let remaining = parseInt(badge.getAttribute("data-remaining") || "0", 10);
-    if (Number.isNaN(remaining)) remaining = 0;
+    // Read back on every tick: answers submitted in JSON mode resync it (see renderQuestion)
+    const readRemaining = () => {
+        const value = parseInt(badge.getAttribute("data-remaining") || "0", 10);
+        return Number.isNaN(value) ? 0 : value;
+    };
+    let remaining = readRemaining();
 
     const formatRemaining = (sec) => {
         const s = Math.max(0, parseInt(sec, 10) || 0);
@@ -40,7 +44,8 @@ function initTimer() {
     if (textEl) textEl.textContent = formatRemaining(remaining);
 
     const tick = () => {
-        remaining = Math.max(0, remaining - 1);
+        remaining = Math.max(0, readRemaining() - 1);
+        badge.setAttribute("data-remaining", String(remaining));
         if (textEl) textEl.textContent = formatRemaining(remaining);
         if (remaining <= 10) badge.classList.add("bg-danger");
         if (remaining === 0) {
@@ -217,6 +222,102 @@ function initWritingWordCount() {
     render();
 }
 
+function renderOptions(container, options, selected) {
+    container.innerHTML = "";
+    Object.entries(options).forEach(([key, val]) => {
+        const label = document.createElement("label");
+        label.className = "stat d-flex align-items-start gap-2";
+        label.style.cursor = "pointer";
+
+        const input = document.createElement("input");
+        input.className = "form-check-input mt-1";
+        input.type = "radio";
+        input.name = "option";
+        input.value = key;
+        input.checked = selected === key;
+
+        const body = document.createElement("div");
+        const keyEl = document.createElement("div");
+        keyEl.className = "text-white fw-semibold";
+        keyEl.textContent = `${key})`;
+        const valEl = document.createElement("div");
+        valEl.className = "text-muted";
+        valEl.textContent = val;
+        body.append(keyEl, valEl);
+
+        label.append(input, body);
+        container.appendChild(label);
+    });
+}
+
+// Shows the next question from a JSON-mode answer response in place.
+// Returns false when this page has no widget for it (the caller then loads the GET view).
+function renderQuestion(form, data) {
+    const ctx = getCtx();
+    const question = data.question || {};
+    if (data.module !== ctx.moduleLabel) return false;
+
+    const isChoice = question.question_type === "Multiple Choice" && question.options;
+    const optionsList = document.getElementById("optionsList");
+    const textarea = form.querySelector('textarea[name="text_answer"]');
+    if (isChoice ? !optionsList : !textarea) return false;
+
+    ctx.questionId = question.id;
+    document.getElementById("questionIdInput").value = String(question.id);
+    document.getElementById("questionText").textContent = question.text || "";
+    if (isChoice) {
+        renderOptions(optionsList, question.options, data.existing_answer);
+    } else {
+        textarea.value = data.existing_answer || "";
+        textarea.dispatchEvent(new Event("input"));
+    }
+
+    const counter = document.getElementById("questionCounter");
+    if (counter) counter.textContent = `Q${data.index}/${data.total}`;
+    const progressText = document.getElementById("overallProgressText");
+    if (progressText) progressText.textContent = `${data.overall_progress}%`;
+    const progressBar = document.getElementById("overallProgressBar");
+    if (progressBar) progressBar.style.width = `${data.overall_progress}%`;
+    const badge = document.getElementById("timerBadge");
+    if (badge && data.remaining_seconds !== null && data.remaining_seconds !== undefined) {
+        badge.setAttribute("data-remaining", String(data.remaining_seconds));
+    }
+    window.scrollTo(0, 0);
+    return true;
+}
+
+// Submit-and-advance in one request: the answer is stored and the next question comes back as JSON.
+async function submitViaFetch(form, submitter) {
+    const ctx = getCtx();
+    const formData = new FormData(form);
+    if (submitter && submitter.name) formData.append(submitter.name, submitter.value);
+
+    const buttons = form.querySelectorAll('button[type="submit"]');
+    buttons.forEach((b) => { b.disabled = true; });
+    try {
+        const res = await fetch(form.action, {
+            method: "POST",
+            body: formData,
+            headers: { "X-Exam-Ajax": "1", "Accept": "application/json" },
+        });
+        // Not JSON: e.g. the module timer ran out and the server moved on
+        if (!(res.headers.get("Content-Type") || "").includes("application/json")) {
+            window.location.href = res.url;
+            return;
+        }
+        const data = await res.json();
+        if (data.redirect || !data.ok || !renderQuestion(form, data)) {
+            window.location.href = data.redirect || `/exam/${ctx.sessionId}`;
+        }
+    } catch (e) {
+        await postTechnicalEvent("exam_submit_failed", String(e));
+        // The answer may or may not have been stored; the GET view shows where the exam is
+        window.location.href = `/exam/${ctx.sessionId}`;
+    } finally {
+        buttons.forEach((b) => { b.disabled = false; });
+    }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
     initTimer();
     initSpeaking();
@@ -252,6 +353,12 @@ document.addEventListener("DOMContentLoaded", () => {
                     }
                 }
             }
+
+            // Speaking keeps the plain form post (its recorder submits the form itself)
+            if (ctx.module !== "SPEAKING" && window.fetch) {
+                e.preventDefault();
+                submitViaFetch(form, e.submitter);
+            }
         });
     }
 });
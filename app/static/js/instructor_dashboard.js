@@ -7,7 +7,6 @@
   const statusSelect = document.getElementById('dashStatus');
   const searchInput = document.getElementById('dashSearch');
   const clearBtn = document.getElementById('dashClear');
-  const exportBtn = document.getElementById('dashExport');
   const countEl = document.getElementById('dashCount');
   const levelChart = document.getElementById('dashLevelChart');
   const moduleBars = document.getElementById('dashModuleBars');
@@ -86,8 +85,9 @@
     });
   }
 
-  function exportPdf() {
-    const url = new URL('/instructor/leaderboard/export.pdf', window.location.origin);
+  function exportLeaderboard(format) {
+    // Filtering and row selection happen server-side; CSV/JSONL cover the whole cohort.
+    const url = new URL(`/instructor/leaderboard/export.${format}`, window.location.origin);
     const days = Number(daysSelect?.value || 7);
     url.searchParams.set('days', String(Number.isFinite(days) ? days : 7));
 
@@ -291,39 +291,6 @@
     });
   }
 
-  function exportCsv() {
-    const header = ['Student', 'Email', 'Last Attempt', 'Level', 'Overall', 'Status', 'Report Link'];
-    const visible = rows.filter((tr) => tr.style.display !== 'none');
-
-    const lines = [header];
-    visible.forEach((tr) => {
-      const tds = Array.from(tr.querySelectorAll('td'));
-      const student = tds[0]?.innerText?.replace(/\s+/g, ' ').trim() || '';
-      const email = tds[1]?.innerText?.trim() || '';
-      const lastAttempt = tds[2]?.innerText?.trim() || '';
-      const level = tds[3]?.innerText?.trim() || '';
-      const overall = tds[4]?.innerText?.trim() || '';
-      const status = tds[5]?.innerText?.trim() || '';
-      const link = tr.querySelector('a.status-pill')?.getAttribute('href') || '';
-      lines.push([student, email, lastAttempt, level, overall, status, link]);
-    });
-
-    const escapeCell = (cell) => {
-      const s = String(cell ?? '');
-      if (/[",\n]/.test(s)) return `"${s.replace(/"/g, '""')}"`;
-      return s;
-    };
-
-    const csv = lines.map((row) => row.map(escapeCell).join(',')).join('\n');
-    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8' });
-    const a = document.createElement('a');
-    a.href = URL.createObjectURL(blob);
-    a.download = 'instructor_dashboard_leaderboard.csv';
-    document.body.appendChild(a);
-    a.click();
-    a.remove();
-  }
-
   // Restore saved filters
   const saved = readFilters();
   if (searchInput && saved.q) searchInput.value = saved.q;
@@ -342,7 +309,9 @@
     });
   }
 
-  if (exportBtn) exportBtn.addEventListener('click', exportPdf);
+  shell.querySelectorAll('[data-export]').forEach((btn) => {
+    btn.addEventListener('click', () => exportLeaderboard(btn.getAttribute('data-export') || 'pdf'));
+  });
 
   if (levelChart) {
     levelChart.addEventListener('click', (e) => {
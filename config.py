@@ -44,5 +44,76 @@ class Config:
     # Prefer AI-generated questions for every new slot (falls back to DB if AI is unavailable)
     PREFER_AI_QUESTIONS = os.environ.get("PREFER_AI_QUESTIONS", "1").lower() in ("1", "true", "yes", "y")
 
+    # Background grading of Writing/Speaking answers (worker threads per process)
+    GRADING_WORKERS = int(os.environ.get("GRADING_WORKERS", "4"))
+    # Max seconds report generation waits for in-flight grades before grading inline
+    GRADING_RECONCILE_TIMEOUT_SECONDS = int(os.environ.get("GRADING_RECONCILE_TIMEOUT_SECONDS", "30"))
+
+    # Background question-pool refill per (module, level), as multiples of the per-exam count:
+    # a pool below LOW is regenerated up to HIGH
+    QUESTION_POOL_LOW_WATERMARK = int(os.environ.get("QUESTION_POOL_LOW_WATERMARK", "2"))
+    QUESTION_POOL_HIGH_WATERMARK = int(os.environ.get("QUESTION_POOL_HIGH_WATERMARK", "4"))
+
+    # Parallel question generation: max Groq requests in flight and request starts per minute (0 = no limit)
+    GENERATION_MAX_CONCURRENCY = int(os.environ.get("GENERATION_MAX_CONCURRENCY", "4"))
+    GENERATION_RATE_LIMIT_PER_MINUTE = int(os.environ.get("GENERATION_RATE_LIMIT_PER_MINUTE", "30"))
+
+    # LLM response cache for scoring/analysis calls: sqlite | memory | none
+    LLM_CACHE_BACKEND = os.environ.get("LLM_CACHE_BACKEND", "sqlite")
+    # Defaults to <instance>/llm_cache.sqlite
+    LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH")
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "5000"))
+    LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # LLM gateway (all Groq calls): per-call timeout, retries for transient errors, circuit breaker
+    # (opens after THRESHOLD unhealthy calls in a row - timeouts, 429/5xx or calls slower than
+    # SLOW_CALL_SECONDS - for COOLDOWN seconds) and a cap on calls in flight (callers wait up to
+    # QUEUE_TIMEOUT seconds for a slot, then fall back)
+    LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+    LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+    LLM_BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    LLM_SLOW_CALL_SECONDS = float(os.environ.get("LLM_SLOW_CALL_SECONDS", "15"))
+    LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "16"))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("LLM_QUEUE_TIMEOUT_SECONDS", "2"))
+
+    # Per-request instrumentation: query count / DB time / LLM time headers, log line and /admin/performance.
+    # Statements slower than SLOW_QUERY_MS are listed; requests slower than SLOW_REQUEST_MS log a warning.
+    REQUEST_METRICS_ENABLED = os.environ.get("REQUEST_METRICS_ENABLED", "1").lower() in ("1", "true", "yes", "y")
+    SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", "50"))
+    SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "1000"))
+
+    # Background job queue (report enrichment): worker threads per web process (0 = only
+    # `flask jobs work` processes), attempts per job, retry backoff (doubling, capped), the lease
+    # after which a running job whose worker died is requeued, and how long finished (done/failed)
+    # rows are kept (0 = forever)
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+    JOB_BACKOFF_SECONDS = float(os.environ.get("JOB_BACKOFF_SECONDS", "15"))
+    JOB_BACKOFF_MAX_SECONDS = float(os.environ.get("JOB_BACKOFF_MAX_SECONDS", "600"))
+    JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "600"))
+    JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "2"))
+    JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+    # Shared AI roadmaps for reports without a goal note, keyed by level, module score bands
+    # (BAND_WIDTH points wide) and weeks. Entries are regenerated in the background after
+    # REFRESH_SECONDS, not served after TTL_SECONDS, and LRU-evicted above MAX_ENTRIES (0 = off)
+    ROADMAP_CACHE_MAX_ENTRIES = int(os.environ.get("ROADMAP_CACHE_MAX_ENTRIES", "500"))
+    ROADMAP_CACHE_BAND_WIDTH = int(os.environ.get("ROADMAP_CACHE_BAND_WIDTH", "20"))
+    ROADMAP_CACHE_REFRESH_SECONDS = int(os.environ.get("ROADMAP_CACHE_REFRESH_SECONDS", str(7 * 24 * 3600)))
+    ROADMAP_CACHE_TTL_SECONDS = int(os.environ.get("ROADMAP_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+    # Rendered certificate PDFs kept per worker process (LRU, one entry per session)
+    CERTIFICATE_CACHE_MAX_ENTRIES = int(os.environ.get("CERTIFICATE_CACHE_MAX_ENTRIES", "256"))
+
+    # Report status long-poll (result page): longest a poll is held waiting for the report to
+    # change (0 = answer immediately) and how often a held poll re-reads the status meanwhile
+    REPORT_WAIT_SECONDS = float(os.environ.get("REPORT_WAIT_SECONDS", "25"))
+    REPORT_WAIT_POLL_SECONDS = float(os.environ.get("REPORT_WAIT_POLL_SECONDS", "1"))
+
+    # Adaptive difficulty policy: "staircase" (2 up / 2 down) or "elo" (rating vs question difficulty)
+    ADAPTIVE_POLICY = os.environ.get("ADAPTIVE_POLICY", "staircase")
+    ADAPTIVE_ELO_K = float(os.environ.get("ADAPTIVE_ELO_K", "0.4"))
+
     # Start difficulty for placement exam (more realistic than A1-only)
     DEFAULT_START_LEVEL = os.environ.get("DEFAULT_START_LEVEL", "B2")
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Offline adaptive-exam simulator / benchmark harness.
+
+Runs complete exams in-process (Flask test client, full HTTP flow) for synthetic
+candidates with a known ability against a throwaway SQLite DB, with AI disabled.
+Reports per-request latency, SQL statements per answered question, how often the
+"repeat fallback" (pool exhausted) path was hit and how well the final level matches
+the candidate's true level.
+
+Examples:
+    python simulate.py --exams 200
+    python simulate.py --exams 1000 --per-band 15 --policy elo --json sim.json
+    python simulate.py --db sim.db --force   # keep the DB for inspection (--force overwrites)
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate adaptive exams and report latency/accuracy metrics.")
+    parser.add_argument("--exams", type=int, default=100, help="number of complete exams to run")
+    parser.add_argument("--per-band", type=int, default=25, help="synthetic questions per module and level")
+    parser.add_argument("--policy", default=None, help="ADAPTIVE_POLICY to simulate (staircase | elo)")
+    parser.add_argument("--start-level", default=None, help="DEFAULT_START_LEVEL (e.g. B2)")
+    parser.add_argument("--db", default=None, help="SQLite file to create (default: a temp file, recreated)")
+    parser.add_argument("--seed", type=int, default=7, help="random seed")
+    parser.add_argument("--no-report", action="store_true", help="skip report generation at the end of each exam")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the summary as JSON here")
+    parser.add_argument("--force", action="store_true", help="allow --db to overwrite an existing file")
+    return parser.parse_args(argv)
+
+
+def configure(args) -> str:
+    """Points the app at a fresh SQLite file; must run before the app is imported (Config reads
+    the environment at import time). Returns the DB path."""
+    db_path = args.db or os.path.join(tempfile.gettempdir(), "levelassessment_sim.db")
+    if os.path.exists(db_path):
+        if args.db and not args.force:
+            raise SystemExit(f"[sim] {db_path} already exists; pass --force to overwrite it.")
+        os.remove(db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("GROQ_API_KEY", None)
+    os.environ["PREFER_AI_QUESTIONS"] = "0"
+    os.environ["LLM_CACHE_BACKEND"] = "none"
+    if args.policy:
+        os.environ["ADAPTIVE_POLICY"] = args.policy
+    if args.start_level:
+        os.environ["DEFAULT_START_LEVEL"] = args.start_level.upper()
+    return db_path
+
+
+class Metrics:
+    def __init__(self):
+        self.counting = False
+        self.statements = 0
+        self.latency = defaultdict(list)  # request kind -> seconds
+        self.queries = defaultdict(list)  # request kind -> statements per request
+        self.answered = 0
+        self.exhausted = 0
+        self.levels = []  # (true level, report level, engine level)
+        self.failures = 0
+
+
+metrics = Metrics()
+
+
+class _FallbackCounter(logging.Handler):
+    def emit(self, record):
+        if "Question pool exhausted" in record.getMessage():
+            metrics.exhausted += 1
+
+
+def seed_questions(app, per_band: int) -> None:
+    from app.extensions import db
+    from app.models import CEFRLevel, ModuleType, Question, QuestionType
+
+    with app.app_context():
+        db.create_all()
+        for module in (ModuleType.GRAMMAR, ModuleType.VOCABULARY, ModuleType.WRITING, ModuleType.SPEAKING):
+            open_ended = module in (ModuleType.WRITING, ModuleType.SPEAKING)
+            for level in CEFRLevel:
+                for k in range(per_band):
+                    db.session.add(
+                        Question(
+                            text=f"[sim] {module.value} {level.value} #{k}",
+                            module=module,
+                            difficulty=level,
+                            question_type=QuestionType.OPEN_ENDED if open_ended else QuestionType.MULTIPLE_CHOICE,
+                            options=None if open_ended else json.dumps({"A": "a", "B": "b", "C": "c", "D": "d"}),
+                            correct_answer=None if open_ended else random.choice("ABCD"),
+                        )
+                    )
+        db.session.commit()
+
+
+def p_correct(ability: float, difficulty: str | None) -> float:
+    """1-PL IRT: chance a candidate of `ability` (1..6 scale) answers a question of `difficulty`."""
+    d = LEVELS.index(difficulty) + 1 if difficulty in LEVELS else 3.5
+    return 1.0 / (1.0 + math.exp(-1.7 * (ability - d)))
+
+
+def answer_for(app, qid: int, ability: float) -> str:
+    from app.extensions import db
+    from app.models import Question
+
+    with app.app_context():
+        q = db.session.get(Question, qid)
+        difficulty = q.difficulty.value if q.difficulty else None
+        correct = q.correct_answer or "A"
+    if random.random() < p_correct(ability, difficulty):
+        return correct
+    return random.choice([o for o in "ABCD" if o != correct])
+
+
+def timed(kind: str, call):
+    metrics.statements = 0
+    metrics.counting = True
+    start = time.perf_counter()
+    try:
+        return call()
+    finally:
+        metrics.latency[kind].append(time.perf_counter() - start)
+        metrics.queries[kind].append(metrics.statements)
+        metrics.counting = False
+
+
+def run_exam(app, n: int, with_report: bool = True) -> None:
+    from app.extensions import db
+    from app.models import CEFRLevel, Report, Student, TestSession, UserRole
+
+    ability = random.uniform(1.0, 6.0)
+    email = f"sim{n}@example.com"
+    with app.app_context():
+        student = Student(name=f"Sim {n}", email=email, role=UserRole.STUDENT, current_level=CEFRLevel.B1)
+        student.set_password("x")
+        db.session.add(student)
+        db.session.commit()
+
+    client = app.test_client()
+    client.post("/login/student", data={"email": email, "password": "x"})
+    r = timed("start_exam", lambda: client.get("/start_exam"))
+    session_id = int(r.headers["Location"].rstrip("/").split("/")[-1])
+    url = f"/exam/{session_id}"
+
+    for _ in range(400):
+        r = timed("get_question", lambda: client.get(url))
+        if r.status_code == 302:
+            if "report_options" in r.headers["Location"]:
+                break
+            continue
+        body = r.get_data(as_text=True)
+
+        if 'name="q_' in body:
+            # Listening block
+            data = {f"q_{qid}": answer_for(app, int(qid), ability) for qid in re.findall(r'name="q_(\d+)"', body)}
+            data["audio_completed"] = "1"
+            timed("answer_listening", lambda: client.post(url, data=data))
+            metrics.answered += len(data) - 1
+            continue
+
+        m = re.search(r'name="question_id" value="(\d+)"', body)
+        if m:
+            qid = int(m.group(1))
+            if 'name="option"' in body:
+                data = {"question_id": qid, "option": answer_for(app, qid, ability)}
+            else:
+                data = {"question_id": qid, "text_answer": "A simulated open-ended answer with enough words."}
+            timed("answer", lambda: client.post(url, data=data))
+            metrics.answered += 1
+            continue
+
+        if f"{url}/start_module" in body:
+            timed("start_module", lambda: client.post(f"{url}/start_module"))
+            continue
+        if "finish_module" in body:
+            r = timed("finish_module", lambda: client.post(f"{url}/finish_module"))
+            if "report_options" in r.headers.get("Location", ""):
+                break
+            continue
+
+        metrics.failures += 1
+        return
+
+    true_level = LEVELS[min(5, max(0, int(round(ability)) - 1))]
+    report_level = None
+    if with_report:
+        timed("report", lambda: client.post(f"{url}/report_options", data={"report_mode": "results"}))
+        with app.app_context():
+            report = Report.query.filter_by(session_id=session_id).first()
+            report_level = report.level_result.value if report and report.level_result else None
+    with app.app_context():
+        engine_level = db.session.get(TestSession, session_id).current_difficulty.value
+    metrics.levels.append((true_level, report_level, engine_level))
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def accuracy(pairs: list[tuple[str, str]]) -> dict:
+    pairs = [(t, e) for t, e in pairs if e]
+    if not pairs:
+        return {}
+    diffs = [abs(LEVELS.index(t) - LEVELS.index(e)) for t, e in pairs]
+    return {
+        "n": len(pairs),
+        "exact_pct": round(100.0 * sum(1 for d in diffs if d == 0) / len(diffs), 1),
+        "within_one_pct": round(100.0 * sum(1 for d in diffs if d <= 1) / len(diffs), 1),
+        "mean_abs_error_levels": round(statistics.mean(diffs), 3),
+    }
+
+
+def summarize(elapsed: float) -> dict:
+    requests = {}
+    for kind, values in metrics.latency.items():
+        requests[kind] = {
+            "count": len(values),
+            "p50_ms": round(1000 * _pct(values, 0.50), 2),
+            "p95_ms": round(1000 * _pct(values, 0.95), 2),
+            "max_ms": round(1000 * max(values), 2),
+            "avg_queries": round(statistics.mean(metrics.queries[kind]), 2),
+        }
+    answer_statements = sum(
+        sum(metrics.queries[k]) for k in ("get_question", "answer", "answer_listening") if k in metrics.queries
+    )
+    return {
+        "exams": len(metrics.levels),
+        "failed_exams": metrics.failures,
+        "elapsed_s": round(elapsed, 2),
+        "exams_per_s": round(len(metrics.levels) / elapsed, 2) if elapsed else None,
+        "questions_answered": metrics.answered,
+        "queries_per_question": round(answer_statements / metrics.answered, 2) if metrics.answered else None,
+        "pool_exhaustion": {
+            "fallbacks": metrics.exhausted,
+            "rate_per_question": round(metrics.exhausted / metrics.answered, 4) if metrics.answered else None,
+        },
+        "accuracy": {
+            "report_level": accuracy([(t, r) for t, r, _ in metrics.levels]),
+            "engine_level": accuracy([(t, e) for t, _, e in metrics.levels]),
+        },
+        "true_level_distribution": dict(Counter(t for t, _, _ in metrics.levels)),
+        "requests": requests,
+    }
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    db_path = configure(args)
+
+    from sqlalchemy import event
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    print(f"[sim] DB: {db_path}")
+    seed_questions(app, args.per_band)
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _count(*_a, **_k):
+            if metrics.counting:
+                metrics.statements += 1
+
+    app.logger.addHandler(_FallbackCounter())
+    print(f"[sim] Running {args.exams} exams ({args.per_band} questions per module/level)...")
+    start = time.perf_counter()
+    for n in range(args.exams):
+        run_exam(app, n, with_report=not args.no_report)
+        if (n + 1) % 50 == 0:
+            print(f"[sim] {n + 1}/{args.exams} exams done")
+    summary = summarize(time.perf_counter() - start)
+
+    print(json.dumps(summary, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[sim] Summary written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()